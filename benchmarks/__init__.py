@@ -0,0 +1,10 @@
+'''
+Benchmarks of the delinter stages on synthetic corpora.
+
+Run them from the root of the repository, with the package installed or with
+`src` on the path, and keep the JSON results to compare commits:
+
+    python -m benchmarks --files 500 --output before.json
+    python -m benchmarks --files 500 --output after.json
+    python -m benchmarks.compare before.json after.json
+'''
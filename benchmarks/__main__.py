@@ -0,0 +1,109 @@
+'''
+Generate a synthetic corpus, time the delinter stages on it and write the
+results as JSON.
+'''
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import typing as tp
+
+from delinter import __version__
+from benchmarks.corpus import generate_corpus
+from benchmarks.stages import run_stages
+from benchmarks.stages import stage_names
+
+RESULTS_FORMAT = 1
+
+
+def _git_revision() -> tp.Dict[str, tp.Any]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root,
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                universal_newlines=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                universal_newlines=True).stdout.strip()
+    except OSError:
+        return dict(commit=None, dirty=None)
+    return dict(commit=commit or None, dirty=bool(status))
+
+
+def _version(distribution: str) -> tp.Optional[str]:
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution(distribution).version
+    except Exception:
+        return None
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+            prog='python -m benchmarks',
+            description='Time the delinter stages on a synthetic corpus.')
+    parser.add_argument('--files', type=int, default=100, help='Number of modules.')
+    parser.add_argument('--imports-per-file', type=int, default=20)
+    parser.add_argument('--warnings-per-file', type=int, default=5)
+    parser.add_argument('--body-lines', type=int, default=100,
+            help='Approximate number of lines after the imports of each module.')
+    parser.add_argument('--wide-import', type=int, default=0, metavar='ALIASES',
+            help='Add a module with an import of that many aliases, eg 5000.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5,
+            help='Number of timed runs of each stage.')
+    parser.add_argument('--stage', action='append', choices=stage_names(),
+            help='Stage to time, can be repeated. All stages by default.')
+    parser.add_argument('--corpus-dir', default=None,
+            help='Write the corpus there and keep it, instead of a temporary folder.')
+    parser.add_argument('--output', default=None,
+            help='Write the JSON results to this file instead of stdout.')
+    return parser
+
+
+def main(args=None):
+    options = get_arg_parser().parse_args(args)
+    root = options.corpus_dir or tempfile.mkdtemp(prefix='delinter-benchmark-')
+    try:
+        corpus = generate_corpus(
+                root,
+                files=options.files,
+                imports_per_file=options.imports_per_file,
+                warnings_per_file=options.warnings_per_file,
+                body_lines=options.body_lines,
+                wide_import=options.wide_import,
+                seed=options.seed)
+        stages = run_stages(corpus, repeat=options.repeat, stages=options.stage)
+        corpus_description = corpus.describe()
+    finally:
+        if not options.corpus_dir:
+            shutil.rmtree(root)
+
+    results = dict(
+            format=RESULTS_FORMAT,
+            revision=_git_revision(),
+            environment=dict(
+                    python=platform.python_version(),
+                    implementation=platform.python_implementation(),
+                    machine=platform.machine(),
+                    delinter=__version__,
+                    libcst=_version('libcst'),
+                    pylint=_version('pylint')),
+            corpus=corpus_description,
+            stages=stages)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    for stage, timing in stages.items():
+        print(f'{stage:24} {timing["min"] * 1000:10.2f} ms', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
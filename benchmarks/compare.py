@@ -0,0 +1,46 @@
+'''
+Compare two JSON results of the benchmarks, stage by stage.
+
+    python -m benchmarks.compare before.json after.json
+'''
+import sys
+import json
+import argparse
+import typing as tp
+
+
+def compare(before: tp.Dict[str, tp.Any], after: tp.Dict[str, tp.Any]) -> tp.List[tp.Tuple]:
+    '''
+    Return (stage, before, after, ratio) for the stages both results timed,
+    with the fastest run of each. A ratio below 1 is a speedup.
+    '''
+    rows = []
+    for stage, timing in before['stages'].items():
+        if stage not in after['stages']:
+            continue
+        old, new = timing['min'], after['stages'][stage]['min']
+        rows.append((stage, old, new, new / old if old else float('inf')))
+    return rows
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+            prog='python -m benchmarks.compare',
+            description='Compare two JSON results of the benchmarks.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    options = parser.parse_args(args)
+    results = []
+    for file_path in (options.before, options.after):
+        with open(file_path) as f:
+            results.append(json.load(f))
+    before, after = results
+    if before['corpus'] != after['corpus']:
+        print('warning: the results are for different corpora', file=sys.stderr)
+    print(f'{"stage":24} {"before ms":>12} {"after ms":>12} {"ratio":>8}')
+    for stage, old, new, ratio in compare(before, after):
+        print(f'{stage:24} {old * 1000:12.2f} {new * 1000:12.2f} {ratio:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
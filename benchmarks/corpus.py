@@ -0,0 +1,159 @@
+'''
+Generate synthetic python trees along with the pylint messages they would get.
+'''
+import os
+import random
+import dataclasses
+import typing as tp
+
+UNUSED_IMPORT = 'W0611(unused-import)'
+REIMPORT = 'W0404(reimported)'
+WIDE_IMPORT_FILE = 'wide_import.py'
+
+
+@dataclasses.dataclass
+class Corpus:
+    '''
+    The files of a synthetic tree and the pylint messages of the tree, in the
+    format the delinter parses.
+    '''
+    root: str
+    files: tp.List[str]
+    pylint_messages: tp.List[str]
+    settings: tp.Dict[str, int]
+
+    @property
+    def lines(self) -> int:
+        return sum(_count_lines(file_path) for file_path in self.files)
+
+    @property
+    def size(self) -> int:
+        return sum(os.path.getsize(file_path) for file_path in self.files)
+
+    def describe(self) -> tp.Dict[str, int]:
+        return dict(
+                self.settings,
+                file_count=len(self.files),
+                line_count=self.lines,
+                byte_count=self.size,
+                warning_count=len(self.pylint_messages))
+
+
+def _count_lines(file_path: str) -> int:
+    with open(file_path, 'rb') as f:
+        return f.read().count(b'\n')
+
+
+def _message(file_path: str, line_no: int, code: str, text: str) -> str:
+    return f'{file_path}:{line_no}:[{code},]{text}'
+
+
+def _unused_import(kind: int, k: int) -> tp.Tuple[str, str]:
+    # the four forms of unused imports pylint reports, and their message
+    if kind == 0:
+        return f'import module_{k}', f'Unused import module_{k}'
+    if kind == 1:
+        return (f'import package_{k}.module as alias_{k}',
+                f'Unused package_{k}.module imported as alias_{k}')
+    if kind == 2:
+        return (f'from package_{k} import name_{k}',
+                f'Unused name_{k} imported from package_{k}')
+    return (f'from package_{k} import name_{k} as alias_{k}',
+            f'Unused name_{k} imported from package_{k} as alias_{k}')
+
+
+def _module_source(file_path: str,
+        imports_per_file: int,
+        warnings_per_file: int,
+        body_lines: int,
+        rng: random.Random) -> tp.Tuple[str, tp.List[str]]:
+    # every fifth warning is a reimport of a used module, the others are
+    # unused imports
+    reimport_count = warnings_per_file // 5
+    unused_count = min(warnings_per_file - reimport_count, imports_per_file)
+    unused = set(rng.sample(range(imports_per_file), unused_count))
+    used_count = imports_per_file - unused_count
+    reimport_count = min(reimport_count, used_count)
+
+    lines = [f'"""Generated module {os.path.basename(file_path)}."""']
+    messages = []
+    used = []
+    for k in range(imports_per_file):
+        if k in unused:
+            statement, text = _unused_import(k % 4, k)
+            lines.append(statement)
+            messages.append(_message(file_path, len(lines), UNUSED_IMPORT, text))
+        else:
+            lines.append(f'import used_{k}')
+            used.append((k, len(lines)))
+    for k, line_no in used[:reimport_count]:
+        lines.append(f'import used_{k}')
+        messages.append(_message(file_path, len(lines), REIMPORT,
+                f"Reimport 'used_{k}' (imported line {line_no})"))
+
+    lines.append('')
+    for i in range(body_lines // 3):
+        name = f'used_{used[i % len(used)][0]}' if used else 'None'
+        lines.extend((
+                f'def function_{i}(value={i}):',
+                f'    return {name}, value * {i} + len(str(value))',
+                ''))
+    return '\n'.join(lines) + '\n', messages
+
+
+def _wide_import_source(file_path: str, alias_count: int) -> tp.Tuple[str, tp.List[str]]:
+    # one `import` and one parenthesized `from` import of `alias_count`
+    # aliases each, every other alias unused
+    names = ', '.join(f'wide_{k}' for k in range(alias_count))
+    lines = [f'import {names}', 'from wide_package import (']
+    lines.extend(f'    name_{k},' for k in range(alias_count))
+    lines.extend((')', ''))
+    messages = []
+    for k in range(0, alias_count, 2):
+        messages.append(_message(file_path, 1, UNUSED_IMPORT, f'Unused import wide_{k}'))
+        messages.append(_message(file_path, 2, UNUSED_IMPORT,
+                f'Unused name_{k} imported from wide_package'))
+    lines.extend(f'print(wide_{k}, name_{k})' for k in range(1, alias_count, 2))
+    return '\n'.join(lines) + '\n', messages
+
+
+def generate_corpus(root: str,
+        files: int = 100,
+        imports_per_file: int = 20,
+        warnings_per_file: int = 5,
+        body_lines: int = 100,
+        wide_import: int = 0,
+        seed: int = 0) -> Corpus:
+    '''
+    Write a tree of `files` modules under `root`, spread over packages of
+    up to 50 modules. Each module has `imports_per_file` imports and
+    `warnings_per_file` warnings, unused imports and reimports, followed by
+    about `body_lines` lines of functions. With `wide_import`, a module with
+    an `import` and a `from` import of that many aliases is added.
+
+    The same arguments always generate the same tree.
+    '''
+    rng = random.Random(seed)
+    corpus = Corpus(root, [], [], dict(
+            files=files,
+            imports_per_file=imports_per_file,
+            warnings_per_file=warnings_per_file,
+            body_lines=body_lines,
+            wide_import=wide_import,
+            seed=seed))
+    sources = []
+    for i in range(files):
+        file_path = os.path.join(root, f'package_{i // 50}', f'module_{i}.py')
+        sources.append((file_path, *_module_source(
+                file_path, imports_per_file, warnings_per_file, body_lines, rng)))
+    if wide_import:
+        file_path = os.path.join(root, WIDE_IMPORT_FILE)
+        sources.append((file_path, *_wide_import_source(file_path, wide_import)))
+
+    for file_path, source_code, messages in sources:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(source_code)
+        corpus.files.append(file_path)
+        corpus.pylint_messages.extend(messages)
+    return corpus
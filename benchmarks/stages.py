@@ -0,0 +1,116 @@
+'''
+Time each stage of the delinter on a corpus, separately from the others.
+'''
+import os
+import time
+import difflib
+import statistics
+import typing as tp
+
+import libcst as cst
+
+from delinter.diffs import unified_diff
+from delinter.imports import WarningIndex
+from delinter.imports import transform_module
+from delinter.main import Delinter
+from delinter.main import SUPPORTED_LINTER_MAP
+from delinter.main import get_transformer
+from delinter.reports import parse_report
+from delinter.reports import read_report
+
+from benchmarks.corpus import Corpus
+
+COMBINED = 'combined'
+
+
+def _timed(func: tp.Callable[[], tp.Any], repeat: int) -> tp.Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return dict(
+            min=min(timings),
+            median=statistics.median(timings),
+            max=max(timings),
+            repeat=repeat)
+
+
+def _visit_stage(modules, sources, warning_index: WarningIndex, msg_ids: tp.Tuple[str, ...],
+        metadata: bool = False):
+    def visit():
+        for (file_path, module), (_, source_code) in zip(modules, sources):
+            transformer = get_transformer(msg_ids, warning_index.for_file(file_path))
+            if metadata:
+                cst.MetadataWrapper(module).visit(transformer)
+            else:
+                transform_module(module, transformer, source_code)
+    return visit
+
+
+def stage_names() -> tp.List[str]:
+    return ['parse_linter_warnings', 'parse_report', 'read_report', 'index_warnings', 'parse_module',
+            *(f'visit_{msg_id}' for msg_id in SUPPORTED_LINTER_MAP),
+            f'visit_{COMBINED}', f'visit_{COMBINED}_metadata', 'diff_edits', 'diff_difflib']
+
+
+def run_stages(corpus: Corpus,
+        repeat: int = 5,
+        stages: tp.Optional[tp.Iterable[str]] = None) -> tp.Dict[str, tp.Dict[str, float]]:
+    '''
+    Time the `stages` of delinting the `corpus`, all of them by default, and
+    return the min, median and max wall time in seconds of `repeat` runs of
+    each stage over the whole corpus.
+
+    Every stage runs on the output of the previous stages prepared ahead, so
+    it only measures itself: `visit_*` includes the line numbers the fix
+    needs, `visit_combined_metadata` visits with the copy and the positions
+    of a `MetadataWrapper` instead, and `diff_*` only builds the diffs of the
+    fixed modules. `parse_report` parses the same messages as a single
+    report text, and `read_report` from a memory mapped report file.
+    '''
+    stages = list(stages or stage_names())
+    unknown = set(stages) - set(stage_names())
+    if unknown:
+        raise ValueError(f'Unknown stages: {", ".join(sorted(unknown))}')
+    msg_ids = tuple(SUPPORTED_LINTER_MAP)
+    messages = corpus.pylint_messages
+    warnings = Delinter.parse_linter_warnings(messages, msg_ids)
+    warning_index = WarningIndex(warnings)
+    sources = []
+    for file_path in corpus.files:
+        with open(file_path) as f:
+            sources.append((file_path, f.read()))
+    report = '\n'.join(messages) + '\n'
+    report_path = os.path.join(corpus.root, 'report.txt')
+    with open(report_path, 'w') as f:
+        f.write(report)
+    delinter_classes = {msg_id: SUPPORTED_LINTER_MAP[msg_id][0] for msg_id in msg_ids}
+    modules = [(file_path, cst.parse_module(source_code)) for file_path, source_code in sources]
+
+    funcs: tp.Dict[str, tp.Callable[[], tp.Any]] = {
+            'parse_linter_warnings': lambda: Delinter.parse_linter_warnings(messages, msg_ids),
+            'parse_report': lambda: parse_report(report, delinter_classes),
+            'read_report': lambda: read_report(report_path, delinter_classes),
+            'index_warnings': lambda: WarningIndex(warnings),
+            'parse_module': lambda: [cst.parse_module(source_code) for _, source_code in sources],
+            f'visit_{COMBINED}': _visit_stage(modules, sources, warning_index, msg_ids),
+            f'visit_{COMBINED}_metadata': _visit_stage(
+                    modules, sources, warning_index, msg_ids, metadata=True),
+            }
+    for msg_id in SUPPORTED_LINTER_MAP:
+        funcs[f'visit_{msg_id}'] = _visit_stage(modules, sources, warning_index, (msg_id,))
+
+    if {'diff_edits', 'diff_difflib'} & set(stages):
+        fixes = []
+        for (file_path, module), (_, source_code) in zip(modules, sources):
+            transformer = get_transformer(msg_ids, warning_index.for_file(file_path))
+            fixed_code = transform_module(module, transformer, source_code).code
+            fixes.append((source_code.splitlines(True), transformer.edits,
+                    fixed_code.splitlines(True)))
+        funcs['diff_edits'] = lambda: [unified_diff(lines, edits, 'a', 'b')
+                for lines, edits, _ in fixes]
+        funcs['diff_difflib'] = lambda: ["".join(difflib.unified_diff(lines, fixed_lines, 'a', 'b'))
+                for lines, _, fixed_lines in fixes]
+
+    return {stage: _timed(funcs[stage], repeat) for stage in stages}
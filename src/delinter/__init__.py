@@ -9,3 +9,12 @@ except DistributionNotFound:
     __version__ = 'unknown'
 finally:
     del get_distribution, DistributionNotFound
+
+
+def __getattr__(name):
+    # imported on first use, so that `python -m delinter.main` does not
+    # import the command line before running it
+    if name == 'DelinterSession':
+        from delinter.session import DelinterSession
+        return DelinterSession
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,123 @@
+'''
+Persistent cache of the lint warnings and computed fixes of each file, keyed
+by the content of the file, so unchanged files skip the linter and the parser.
+'''
+import os
+import json
+import uuid
+import hashlib
+import logging
+import typing as tp
+
+from pkg_resources import get_distribution, DistributionNotFound
+
+from delinter import __version__
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+# bump when the layout of the cached entries changes
+CACHE_FORMAT = 2
+
+
+def _distribution_version(dist_name: str) -> str:
+    try:
+        return get_distribution(dist_name).version
+    except DistributionNotFound:
+        return 'unknown'
+
+
+class ResultCache:
+    '''
+    Content-addressed store of json entries under `directory`.
+
+    An entry is keyed by the hash of the file content, the file name, the
+    versions of the delinter, pylint and libcst, and the `settings` of the
+    run. Entries are written to a temporary file and renamed into place, so
+    a directory can be shared by concurrent runs and warmed by other
+    machines. Once the directory grows past `max_bytes`, the least recently
+    used entries are evicted.
+    '''
+
+    def __init__(self, directory: tp.Union[str, os.PathLike],
+            max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        self._salt = json.dumps([
+                CACHE_FORMAT,
+                __version__,
+                _distribution_version('pylint'),
+                _distribution_version('libcst')]).encode()
+
+    def key(self, file_path: tp.Union[str, os.PathLike], source: bytes,
+            settings: tp.Iterable[str]) -> str:
+        digest = hashlib.sha256(self._salt)
+        # the file name matters, eg pylint ignores unused imports in __init__.py
+        digest.update(json.dumps([os.path.basename(file_path), *settings]).encode())
+        digest.update(b'\0')
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key: str) -> tp.Optional[tp.Dict[str, tp.Any]]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            # the modification time tracks the last use for the eviction
+            os.utime(entry_path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: tp.Dict[str, tp.Any]):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f'{entry_path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+        self._written += 1
+
+    def evict(self):
+        '''
+        Delete the least recently used entries until the cache fits in
+        `max_bytes`. Nothing is scanned unless entries were written.
+        '''
+        if not self._written:
+            return
+        entries = []
+        total = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, entry_path in entries:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+        _logger.debug('Evicted cache entries down to %s bytes', total)
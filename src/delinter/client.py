@@ -0,0 +1,85 @@
+'''
+Send fix requests to a long running delinter server, see `delinter.server`,
+and start the server on demand.
+
+Requests and responses are json objects, one per line.
+'''
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import subprocess
+import typing as tp
+
+from delinter import __version__
+
+DEFAULT_IDLE_TIMEOUT = 600
+DEFAULT_START_TIMEOUT = 30
+
+_NOT_RUNNING = (FileNotFoundError, ConnectionRefusedError)
+
+
+def default_socket_path() -> str:
+    '''
+    Return the socket of the server of this user and delinter version, so
+    that a server left running by another version is not reused.
+    '''
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f'delinter-{os.getuid()}-{__version__}.sock')
+
+
+def send_request(socket_path: str, payload: tp.Dict[str, tp.Any],
+        timeout: tp.Optional[float] = None) -> tp.Dict[str, tp.Any]:
+    '''
+    Send `payload` to the server listening on `socket_path` and return its
+    response. An error reported by the server is raised as a ValueError.
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f'The delinter server on {socket_path} closed the connection')
+    response = json.loads(line)
+    if 'error' in response:
+        raise ValueError(f'delinter server: {response["error"]}')
+    return response
+
+
+def start_server(socket_path: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+    '''
+    Start a server on `socket_path` in the background. It outlives this
+    process and exits once it received no request for `idle_timeout` seconds.
+    '''
+    subprocess.Popen(
+            [sys.executable, '-c', 'from delinter.main import run; run()',
+                    '--serve', '--socket', socket_path, '--idle-timeout', str(idle_timeout)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True)
+
+
+def request(socket_path: str, payload: tp.Dict[str, tp.Any],
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        start_timeout: float = DEFAULT_START_TIMEOUT) -> tp.Dict[str, tp.Any]:
+    '''
+    Send `payload` to the server on `socket_path` and return its response,
+    starting the server first if it is not running.
+    '''
+    try:
+        return send_request(socket_path, payload)
+    except _NOT_RUNNING:
+        start_server(socket_path, idle_timeout)
+    deadline = time.monotonic() + start_timeout
+    while True:
+        try:
+            return send_request(socket_path, payload)
+        except _NOT_RUNNING:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
@@ -0,0 +1,178 @@
+'''
+Build unified diffs from the edits the transformers record, instead of
+matching the whole module before and after the fix.
+'''
+import io
+import difflib
+import dataclasses
+import typing as tp
+
+CONTEXT_LINES = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class Edit:
+    '''
+    Replace the lines `start_line` to `end_line` of the original module, both
+    1-based and inclusive, with `lines`. Each line keeps its line ending.
+    '''
+    start_line: int
+    end_line: int
+    lines: tp.Tuple[str, ...] = ()
+
+
+# an opcode of difflib.SequenceMatcher, (tag, i1, i2, j1, j2), followed by
+# the new lines of a change
+_Opcode = tp.Tuple[str, int, int, int, int, tp.List[str]]
+
+
+def split_lines(text: str) -> tp.List[str]:
+    '''
+    Split `text` into lines that keep their line endings, only at the line
+    endings python counts, unlike `str.splitlines`, which also splits at
+    form feeds and other separators.
+    '''
+    return io.StringIO(text, newline='').readlines()
+
+
+def apply_edits(lines: tp.Sequence[str], edits: tp.Iterable[Edit]) -> tp.List[str]:
+    '''
+    Return the lines of the module with the `edits` applied. The edits must
+    be in order and must not overlap.
+    '''
+    fixed = []
+    position = 0
+    for edit in edits:
+        start = edit.start_line - 1
+        if start < position or edit.end_line > len(lines):
+            raise ValueError(f'Edit of lines {edit.start_line}-{edit.end_line} is out of order.')
+        fixed.extend(lines[position:start])
+        fixed.extend(edit.lines)
+        position = edit.end_line
+    fixed.extend(lines[position:])
+    return fixed
+
+
+def _trimmed(lines: tp.Sequence[str],
+        edits: tp.Iterable[Edit]) -> tp.Iterator[tp.Tuple[int, int, tp.List[str]]]:
+    # only keep the lines that differ, as difflib would
+    for edit in edits:
+        i1, i2 = edit.start_line - 1, edit.end_line
+        new = list(edit.lines)
+        while i1 < i2 and new and lines[i1] == new[0]:
+            i1 += 1
+            new.pop(0)
+        while i1 < i2 and new and lines[i2 - 1] == new[-1]:
+            i2 -= 1
+            new.pop()
+        if i1 == i2 and not new:
+            continue
+        yield i1, i2, new
+
+
+def _opcodes(lines: tp.Sequence[str], edits: tp.Iterable[Edit]) -> tp.List[_Opcode]:
+    changes = []
+    for i1, i2, new in _trimmed(lines, edits):
+        if changes and changes[-1][1] == i1:
+            # adjacent edits are a single change
+            changes[-1] = (changes[-1][0], i2, changes[-1][2] + new)
+        else:
+            changes.append((i1, i2, new))
+
+    opcodes = []
+    i = j = 0
+    for i1, i2, new in changes:
+        j1 = j + i1 - i
+        if i1 > i:
+            opcodes.append(('equal', i, i1, j, j1, []))
+        j2 = j1 + len(new)
+        tag = 'replace' if i1 < i2 and new else 'delete' if i1 < i2 else 'insert'
+        opcodes.append((tag, i1, i2, j1, j2, new))
+        i, j = i2, j2
+    if i < len(lines):
+        opcodes.append(('equal', i, len(lines), j, j + len(lines) - i, []))
+    return opcodes
+
+
+def changed_edits(lines: tp.Sequence[str], edits: tp.Iterable[Edit]) -> tp.List[Edit]:
+    '''
+    Return the `edits` trimmed to the lines they change, without the edits
+    that change nothing. The diff of the trimmed edits is the same.
+    '''
+    return [Edit(i1 + 1, i2, tuple(new)) for i1, i2, new in _trimmed(lines, edits)]
+
+
+def edits_from_lines(lines: tp.Sequence[str], fixed_lines: tp.Sequence[str]) -> tp.List[Edit]:
+    '''
+    Return the edits turning `lines` into `fixed_lines`, matched by difflib.
+    '''
+    matcher = difflib.SequenceMatcher(None, lines, fixed_lines)
+    return [Edit(i1 + 1, i2, tuple(fixed_lines[j1:j2]))
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def edit_to_dict(edit: Edit) -> tp.Dict[str, tp.Any]:
+    return dict(start_line=edit.start_line, end_line=edit.end_line, lines=list(edit.lines))
+
+
+def edit_from_dict(fields: tp.Dict[str, tp.Any]) -> Edit:
+    return Edit(fields['start_line'], fields['end_line'], tuple(fields['lines']))
+
+
+def _grouped_opcodes(opcodes: tp.List[_Opcode], n: int) -> tp.Iterator[tp.List[_Opcode]]:
+    # the grouping of difflib.SequenceMatcher.get_grouped_opcodes
+    if not any(tag != 'equal' for tag, *_ in opcodes):
+        return
+    if opcodes[0][0] == 'equal':
+        tag, i1, i2, j1, j2, new = opcodes[0]
+        opcodes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2, new
+    if opcodes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2, new = opcodes[-1]
+        opcodes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n), new
+    group = []
+    for tag, i1, i2, j1, j2, new in opcodes:
+        if tag == 'equal' and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n), new))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2, new))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    # the range format of difflib.unified_diff
+    length = stop - start
+    if length == 1:
+        return f'{start + 1}'
+    if not length:
+        return f'{start},0'
+    return f'{start + 1},{length}'
+
+
+def unified_diff(lines: tp.Sequence[str],
+        edits: tp.Iterable[Edit],
+        fromfile: str,
+        tofile: str,
+        n: int = CONTEXT_LINES) -> str:
+    '''
+    Return the unified diff of applying the `edits` to the `lines` of a
+    module, in the format of `difflib.unified_diff`. Only the edited lines and
+    their context are visited, so the cost follows the number of edits
+    rather than the size of the module.
+    '''
+    output = []
+    for group in _grouped_opcodes(_opcodes(lines, edits), n):
+        if not output:
+            output.append(f'--- {fromfile}\n+++ {tofile}\n')
+        first, last = group[0], group[-1]
+        output.append(f'@@ -{_format_range(first[1], last[2])} '
+                f'+{_format_range(first[3], last[4])} @@\n')
+        for tag, i1, i2, _, _, new in group:
+            if tag == 'equal':
+                output.extend(' ' + line for line in lines[i1:i2])
+                continue
+            output.extend('-' + line for line in lines[i1:i2])
+            output.extend('+' + line for line in new)
+    return ''.join(output)
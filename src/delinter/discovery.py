@@ -0,0 +1,442 @@
+'''
+Find the python files a run lints and fixes.
+'''
+import os
+import re
+import heapq
+import fnmatch
+import hashlib
+import subprocess
+import dataclasses
+import typing as tp
+from pathlib import Path
+
+# folders that never hold code of the project, pruned from every walk
+DEFAULT_EXCLUDED_DIRS = frozenset((
+        '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv', '.eggs', '__pycache__',
+        '__pypackages__', '.mypy_cache', '.pytest_cache', 'node_modules', 'site-packages'))
+
+# markers of a generated file in the comments at its top, eg the header of
+# the modules of protoc
+_GENERATED_MARKERS = re.compile(
+        rb'^#.*(?:@generated|do not edit|generated by|auto-?generated)', re.I | re.M)
+_GENERATED_HEADER_BYTES = 2048
+
+
+@dataclasses.dataclass(frozen=True)
+class FileFilter:
+    '''
+    Which of the .py files under a folder a run lints and fixes. The
+    `exclude` and `include` globs are matched against the path relative to
+    the folder and against the name, with fnmatch. An excluded folder is not
+    walked. With `include`, only the matching files are kept. Files larger
+    than `max_size` bytes, and with `skip_generated` the files whose leading
+    comments say they are generated, are skipped.
+    '''
+    exclude: tp.Tuple[str, ...] = ()
+    include: tp.Tuple[str, ...] = ()
+    gitignore: bool = True
+    max_size: tp.Optional[int] = None
+    skip_generated: bool = False
+
+
+def _globs_pattern(globs: tp.Iterable[str]) -> tp.Optional[tp.Pattern[str]]:
+    globs = list(globs)
+    if not globs:
+        return None
+    return re.compile('|'.join(fnmatch.translate(glob) for glob in globs))
+
+
+def is_generated(file_path: tp.Union[str, os.PathLike]) -> bool:
+    '''
+    Tell if the comments at the top of the file mark it as generated.
+    '''
+    with open(file_path, 'rb') as f:
+        header = f.read(_GENERATED_HEADER_BYTES)
+    # only the comments before the code count
+    end = re.search(rb'^[ \t]*[^#\s]', header, re.M)
+    return bool(_GENERATED_MARKERS.search(header, 0, end.start() if end else len(header)))
+
+
+class _Matcher:
+    '''
+    The exclude and include globs of a `FileFilter`, matched against paths
+    relative to the root of the walk.
+    '''
+
+    def __init__(self, file_filter: FileFilter):
+        self.file_filter = file_filter
+        self.exclude = _globs_pattern(file_filter.exclude)
+        self.include = _globs_pattern(file_filter.include)
+
+    def excluded_dir(self, relative_path: str, name: str) -> bool:
+        return (name in DEFAULT_EXCLUDED_DIRS or name.endswith('.egg-info')
+                or self.excluded(relative_path, name))
+
+    def excluded(self, relative_path: str, name: str) -> bool:
+        return self.exclude is not None and bool(
+                self.exclude.match(relative_path) or self.exclude.match(name))
+
+    def selected_file(self, relative_path: str, name: str,
+            file_path: tp.Union[str, os.PathLike], size: int) -> bool:
+        file_filter = self.file_filter
+        if self.excluded(relative_path, name):
+            return False
+        if self.include is not None and not (
+                self.include.match(relative_path) or self.include.match(name)):
+            return False
+        if file_filter.max_size is not None and size > file_filter.max_size:
+            return False
+        return not (file_filter.skip_generated and is_generated(file_path))
+
+
+class _IgnoreFile:
+    '''
+    The patterns of a .gitignore file. `prefix` and `strip` turn a path
+    relative to the root of the walk into a path relative to the folder of
+    the .gitignore file.
+    '''
+
+    def __init__(self, lines: tp.Iterable[str], prefix: str = '', strip: int = 0):
+        self.prefix = prefix
+        self.strip = strip
+        self.rules: tp.List[tp.Tuple[tp.Pattern[str], bool, bool]] = []
+        for line in lines:
+            rule = _ignore_rule(line)
+            if rule is not None:
+                self.rules.append(rule)
+        # without negations, any match ignores the path, so the patterns are
+        # matched at once
+        self.negations = any(negated for _, negated, _ in self.rules)
+        self.files = _union(pattern for pattern, _, dir_only in self.rules if not dir_only)
+        self.dirs = _union(pattern for pattern, _, _ in self.rules)
+
+    def match(self, relative_path: str, is_dir: bool) -> tp.Optional[bool]:
+        '''
+        Return True if the path is ignored, False if it is negated, and None
+        if no pattern matches it.
+        '''
+        relative_path = self.prefix + relative_path[self.strip:]
+        if not self.negations:
+            pattern = self.dirs if is_dir else self.files
+            return True if pattern is not None and pattern.match(relative_path) else None
+        ignored = None
+        for pattern, negated, dir_only in self.rules:
+            if (is_dir or not dir_only) and pattern.match(relative_path):
+                ignored = not negated
+        return ignored
+
+
+def _union(patterns: tp.Iterable[tp.Pattern[str]]) -> tp.Optional[tp.Pattern[str]]:
+    patterns = [pattern.pattern for pattern in patterns]
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns)) if patterns else None
+
+
+def _ignore_rule(line: str) -> tp.Optional[tp.Tuple[tp.Pattern[str], bool, bool]]:
+    # the pattern, if it is negated with `!`, and if it only matches folders
+    line = line.rstrip('\n')
+    if not line.endswith('\\ '):
+        line = line.rstrip(' ')
+    if not line or line.startswith('#'):
+        return None
+    negated = line.startswith('!')
+    if negated or line.startswith('\\'):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    # a pattern with a slash is relative to the .gitignore file, other
+    # patterns match a name in any folder below it
+    anchored = '/' in line
+    line = line.lstrip('/')
+    if not line:
+        return None
+    regex = ''
+    i = 0
+    while i < len(line):
+        if line.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif line.startswith('**', i) and i + 2 == len(line):
+            regex += '.*'
+            i += 2
+        elif line[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif line[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif line[i] == '[' and ']' in line[i + 2:]:
+            end = line.index(']', i + 2)
+            chars = line[i + 1:end]
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            regex += '[' + chars.replace('\\', '\\\\') + ']'
+            i = end + 1
+        elif line[i] == '\\' and i + 1 < len(line):
+            regex += re.escape(line[i + 1])
+            i += 2
+        else:
+            regex += re.escape(line[i])
+            i += 1
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return re.compile(regex + r'\Z'), negated, dir_only
+
+
+def _read_ignore_file(dir_path: str, prefix: str = '', strip: int = 0) -> tp.Optional[_IgnoreFile]:
+    try:
+        with open(os.path.join(dir_path, '.gitignore'), encoding='utf-8', errors='replace') as f:
+            return _IgnoreFile(f, prefix, strip)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _parent_ignore_files(root: str) -> tp.List[_IgnoreFile]:
+    # the .gitignore files of the folders above the root, up to the top of
+    # its repository, outermost first, none outside of a repository
+    ignore_files = []
+    path = os.path.abspath(root)
+    prefix = ''
+    while not os.path.exists(os.path.join(path, '.git')):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return []
+        prefix = os.path.basename(path) + '/' + prefix
+        path = parent
+        ignore_file = _read_ignore_file(path, prefix)
+        if ignore_file is not None:
+            ignore_files.append(ignore_file)
+    return ignore_files[::-1]
+
+
+def _ignored(ignore_files: tp.Sequence[_IgnoreFile], relative_path: str, is_dir: bool) -> bool:
+    # the last match wins, the .gitignore files of the inner folders coming last
+    for ignore_file in reversed(ignore_files):
+        ignored = ignore_file.match(relative_path, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+def find_python_files(root_file_path: tp.Union[str, os.PathLike],
+        file_filter: FileFilter = FileFilter()) -> tp.List[Path]:
+    '''
+    Return the .py files under the folder `root_file_path` that pass the
+    `file_filter`, sorted, with paths built on `root_file_path` like those of
+    a glob of the folder.
+
+    The folder is walked once with os.scandir. The folders of
+    `DEFAULT_EXCLUDED_DIRS`, the excluded folders and, unless
+    `file_filter.gitignore` is False, the folders ignored by the .gitignore
+    files of the folder, of its subfolders and of its parents in the same
+    repository are never entered. Symbolic links to folders are not followed.
+    '''
+    root = Path(root_file_path)
+    matcher = _Matcher(file_filter)
+    files = []
+    ignore_files = _parent_ignore_files(root) if file_filter.gitignore else []
+    # the folders to walk, with their path relative to the root and the
+    # .gitignore files that apply to them
+    pending = [(str(root), '', ignore_files)]
+    while pending:
+        dir_path, relative_dir, ignore_files = pending.pop()
+        if file_filter.gitignore:
+            ignore_file = _read_ignore_file(
+                    dir_path, strip=len(relative_dir) + 1 if relative_dir else 0)
+            if ignore_file is not None:
+                ignore_files = [*ignore_files, ignore_file]
+        try:
+            entries = list(os.scandir(dir_path))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+        for entry in entries:
+            name = entry.name
+            relative_path = f'{relative_dir}/{name}' if relative_dir else name
+            if entry.is_dir(follow_symlinks=False):
+                if (matcher.excluded_dir(relative_path, name)
+                        or _ignored(ignore_files, relative_path, True)):
+                    continue
+                pending.append((entry.path, relative_path, ignore_files))
+            elif (name.endswith('.py') and entry.is_file()
+                    and not _ignored(ignore_files, relative_path, False)
+                    and matcher.selected_file(relative_path, name, entry.path,
+                            entry.stat().st_size if file_filter.max_size is not None else 0)):
+                files.append(root / relative_path)
+    return sorted(files)
+
+
+def filter_files(files: tp.Iterable[tp.Union[str, os.PathLike]],
+        root_file_path: tp.Union[str, os.PathLike],
+        file_filter: FileFilter) -> tp.List:
+    '''
+    Keep the `files` under `root_file_path` that `find_python_files` would
+    find with the `file_filter`, eg those of `git_changed_files`, apart from
+    the .gitignore files, which git already took into account.
+    '''
+    matcher = _Matcher(file_filter)
+    selected = []
+    for file_path in files:
+        relative_path = os.path.relpath(file_path, root_file_path)
+        # a file passed as the root itself is relative to its folder
+        parts = Path(relative_path if relative_path != '.' else Path(file_path).name).parts
+        if any(matcher.excluded_dir('/'.join(parts[:i + 1]), parts[i])
+                for i in range(len(parts) - 1)):
+            continue
+        size = os.path.getsize(file_path) if file_filter.max_size is not None else 0
+        if matcher.selected_file('/'.join(parts), parts[-1], file_path, size):
+            selected.append(file_path)
+    return selected
+
+
+def _git(cwd: str, *args: str) -> str:
+    try:
+        completed = subprocess.run(
+                ['git', *args],
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True)
+    except OSError as e:
+        raise ValueError(f'Unable to run git: {e}')
+    if completed.returncode != 0:
+        raise ValueError(f'git {" ".join(args)} failed: {completed.stderr.strip()}')
+    return completed.stdout
+
+
+def git_changed_files(root_file_path: tp.Union[str, os.PathLike],
+        rev: tp.Optional[str] = None,
+        staged: bool = False) -> tp.List[Path]:
+    '''
+    Return the added, copied, modified and renamed .py files under
+    `root_file_path`, either staged in the index or changed since the point
+    where the current branch forked from `rev`, including uncommitted changes.
+
+    The paths are built on `root_file_path` the same way a glob of the folder
+    would build them, so the diff headers do not depend on the discovery.
+    '''
+    # git reports the paths of the resolved top level folder
+    root = os.path.realpath(root_file_path)
+    cwd = root if os.path.isdir(root) else os.path.dirname(root)
+    top_level = _git(cwd, 'rev-parse', '--show-toplevel').strip()
+
+    diff_args = ['diff', '--name-only', '-z', '--diff-filter=ACMR']
+    if staged:
+        diff_args.append('--cached')
+    else:
+        if rev is None:
+            raise ValueError('A git revision is required unless the staged files are used.')
+        try:
+            # compare with the fork point, not with where `rev` is now
+            rev = _git(cwd, 'merge-base', rev, 'HEAD').strip()
+        except ValueError:
+            pass
+        diff_args.append(rev)
+    diff_args.append('--')
+
+    files = []
+    for name in _git(top_level, *diff_args).split('\0'):
+        if not name.endswith('.py'):
+            continue
+        file_path = os.path.normpath(os.path.join(top_level, name))
+        if file_path != root and not file_path.startswith(root + os.sep):
+            continue
+        if file_path == root:
+            files.append(Path(root_file_path))
+        else:
+            files.append(Path(root_file_path) / os.path.relpath(file_path, root))
+    return sorted(files)
+
+
+def parse_shard(shard: str) -> tp.Tuple[int, int]:
+    '''
+    Parse a shard `i/N`, the i-th of N shards counted from 1.
+    '''
+    try:
+        index, count = (int(part) for part in shard.split('/'))
+    except ValueError:
+        raise ValueError(f'Invalid shard {shard!r}, expected i/N, eg 1/4')
+    if not 1 <= index <= count:
+        raise ValueError(f'Invalid shard {shard!r}, i must be between 1 and N')
+    return index, count
+
+
+def _shard_key(file_path: tp.Union[str, os.PathLike],
+        root_file_path: tp.Union[str, os.PathLike]) -> str:
+    # relative to the root and with forward slashes, so that every node
+    # shards the same way wherever its checkout is
+    return Path(os.path.relpath(file_path, root_file_path)).as_posix()
+
+
+def shard_files(files: tp.Sequence[tp.Union[str, os.PathLike]],
+        shard: tp.Tuple[int, int],
+        root_file_path: tp.Union[str, os.PathLike],
+        by_size: bool = False) -> tp.List:
+    '''
+    Return the `files` of the `shard` (i, N), in their order. A file is
+    assigned by a hash of its path relative to `root_file_path`, so each file
+    always lands in the same shard whatever the other files are.
+
+    With `by_size`, the files are instead spread so that the shards have
+    about the same number of bytes: the largest files go first, each to the
+    shard with the fewest bytes so far. Every shard must then see the same
+    files with the same sizes, eg the same commit.
+    '''
+    index, count = shard
+    if count == 1:
+        return list(files)
+    if not by_size:
+        def shard_of(file_path):
+            digest = hashlib.sha1(_shard_key(file_path, root_file_path).encode('utf-8')).digest()
+            return int.from_bytes(digest[:8], 'big') % count
+        return [file_path for file_path in files if shard_of(file_path) == index - 1]
+
+    bins = _balance([os.path.getsize(file_path) for file_path in files],
+            [_shard_key(file_path, root_file_path) for file_path in files], count)
+    return [file_path for file_path, bin_index in zip(files, bins) if bin_index == index - 1]
+
+
+def _balance(sizes: tp.Sequence[int], keys: tp.Sequence[str], count: int) -> tp.List[int]:
+    # the bin of each item among `count` bins, the largest items first, each
+    # to the bin with the fewest bytes so far, ties broken by key
+    bins = [0] * len(sizes)
+    loads = [(0, bin_index) for bin_index in range(count)]
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i], keys[i])):
+        load, bin_index = heapq.heappop(loads)
+        bins[i] = bin_index
+        heapq.heappush(loads, (load + sizes[i], bin_index))
+    return bins
+
+
+def chunk_files(files: tp.Sequence[tp.Union[str, os.PathLike]],
+        count: int) -> tp.List[tp.List]:
+    '''
+    Split the `files` in at most `count` chunks with about the same number of
+    bytes, each in the order of `files`, to lint them in parallel. The files
+    of a folder are kept in the same chunk, so that the modules of a package
+    are parsed by a single worker, unless the folder alone is larger than a
+    chunk. The split only depends on the paths and sizes of the files.
+    '''
+    if count <= 1 or len(files) <= 1:
+        return [list(files)] if files else []
+    sizes = [os.path.getsize(file_path) for file_path in files]
+    target = max(sum(sizes) // count, 1)
+    folders: tp.Dict[str, tp.List[int]] = {}
+    for i, file_path in enumerate(files):
+        folders.setdefault(os.path.dirname(os.fspath(file_path)), []).append(i)
+    # a folder larger than a chunk is cut into pieces of about a chunk
+    pieces: tp.List[tp.List[int]] = []
+    for indices in folders.values():
+        pieces.append([])
+        piece_size = 0
+        for i in indices:
+            if pieces[-1] and piece_size + sizes[i] > target:
+                pieces.append([])
+                piece_size = 0
+            pieces[-1].append(i)
+            piece_size += sizes[i]
+    bins = _balance([sum(sizes[i] for i in piece) for piece in pieces],
+            [os.fspath(files[piece[0]]) for piece in pieces], count)
+    chunks: tp.List[tp.List[int]] = [[] for _ in range(count)]
+    for piece, bin_index in zip(pieces, bins):
+        chunks[bin_index].extend(piece)
+    return [[files[i] for i in sorted(chunk)] for chunk in chunks if chunk]
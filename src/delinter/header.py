@@ -0,0 +1,70 @@
+'''
+Split the leading import section off a module, so that only that section
+is parsed and fixed when all the warnings of the module are in it.
+'''
+import io
+import tokenize
+import typing as tp
+
+Source = tp.TypeVar('Source', str, bytes)
+
+_SKIPPED_TOKENS = (tokenize.ENCODING, tokenize.NL, tokenize.COMMENT)
+
+
+def import_header_lines(lines: tp.Sequence[tp.Union[str, bytes]]) -> int:
+    '''
+    Return the number of `lines` before the first top level statement that
+    is neither an import nor the docstring. Only the tokens up to that
+    statement are scanned.
+    '''
+    is_bytes = bool(lines) and isinstance(lines[0], bytes)
+    readline = iter(lines).__next__
+    tokens = tokenize.tokenize(readline) if is_bytes else tokenize.generate_tokens(readline)
+    first_statement = True
+    statement_start = True
+    try:
+        for token in tokens:
+            if token.type in _SKIPPED_TOKENS:
+                continue
+            if token.type == tokenize.NEWLINE:
+                statement_start = True
+                continue
+            if token.type == tokenize.ENDMARKER:
+                break
+            if not statement_start:
+                continue
+            statement_start = False
+            if token.type == tokenize.NAME and token.string in ('import', 'from'):
+                first_statement = False
+                continue
+            if token.type == tokenize.STRING and first_statement:
+                first_statement = False
+                continue
+            return token.start[0] - 1
+    except (tokenize.TokenError, SyntaxError):
+        return 0
+    return len(lines)
+
+
+def split_import_header(source_code: Source,
+        last_line: int) -> tp.Optional[tp.Tuple[Source, Source]]:
+    '''
+    Split `source_code` after its leading import section and return the
+    section and the rest of the module, byte for byte. None is returned if
+    the line `last_line` is not in the section, or if the module has line
+    endings the tokenizer does not split on.
+    '''
+    if isinstance(source_code, bytes):
+        lines = io.BytesIO(source_code).readlines()
+        carriage_return, newline = b'\r', b'\n'
+    else:
+        lines = io.StringIO(source_code).readlines()
+        carriage_return, newline = '\r', '\n'
+    header_lines = import_header_lines(lines)
+    if header_lines < last_line or header_lines == len(lines):
+        return None
+    header = source_code[:0].join(lines[:header_lines])
+    if header.count(carriage_return) != header.count(carriage_return + newline):
+        # lines only ended by a carriage return
+        return None
+    return header, source_code[len(header):]
@@ -1,6 +1,12 @@
 import os
 import re
+import ast
+import sys
+import array
+import bisect
 import typing as tp
+import functools
+import itertools
 import collections
 import dataclasses
 from typing import Set
@@ -9,6 +15,10 @@ from typing import Union
 from collections import defaultdict
 
 import libcst as cst
+from libcst._nodes.internal import CodegenState
+
+from delinter.diffs import Edit
+from delinter.diffs import split_lines
 
 unused_imports: Dict[Union[cst.Import, cst.ImportFrom], Set[str]] = defaultdict(set)
 undefined_references: Dict[cst.CSTNode, Set[str]] = defaultdict(set)
@@ -41,8 +51,35 @@ def _build_dotted_name(import_alias: cst.Attribute):
     return walk(import_alias)
 
 
+def _module_name(module: tp.Optional[tp.Union[cst.Attribute, cst.Name]]) -> str:
+    # relative imports like `from . import x` do not have a module
+    if module is None:
+        return ''
+    return ".".join(_build_dotted_name(module))
+
+
+def _alias_name(import_node: cst.ImportAlias) -> tp.Optional[str]:
+    return None if not import_node.asname else import_node.asname.name.value
+
+
+@functools.lru_cache(maxsize=65536)
+def _normalize_path(file_path: str) -> str:
+    return os.path.abspath(file_path)
+
+
+def normalize_path(file_path: tp.Union[str, os.PathLike]) -> str:
+    '''
+    Normalize a file path so that the paths reported by the linter and the
+    paths found on disk can be used interchangeably as index keys.
+    '''
+    return _normalize_path(str(file_path))
+
+
+# the warnings have slots, as a run over a large tree can hold millions of
+# them, see `WarningIndex` for how a run stores them
 @dataclasses.dataclass
 class BaseWarning:
+    __slots__ = ('file_path', 'line_no')
     file_path: str
     line_no: int
 
@@ -51,50 +88,287 @@ class BaseUnusedImportsWarning(BaseWarning):
     '''
     Sum type class to represent types
     '''
-    pass
+    __slots__ = ()
 
 @dataclasses.dataclass
 class UnusedFromImportsWarning(BaseUnusedImportsWarning):
+    __slots__ = ('import_as_name', 'dotted_as_name', 'alias')
     import_as_name: str
     dotted_as_name: str
     alias: str
 
+    @property
+    def key(self) -> tp.Tuple[str, str, tp.Optional[str]]:
+        return (self.dotted_as_name, self.import_as_name, self.alias)
+
 @dataclasses.dataclass
 class UnusedImportsWarning(BaseUnusedImportsWarning):
+    __slots__ = ('alias', 'dotted_as_name')
     alias: str
     dotted_as_name: str
 
+    @property
+    def key(self) -> tp.Tuple[str, tp.Optional[str]]:
+        return (self.dotted_as_name, self.alias)
+
 
 @dataclasses.dataclass
 class ReimportWarning(BaseUnusedImportsWarning):
+    __slots__ = ('import_as_name',)
     import_as_name: str
 
-class BaseDelinter:
-    pass
+    @property
+    def key(self) -> tp.Tuple[str]:
+        return (self.import_as_name,)
 
-class ReimportDelinter(BaseDelinter):
-    CODE = 'W0404'
 
-    pattern = re.compile(r"Reimport '(?P<dname>.*)'.*")
+WARNING_TYPES: Dict[str, tp.Type[BaseWarning]] = {
+        class_.__name__: class_
+        for class_ in (UnusedImportsWarning, UnusedFromImportsWarning, ReimportWarning)}
 
-    patterns = ((pattern, ReimportWarning), )
+
+def warning_to_dict(warning: BaseWarning) -> tp.Dict[str, tp.Any]:
+    '''
+    Return the fields of the warning, along with its type, as a json friendly dict.
+    '''
+    return dict(type=type(warning).__name__, **dataclasses.asdict(warning))
+
+
+def warning_from_dict(fields: tp.Dict[str, tp.Any], **changes) -> BaseWarning:
+    '''
+    Rebuild a warning from the output of `warning_to_dict`, with optional
+    field `changes` such as a new `file_path`.
+    '''
+    fields = dict(fields, **changes)
+    return WARNING_TYPES[fields.pop('type')](**fields)
+
+
+class FileWarnings:
+    '''
+    Warnings of a single file, keyed by line number and then by the warning
+    type and the names the transformers match an `ImportAlias` on.
+    '''
+
+    def __init__(self, warnings: tp.Iterable[BaseWarning] = ()):
+        self._lines: Dict[int, Dict[tp.Tuple, BaseWarning]] = defaultdict(dict)
+        for warning in warnings:
+            self.add(warning)
+
+    def add(self, warning: BaseWarning):
+        self._lines[warning.line_no][(type(warning), warning.key)] = warning
+
+    def get(self, line_no: int, warning_type: tp.Type[BaseWarning],
+            key: tp.Tuple) -> tp.Optional[BaseWarning]:
+        entries = self._lines.get(line_no)
+        if not entries:
+            return None
+        return entries.get((warning_type, key))
+
+    @property
+    def line_nos(self) -> tp.AbstractSet[int]:
+        return self._lines.keys()
+
+    def __iter__(self) -> tp.Iterator[BaseWarning]:
+        for entries in self._lines.values():
+            yield from entries.values()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._lines.values())
+
+
+# the fields of each warning type after the path and line number, in the
+# order of the constructor, the type of a warning in a `WarningIndex` being
+# its position here
+_WARNING_FIELDS: tp.List[tp.Tuple[tp.Type[BaseWarning], tp.Tuple[str, ...]]] = [
+        (class_, tuple(field.name for field in dataclasses.fields(class_)[2:]))
+        for class_ in WARNING_TYPES.values()]
+_TYPE_CODES = {class_: code for code, (class_, _) in enumerate(_WARNING_FIELDS)}
+_NAME_COLUMNS = max(len(fields) for _, fields in _WARNING_FIELDS)
+
+
+class WarningIndex:
+    '''
+    Warnings of a whole run, keyed by the normalized file path.
+
+    The warnings are not kept as objects but as columns of integers: the
+    type, the line number, and the ids of the reported path and of the names
+    in a table of strings, where every path and name is held once. The
+    `FileWarnings` of a file, that the transformers query with hash lookups,
+    is built from its rows by `for_file`. A warning the linter reported
+    twice is stored twice, and only counts once in its `FileWarnings`.
+    '''
+
+    def __init__(self, warnings: tp.Iterable[BaseWarning] = ()):
+        # the row numbers of each normalized path, in the order of the files
+        self._files: Dict[str, array.array] = {}
+        # id 0 stands for None
+        self._strings: tp.List[tp.Optional[str]] = [None]
+        self._string_ids: Dict[tp.Optional[str], int] = {None: 0}
+        self._types = bytearray()
+        self._line_nos = array.array('I')
+        self._file_paths = array.array('I')
+        self._names = [array.array('I') for _ in range(_NAME_COLUMNS)]
+        for warning in warnings:
+            self.add(warning)
+
+    def _intern(self, value: tp.Optional[str]) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def _rows(self, file_path: str) -> array.array:
+        rows = self._files.get(file_path)
+        if rows is None:
+            rows = self._files[file_path] = array.array('I')
+        return rows
+
+    def add(self, warning: BaseWarning):
+        code = _TYPE_CODES[type(warning)]
+        self._rows(normalize_path(warning.file_path)).append(len(self._types))
+        self._types.append(code)
+        self._line_nos.append(warning.line_no)
+        self._file_paths.append(self._intern(warning.file_path))
+        fields = _WARNING_FIELDS[code][1]
+        for i, column in enumerate(self._names):
+            column.append(self._intern(getattr(warning, fields[i])) if i < len(fields) else 0)
+
+    def update(self, other: 'WarningIndex'):
+        '''
+        Add all the warnings of `other`, a column at a time.
+        '''
+        offset = len(self._types)
+        for file_path, rows in other._files.items():
+            self._rows(file_path).extend(row + offset for row in rows)
+        string_ids = [self._intern(value) for value in other._strings]
+        self._types += other._types
+        self._line_nos += other._line_nos
+        self._file_paths.extend(map(string_ids.__getitem__, other._file_paths))
+        for column, other_column in zip(self._names, other._names):
+            column.extend(map(string_ids.__getitem__, other_column))
+
+    def select(self, msg_ids: tp.Optional[tp.Iterable[str]] = None,
+            files: tp.Optional[tp.Iterable[tp.Union[str, os.PathLike]]] = None
+            ) -> 'WarningIndex':
+        '''
+        Return the warnings of the message ids `msg_ids` about the `files`,
+        all of them by default, as a new index sharing the strings of this one.
+        The rows are picked a column at a time, without building the warnings.
+        '''
+        if files is None:
+            file_paths = list(self._files)
+        else:
+            file_paths = [file_path for file_path in map(normalize_path, files)
+                    if file_path in self._files]
+        mask = None
+        if msg_ids is not None:
+            msg_ids = set(msg_ids)
+            table = bytes(int(_WARNING_CODES[class_] in msg_ids) for class_, _ in _WARNING_FIELDS)
+            # one flag per row, set for the rows of the message ids
+            mask = self._types.translate(table.ljust(256, b'\0'))
+        selected = WarningIndex()
+        selected._strings = self._strings
+        selected._string_ids = self._string_ids
+        rows = array.array('I')
+        for file_path in dict.fromkeys(file_paths):
+            file_rows = self._files[file_path]
+            if mask is not None:
+                file_rows = list(itertools.compress(file_rows, map(mask.__getitem__, file_rows)))
+            if file_rows:
+                selected._files[file_path] = array.array(
+                        'I', range(len(rows), len(rows) + len(file_rows)))
+                rows.extend(file_rows)
+        selected._types = bytearray(map(self._types.__getitem__, rows))
+        selected._line_nos = array.array('I', map(self._line_nos.__getitem__, rows))
+        selected._file_paths = array.array('I', map(self._file_paths.__getitem__, rows))
+        selected._names = [array.array('I', map(column.__getitem__, rows))
+                for column in self._names]
+        return selected
+
+    def _warning(self, row: int) -> BaseWarning:
+        class_, fields = _WARNING_FIELDS[self._types[row]]
+        strings = self._strings
+        return class_(strings[self._file_paths[row]], self._line_nos[row],
+                *(strings[self._names[i][row]] for i in range(len(fields))))
+
+    def for_file(self, file_path: tp.Union[str, os.PathLike]) -> FileWarnings:
+        rows = self._files.get(normalize_path(file_path), ())
+        return FileWarnings(map(self._warning, rows))
+
+    def files(self) -> tp.List[str]:
+        return list(self._files)
+
+    def __contains__(self, file_path: tp.Union[str, os.PathLike]) -> bool:
+        return normalize_path(file_path) in self._files
+
+    def __iter__(self) -> tp.Iterator[BaseWarning]:
+        for rows in self._files.values():
+            yield from map(self._warning, rows)
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+
+def _as_file_warnings(warnings: tp.Iterable[BaseWarning]) -> FileWarnings:
+    if isinstance(warnings, FileWarnings):
+        return warnings
+    return FileWarnings(warnings)
+
+class BaseDelinter:
+
+    # the message patterns of the delinter as a single pattern, see
+    # `warning_from_groups`
+    message_pattern: tp.Pattern[str]
+    # `message_pattern` as matched within a line of a pylint report, so it
+    # must not match past the end of the line, see `delinter.reports`
+    report_message_pattern: tp.Pattern[str]
 
     @classmethod
     def parse_linter_warning(cls,
-            warning: tp.Iterable[tp.Tuple[str, int, pylint_str]]) -> BaseUnusedImportsWarning:
+            warning: tp.Tuple[str, int, pylint_str]) -> BaseWarning:
         '''
         Filter just the linter warnings
         '''
         file_path, line_no, warning = warning
-        for pattern, class_ in cls.patterns:
-            m = re.match(pattern, warning)
-            if m:
-                return class_(
-                            file_path=file_path,
-                            line_no=line_no,
-                            import_as_name=m.group('dname')
-                            )
-        raise ValueError(f"Parsing failed for {warning}")
+        m = cls.message_pattern.fullmatch(warning)
+        if not m:
+            raise ValueError(f"Parsing failed for {warning}")
+        return cls.warning_from_groups(file_path, line_no, m.groupdict())
+
+    @classmethod
+    def warning_from_groups(cls, file_path: str, line_no: int,
+            groups: tp.Mapping[str, tp.Optional[str]]) -> BaseWarning:
+        '''
+        Build the warning from the groups of a match of `message_pattern`.
+        '''
+        raise NotImplementedError()
+
+    @classmethod
+    def parse_pylint_message(cls, message) -> BaseWarning:
+        '''
+        Build the warning from a structured pylint `Message`.
+        '''
+        return cls.parse_linter_warning((message.path, message.line, message.msg))
+
+class ReimportDelinter(BaseDelinter):
+    CODE = 'W0404'
+
+    pattern = re.compile(r"Reimport '(?P<dname>.*)'.*")
+
+    patterns = ((pattern, ReimportWarning), )
+
+    message_pattern = pattern
+
+    report_message_pattern = re.compile(r"Reimport '(?P<dname>[^\r\n]*)'[^\r\n]*")
+
+    @classmethod
+    def warning_from_groups(cls, file_path: str, line_no: int,
+            groups: tp.Mapping[str, tp.Optional[str]]) -> ReimportWarning:
+        return ReimportWarning(
+                file_path=file_path,
+                line_no=line_no,
+                import_as_name=groups['dname'])
 
 
 class UnusedImportsDelinter(BaseDelinter):
@@ -119,104 +393,363 @@ class UnusedImportsDelinter(BaseDelinter):
             (pattern_from_with_alias, UnusedFromImportsWarning),
             (pattern_from, UnusedFromImportsWarning)]
 
+    # the patterns above as a single pattern that does not backtrack, the
+    # names in the messages never hold whitespace
+    message_pattern = re.compile(
+            r'Unused (?:import (?P<dname>\S+)'
+            r'|(?P<name>\S+) imported (?:as (?P<alias>\S+)'
+            r'|from (?P<module>\S+)(?: as (?P<from_alias>\S+))?))')
+
+    # the names already stop at the end of the line
+    report_message_pattern = message_pattern
+
     @classmethod
-    def parse_linter_warning(cls,
-            warning: tp.Iterable[tp.Tuple[str, int, pylint_str]]) -> BaseUnusedImportsWarning:
-        '''
-        Filter just the linter warnings
-        '''
-        file_path, line_no, warning = warning
-        for pattern, class_ in cls.patterns:
-            m = re.match(pattern, warning)
-            if m:
-                groups = m.groups()
-                if class_ is UnusedImportsWarning:
-                    if len(groups) == 2:
-                        return UnusedImportsWarning(
-                                file_path=file_path,
-                                line_no=line_no,
-                                alias=m.group('aname'),
-                                dotted_as_name=m.group('dname')
-                                )
-                    return UnusedImportsWarning(
-                            file_path=file_path,
-                            line_no=line_no,
-                            alias=None,
-                            dotted_as_name=m.group('dname')
-                            )
-
-                if class_ is UnusedFromImportsWarning:
-                    if len(groups) == 2:
-                        return UnusedFromImportsWarning(
-                                file_path=file_path,
-                                line_no=line_no,
-                                import_as_name=m.group('aname'),
-                                dotted_as_name=m.group('dname'),
-                                alias=None)
-                    return UnusedFromImportsWarning(
-                            file_path=file_path,
-                            line_no=line_no,
-                            import_as_name=m.group('sub_dname'),
-                            dotted_as_name=m.group('dname'),
-                            alias=m.group('aname'))
-        raise ValueError(f"Parsing failed for {warning}")
-
-
-class RemoveUnusedImportTransformer(cst.CSTTransformer):
+    def warning_from_groups(cls, file_path: str, line_no: int,
+            groups: tp.Mapping[str, tp.Optional[str]]) -> BaseUnusedImportsWarning:
+        if groups['dname'] is not None:
+            return UnusedImportsWarning(
+                    file_path=file_path,
+                    line_no=line_no,
+                    alias=None,
+                    dotted_as_name=groups['dname'])
+        if groups['module'] is None:
+            return UnusedImportsWarning(
+                    file_path=file_path,
+                    line_no=line_no,
+                    alias=groups['alias'],
+                    dotted_as_name=groups['name'])
+        return UnusedFromImportsWarning(
+                file_path=file_path,
+                line_no=line_no,
+                import_as_name=groups['name'],
+                dotted_as_name=groups['module'],
+                alias=groups['from_alias'])
+
+
+# the message id of each warning type
+_WARNING_CODES: Dict[tp.Type[BaseWarning], str] = {
+        class_: delinter_class.CODE
+        for delinter_class in (UnusedImportsDelinter, ReimportDelinter)
+        for _, class_ in delinter_class.patterns}
+
+
+# the first and last line of a statement
+_LineRange = tp.Tuple[int, int]
+
+
+# the ast node of each libcst statement, then the one of its async form:
+# libcst flags async statements where the ast has nodes of their own
+_AST_STATEMENTS: Dict[type, tp.Tuple[type, ...]] = {
+        cst.AnnAssign: (ast.AnnAssign,),
+        cst.Assert: (ast.Assert,),
+        cst.Assign: (ast.Assign,),
+        cst.AugAssign: (ast.AugAssign,),
+        cst.Break: (ast.Break,),
+        cst.ClassDef: (ast.ClassDef,),
+        cst.Continue: (ast.Continue,),
+        cst.Del: (ast.Delete,),
+        cst.Expr: (ast.Expr,),
+        cst.For: (ast.For, ast.AsyncFor),
+        cst.FunctionDef: (ast.FunctionDef, ast.AsyncFunctionDef),
+        cst.Global: (ast.Global,),
+        cst.If: (ast.If,),
+        cst.Import: (ast.Import,),
+        cst.ImportFrom: (ast.ImportFrom,),
+        cst.Nonlocal: (ast.Nonlocal,),
+        cst.Pass: (ast.Pass,),
+        cst.Raise: (ast.Raise,),
+        cst.Return: (ast.Return,),
+        cst.Try: (ast.Try,),
+        cst.While: (ast.While,),
+        cst.With: (ast.With, ast.AsyncWith)}
+# the statements of newer grammars, when both libcst and the ast have them;
+# the others do not match any ast node, so the positions of libcst are used
+for _name in ('Match', 'TryStar'):
+    if hasattr(cst, _name) and hasattr(ast, _name):
+        _AST_STATEMENTS[getattr(cst, _name)] = (getattr(ast, _name),)
+_MATCH_STATEMENTS = tuple(filter(None, [getattr(cst, 'Match', None)]))
+_TRY_STATEMENTS = (cst.Try, *filter(None, [getattr(cst, 'TryStar', None)]))
+
+
+def _same_kind(node: cst.CSTNode, ast_node: ast.AST) -> bool:
+    ast_classes = _AST_STATEMENTS.get(type(node), ())
+    is_async = getattr(node, 'asynchronous', None) is not None
+    return len(ast_classes) > is_async and type(ast_node) is ast_classes[is_async]
+
+
+def _map_small_statements(statements: tp.Sequence[cst.BaseSmallStatement],
+        ast_statements: tp.Iterator[ast.stmt],
+        lines: tp.Dict[cst.CSTNode, _LineRange]) -> _LineRange:
+    first = last = None
+    for statement in statements:
+        ast_statement = next(ast_statements, None)
+        if ast_statement is None or not _same_kind(statement, ast_statement):
+            raise ValueError(f'No {type(statement).__name__} statement in the ast.')
+        line_range = (ast_statement.lineno, ast_statement.end_lineno)
+        if isinstance(statement, (cst.Import, cst.ImportFrom)):
+            lines[statement] = line_range
+        first = first or line_range
+        last = line_range
+    return first[0], last[1]
+
+
+def _map_suite(suite: cst.BaseSuite, ast_statements: tp.Sequence[ast.stmt],
+        lines: tp.Dict[cst.CSTNode, _LineRange]):
+    ast_iter = iter(ast_statements)
+    if isinstance(suite, cst.SimpleStatementSuite):
+        _map_small_statements(suite.body, ast_iter, lines)
+    else:
+        _map_statements(suite.body, ast_iter, lines)
+    if next(ast_iter, None) is not None:
+        raise ValueError('The ast has more statements than the module.')
+
+
+def _clauses(statement: cst.BaseCompoundStatement, ast_statement: ast.stmt
+) -> tp.Iterator[tp.Tuple[cst.BaseSuite, tp.List[ast.stmt]]]:
+    # the suites of a compound statement, paired with the bodies of the ast,
+    # except for an elif, which is a statement of its own in both trees
+    if isinstance(statement, _MATCH_STATEMENTS):
+        if len(statement.cases) != len(ast_statement.cases):
+            raise ValueError('The match statements have different cases.')
+        for case, ast_case in zip(statement.cases, ast_statement.cases):
+            yield case.body, ast_case.body
+        return
+    yield statement.body, ast_statement.body
+    if isinstance(statement, _TRY_STATEMENTS):
+        if len(statement.handlers) != len(ast_statement.handlers):
+            raise ValueError('The try statements have different handlers.')
+        for handler, ast_handler in zip(statement.handlers, ast_statement.handlers):
+            yield handler.body, ast_handler.body
+        if statement.finalbody is not None:
+            yield statement.finalbody.body, ast_statement.finalbody
+        elif ast_statement.finalbody:
+            raise ValueError('The finally branches differ.')
+    if isinstance(statement, (cst.If, cst.For, cst.While, *_TRY_STATEMENTS)):
+        if isinstance(statement.orelse, cst.Else):
+            yield statement.orelse.body, ast_statement.orelse
+        elif statement.orelse is None and ast_statement.orelse:
+            raise ValueError('The else branches differ.')
+
+
+def _map_compound_statement(statement: cst.BaseCompoundStatement, ast_statement: ast.stmt,
+        lines: tp.Dict[cst.CSTNode, _LineRange]):
+    if not _same_kind(statement, ast_statement):
+        raise ValueError(f'No {type(statement).__name__} statement in the ast.')
+    lines[statement] = (ast_statement.lineno, ast_statement.end_lineno)
+    for suite, ast_body in _clauses(statement, ast_statement):
+        _map_suite(suite, ast_body, lines)
+    if isinstance(statement, cst.If) and isinstance(statement.orelse, cst.If):
+        # an elif is an If nested in the else branch of both trees
+        if len(ast_statement.orelse) != 1:
+            raise ValueError('The elif branches differ.')
+        _map_compound_statement(statement.orelse, ast_statement.orelse[0], lines)
+
+
+def _map_statements(statements: tp.Sequence[cst.BaseStatement],
+        ast_statements: tp.Iterator[ast.stmt],
+        lines: tp.Dict[cst.CSTNode, _LineRange]):
+    for statement in statements:
+        if isinstance(statement, cst.SimpleStatementLine):
+            lines[statement] = _map_small_statements(statement.body, ast_statements, lines)
+            continue
+        ast_statement = next(ast_statements, None)
+        if ast_statement is None:
+            raise ValueError(f'No {type(statement).__name__} statement in the ast.')
+        _map_compound_statement(statement, ast_statement, lines)
+
+
+def statement_lines(module: cst.Module,
+        source_code: tp.Union[str, bytes]) -> tp.Dict[cst.CSTNode, _LineRange]:
+    '''
+    Return the first and last line of the statement lines, the compound
+    statements and the imports of `module`, read from the ast of its
+    `source_code` instead of the positions libcst computes for every node.
+
+    Both trees are walked together, and a ValueError is raised as soon as
+    their statements differ.
+    '''
+    if sys.version_info < (3, 8):
+        raise ValueError('The ast only has the end lines of statements from python 3.8.')
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f'Unable to parse the module with ast: {e}')
+    lines: tp.Dict[cst.CSTNode, _LineRange] = {}
+    ast_statements = iter(tree.body)
+    _map_statements(module.body, ast_statements, lines)
+    if next(ast_statements, None) is not None:
+        raise ValueError('The ast has more statements than the module.')
+    return lines
+
+
+class BaseImportTransformer(cst.CSTTransformer):
+    '''
+    Drop the aliases of `Import` and `ImportFrom` statements that a subclass
+    flags through `remove_import` and `remove_import_from`. Statements left
+    without any alias are removed.
+
+    Each statement line changed is recorded in `edits` as the range of lines
+    it spanned and its new text, rendered from the new node alone, so the
+    fixed source and the diff are built from the edits without rendering the
+    module. A removed statement takes the comments and blank lines above it
+    along, and a block left empty gets the `pass` libcst gives it. A compound
+    statement with a one line suite changed, eg `if x: import os`, is
+    rendered again as a whole.
+
+    The line numbers come from `PositionProvider`, or from `statement_lines`
+    when it is set, see `transform_module`. Statement lines without imports
+    are not descended into, nor, with `statement_lines`, the compound
+    statements without any warned line.
+    '''
 
     METADATA_DEPENDENCIES = (cst.metadata.PositionProvider,)
 
-    def __init__(self, warnings: tp.Union[UnusedImportsWarning, UnusedFromImportsWarning]):
-        self.warnings = warnings
-        pass
+    def __init__(self, warnings: tp.Iterable[BaseWarning]):
+        self.warnings = _as_file_warnings(warnings)
+        self.edits: tp.List[Edit] = []
+        self.statement_lines: tp.Optional[tp.Dict[cst.CSTNode, _LineRange]] = None
+        self._warned_lines: tp.List[int] = sorted(self.warnings.line_nos)
+        self._module: tp.Optional[cst.Module] = None
+        self._indents: tp.List[str] = []
+        # the number of edits when each enclosing block was entered
+        self._block_edits: tp.List[int] = []
+        self._compound_statements: tp.List[cst.BaseCompoundStatement] = []
+        self._statement_changed = False
+        self._suite_changed = False
 
+    def _line_range(self, node: cst.CSTNode) -> _LineRange:
+        if self.statement_lines is not None:
+            return self.statement_lines[node]
+        code = self.get_metadata(cst.metadata.PositionProvider, node)
+        return code.start.line, code.end.line
 
-    def leave_import_alike(
-        self,
-        original_node: tp.Union[cst.Import, cst.ImportFrom],
-        updated_node: tp.Union[cst.Import, cst.ImportFrom],
-    ) -> tp.Union[cst.Import, cst.ImportFrom, cst.RemovalSentinel]:
-        #import ipdb; ipdb.set_trace()
-        pass
+    def _has_warned_line(self, node: cst.CSTNode) -> bool:
+        start_line, end_line = self.statement_lines[node]
+        i = bisect.bisect_left(self._warned_lines, start_line)
+        return i < len(self._warned_lines) and self._warned_lines[i] <= end_line
 
-    def is_unused_import(self, line_no, import_node: cst.ImportAlias):
-        for warning in self.warnings:
-            if isinstance(warning, UnusedImportsWarning):
-                dotted_name = ".".join(_build_dotted_name(import_node.name))
-                asname = None if not import_node.asname else import_node.asname.name.value
-                if (warning.dotted_as_name == dotted_name
-                        and warning.alias == asname):
-                    if warning.line_no == line_no:
-                        #import ipdb; ipdb.set_trace()
-                        return True
-                    else:
-                        continue
-                    #return True
-        return False
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        if isinstance(node, cst.SimpleStatementLine):
+            if not any(isinstance(n, (cst.Import, cst.ImportFrom)) for n in node.body):
+                return False
+        elif isinstance(node, cst.BaseCompoundStatement):
+            # left in on_leave, which is called even if the node is not visited
+            self._compound_statements.append(node)
+            if self.statement_lines is not None and not self._has_warned_line(node):
+                return False
+        return super().on_visit(node)
 
-    def is_unused_import_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias):
-        for warning in self.warnings:
-            if isinstance(warning, UnusedFromImportsWarning):
-                dotted_name = ".".join(_build_dotted_name(module))
-                asname = None if not import_node.asname else import_node.asname.name.value
-                if (warning.dotted_as_name == dotted_name
-                        and warning.import_as_name == import_node.name.value
-                        and warning.line_no == line_no
-                        and warning.alias == asname):
-                    return True
-        return False
+    def on_leave(self, original_node: cst.CSTNode, updated_node: cst.CSTNode
+    ) -> tp.Union[cst.CSTNode, cst.RemovalSentinel]:
+        updated_node = super().on_leave(original_node, updated_node)
+        if isinstance(original_node, cst.BaseCompoundStatement):
+            self._compound_statements.pop()
+            parent = self._compound_statements[-1] if self._compound_statements else None
+            # an `elif` is only rendered by its `if`
+            if self._suite_changed and not (
+                    isinstance(parent, cst.If) and parent.orelse is original_node):
+                self._suite_changed = False
+                self._replace_compound_statement(original_node, updated_node)
+        return updated_node
+
+    def _replace_compound_statement(self, original_node: cst.BaseCompoundStatement,
+            updated_node: cst.BaseCompoundStatement):
+        start_line, end_line = self._line_range(original_node)
+        # the edits of the statements it holds are replaced by its own
+        while self.edits and self.edits[-1].start_line >= start_line:
+            self.edits.pop()
+        updated_node = updated_node.with_changes(leading_lines=())
+        if isinstance(updated_node, (cst.FunctionDef, cst.ClassDef)):
+            # the lines of a definition start at its `def` or `class`
+            updated_node = updated_node.with_changes(decorators=(), lines_after_decorators=())
+        self.edits.append(Edit(start_line, end_line, self._statement_code(updated_node)))
+
+    def visit_Module(self, node: cst.Module) -> bool:
+        self._module = node
+        return True
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module) -> cst.Module:
+        if (not original_node.has_trailing_newline and not original_node.footer
+                and original_node.body and self.edits and self.edits[-1].lines
+                and self.edits[-1].end_line == self._line_range(original_node.body[-1])[1]):
+            # libcst drops the line ending of the last line
+            edit = self.edits[-1]
+            last_line = edit.lines[-1].rstrip('\r\n')
+            self.edits[-1] = Edit(edit.start_line, edit.end_line, edit.lines[:-1] + (last_line,))
+        return updated_node
+
+    def visit_IndentedBlock(self, node: cst.IndentedBlock) -> bool:
+        self._indents.append(node.indent if node.indent is not None
+                else self._module.default_indent)
+        self._block_edits.append(len(self.edits))
+        return True
+
+    def leave_IndentedBlock(
+        self, original_node: cst.IndentedBlock, updated_node: cst.IndentedBlock
+    ) -> cst.IndentedBlock:
+        first_edit = self._block_edits.pop()
+        if original_node.body and not updated_node.body:
+            # all its statements were removed, the first one from the line
+            # after the header, where libcst puts the `pass` of the block
+            edit = self.edits[first_edit]
+            pass_line = ''.join(self._indents) + 'pass' + self._module.default_newline
+            self.edits[first_edit] = Edit(edit.start_line, edit.end_line, (pass_line, *edit.lines))
+        self._indents.pop()
+        return updated_node
+
+    def leave_SimpleStatementLine(
+        self, original_node: cst.SimpleStatementLine, updated_node: cst.SimpleStatementLine
+    ) -> tp.Union[cst.SimpleStatementLine, cst.RemovalSentinel]:
+        if not self._statement_changed:
+            return updated_node
+        self._statement_changed = False
+        start_line, end_line = self._line_range(original_node)
+        if not updated_node.body:
+            # libcst drops the leading lines of a removed statement
+            start_line -= len(original_node.leading_lines)
+            self.edits.append(Edit(start_line, end_line))
+        else:
+            self.edits.append(Edit(start_line, end_line,
+                    self._statement_code(updated_node.with_changes(leading_lines=()))))
+        return updated_node
+
+    def leave_SimpleStatementSuite(
+        self, original_node: cst.SimpleStatementSuite, updated_node: cst.SimpleStatementSuite
+    ) -> cst.SimpleStatementSuite:
+        # the suite shares its first line with the header of its statement,
+        # which is recorded as a whole once left
+        self._suite_changed = self._suite_changed or self._statement_changed
+        self._statement_changed = False
+        return updated_node
+
+    def _statement_code(self, node: cst.CSTNode) -> tp.Tuple[str, ...]:
+        # the statement adds the indents of its blocks to its first line and
+        # to the continuation lines indented along with the block
+        state = CodegenState(default_indent=self._module.default_indent,
+                default_newline=self._module.default_newline,
+                indent_tokens=list(self._indents))
+        node._codegen(state)
+        return tuple(split_lines(''.join(state.tokens)))
+
+    def remove_import(self, line_no: int, import_node: cst.ImportAlias) -> bool:
+        raise NotImplementedError()
+
+    def remove_import_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias) -> bool:
+        raise NotImplementedError()
 
     def leave_Import(
         self, original_node: cst.Import, updated_node: cst.Import
     ) -> cst.Import:
 
-        code = self.get_metadata(cst.metadata.PositionProvider, original_node)
         new_import_alias = []
-        line_no = code.start.line
+        line_no = self._line_range(original_node)[0]
         for import_alias in updated_node.names:
-            if self.is_unused_import(line_no, import_alias):
+            if self.remove_import(line_no, import_alias):
+                self._statement_changed = True
                 continue
             new_import_alias.append(import_alias)
+        if len(new_import_alias) == len(updated_node.names):
+            return updated_node
         if new_import_alias:
             new_import_alias[-1] = new_import_alias[-1].with_changes(
                     comma=cst.MaybeSentinel.DEFAULT)
@@ -229,17 +762,18 @@ class RemoveUnusedImportTransformer(cst.CSTTransformer):
     def leave_ImportFrom(
         self, original_node: cst.ImportFrom, updated_node: cst.ImportFrom
     ) -> cst.ImportFrom:
-        #import ipdb; ipdb.set_trace()
-        code = self.get_metadata(cst.metadata.PositionProvider, original_node)
-        line_no = code.start.line
+        line_no = self._line_range(original_node)[0]
         new_import_alias = []
         if isinstance(updated_node.names, cst.ImportStar):
             # we do not handle ImportStar
             return updated_node
         for import_alias in updated_node.names:
-            if self.is_unused_import_from(line_no, updated_node.module, import_alias):
+            if self.remove_import_from(line_no, updated_node.module, import_alias):
+                self._statement_changed = True
                 continue
             new_import_alias.append(import_alias)
+        if len(new_import_alias) == len(updated_node.names):
+            return updated_node
         if new_import_alias:
             new_import_alias[-1] = new_import_alias[-1].with_changes(
                     comma=cst.MaybeSentinel.DEFAULT)
@@ -249,15 +783,38 @@ class RemoveUnusedImportTransformer(cst.CSTTransformer):
         return updated_node
 
 
+class RemoveUnusedImportTransformer(BaseImportTransformer):
 
+    def __init__(self, warnings: tp.Iterable[tp.Union[UnusedImportsWarning, UnusedFromImportsWarning]]):
+        super().__init__(warnings)
 
-class ReimportTransformer(cst.CSTTransformer):
-    METADATA_DEPENDENCIES = (cst.metadata.PositionProvider,)
 
-    def __init__(self, warnings: tp.Union[UnusedImportsWarning, UnusedFromImportsWarning]):
-        self.warnings = warnings
+    def leave_import_alike(
+        self,
+        original_node: tp.Union[cst.Import, cst.ImportFrom],
+        updated_node: tp.Union[cst.Import, cst.ImportFrom],
+    ) -> tp.Union[cst.Import, cst.ImportFrom, cst.RemovalSentinel]:
+        #import ipdb; ipdb.set_trace()
         pass
 
+    def is_unused_import(self, line_no, import_node: cst.ImportAlias):
+        dotted_name = ".".join(_build_dotted_name(import_node.name))
+        key = (dotted_name, _alias_name(import_node))
+        return self.warnings.get(line_no, UnusedImportsWarning, key) is not None
+
+    def is_unused_import_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias):
+        key = (_module_name(module), import_node.name.value, _alias_name(import_node))
+        return self.warnings.get(line_no, UnusedFromImportsWarning, key) is not None
+
+    remove_import = is_unused_import
+    remove_import_from = is_unused_import_from
+
+
+class ReimportTransformer(BaseImportTransformer):
+
+    def __init__(self, warnings: tp.Iterable[ReimportWarning]):
+        super().__init__(warnings)
+
     @classmethod
     def build_dotted_name(cls, import_alias: cst.Attribute):
         def walk(node):
@@ -268,23 +825,17 @@ class ReimportTransformer(cst.CSTTransformer):
         return walk(import_alias)
 
     def is_reimport(self, line_no, import_node: cst.ImportAlias):
-        for warning in self.warnings:
-            dotted_name = ".".join(_build_dotted_name(import_node.name))
-            if (warning.import_as_name == dotted_name):
-                if warning.line_no == line_no:
-                    return True
-        return False
+        dotted_name = ".".join(_build_dotted_name(import_node.name))
+        return self.warnings.get(line_no, ReimportWarning, (dotted_name,)) is not None
 
     def is_reimport_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias):
-        for warning in self.warnings:
-            dotted_name = ".".join(_build_dotted_name(module))
-            if (warning.import_as_name == import_node.name.value
-                    and warning.line_no == line_no):
-                if import_node.asname:
-                    # re-imports with alias names cannot be removed without checking if the alias name of the reimported statement is used else where in the code. Take a conservative approach and do not remvoe it.
-                    return False
-                return True
-        return False
+        key = (import_node.name.value,)
+        if self.warnings.get(line_no, ReimportWarning, key) is None:
+            return False
+        if import_node.asname:
+            # re-imports with alias names cannot be removed without checking if the alias name of the reimported statement is used else where in the code. Take a conservative approach and do not remvoe it.
+            return False
+        return True
 
     # def is_unused_import_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias):
     #     for warning in self.warnings:
@@ -297,43 +848,230 @@ class ReimportTransformer(cst.CSTTransformer):
     #                 return True
     #     return False
 
-    def leave_Import(
-        self, original_node: cst.Import, updated_node: cst.Import
-    ) -> cst.Import:
+    remove_import = is_reimport
+    remove_import_from = is_reimport_from
 
-        code = self.get_metadata(cst.metadata.PositionProvider, original_node)
-        new_import_alias = []
-        line_no = code.start.line
-        for import_alias in updated_node.names:
-            if self.is_reimport(line_no, import_alias):
-                continue
-            new_import_alias.append(import_alias)
-        if new_import_alias:
-            new_import_alias[-1] = new_import_alias[-1].with_changes(
-                    comma=cst.MaybeSentinel.DEFAULT)
-            return updated_node.with_changes(names=new_import_alias)
-        if len(new_import_alias) == 0:
-            return cst.RemoveFromParent()
-        return updated_node
 
+def _drop_shadowed_reimports(warnings: tp.Iterable[BaseWarning]) -> tp.List[BaseWarning]:
+    '''
+    Drop the reimports of a name whose first import is removed as unused, as
+    removing both imports in the same pass would leave the name unbound.
+    '''
+    warnings = list(warnings)
+    # the first line where each name is bound by an import removed as unused
+    first_unused: tp.Dict[str, int] = {}
+    for warning in warnings:
+        if isinstance(warning, UnusedImportsWarning):
+            name = warning.alias or warning.dotted_as_name
+        elif isinstance(warning, UnusedFromImportsWarning):
+            name = warning.alias or warning.import_as_name
+        else:
+            continue
+        first_unused[name] = min(warning.line_no, first_unused.get(name, warning.line_no))
+    return [warning for warning in warnings
+            if not (isinstance(warning, ReimportWarning)
+                    and first_unused.get(warning.import_as_name, warning.line_no) < warning.line_no)]
 
-    def leave_ImportFrom(
-        self, original_node: cst.ImportFrom, updated_node: cst.ImportFrom
-    ) -> cst.ImportFrom:
-        code = self.get_metadata(cst.metadata.PositionProvider, original_node)
-        line_no = code.start.line
-        new_import_alias = []
-        if isinstance(updated_node.names, cst.ImportStar):
-            # we do not handle ImportStar
-            return updated_node
-        for import_alias in updated_node.names:
-            if self.is_reimport_from(line_no, updated_node.module, import_alias):
+
+class CombinedImportTransformer(BaseImportTransformer):
+    '''
+    Apply the removals of several import transformers in a single pass, so
+    that edits of different message ids on the same import line are merged
+    instead of producing conflicting patches.
+    '''
+
+    def __init__(self, warnings: tp.Iterable[BaseWarning],
+            transformer_classes: tp.Iterable[tp.Type[BaseImportTransformer]]):
+        super().__init__(_drop_shadowed_reimports(warnings))
+        self.transformers = [class_(self.warnings) for class_ in transformer_classes]
+
+    def remove_import(self, line_no: int, import_node: cst.ImportAlias) -> bool:
+        return any(t.remove_import(line_no, import_node) for t in self.transformers)
+
+    def remove_import_from(self, line_no: int, module: cst.Module, import_node: cst.ImportAlias) -> bool:
+        return any(t.remove_import_from(line_no, module, import_node)
+                for t in self.transformers)
+
+
+@dataclasses.dataclass
+class _ImportRecord:
+    name: str
+    fullname: str
+    level: int
+    aliased: bool
+    block_path: tp.Tuple[int, ...]
+    scope: cst.metadata.Scope
+
+
+class ImportWarningsVisitor(cst.CSTVisitor):
+    '''
+    Detect unused imports and reimports with the libcst scope analysis of a
+    module, and record them as the warnings pylint reports for W0611 and W0404.
+
+    Reimports are only reported against an earlier import of the same or an
+    enclosing block, so imports in exclusive branches (eg try/except ImportError)
+    are left alone.
+    '''
+
+    METADATA_DEPENDENCIES = (cst.metadata.ScopeProvider, cst.metadata.PositionProvider)
+
+    def __init__(self, file_path: str, msg_ids: tp.Iterable[str]):
+        msg_ids = set(msg_ids)
+        self.file_path = file_path
+        # like pylint, do not report unused imports of a package __init__
+        self.detect_unused = (UnusedImportsDelinter.CODE in msg_ids
+                and os.path.basename(file_path) != '__init__.py')
+        self.detect_reimports = ReimportDelinter.CODE in msg_ids
+        self.warnings: tp.List[BaseWarning] = []
+        self._unused: tp.List[tp.Tuple[str, BaseWarning]] = []
+        self._exported: Set[str] = set()
+        self._blocks: tp.List[int] = []
+        self._imports_by_fullname: Dict[str, tp.List[_ImportRecord]] = defaultdict(list)
+        self._from_by_fullname: Dict[tp.Tuple[int, str], tp.List[_ImportRecord]] = defaultdict(list)
+        self._from_by_name: Dict[tp.Tuple[int, str], tp.List[_ImportRecord]] = defaultdict(list)
+
+    def visit_Module(self, node: cst.Module):
+        self._blocks.append(id(node))
+
+    def leave_Module(self, original_node: cst.Module):
+        self._blocks.pop()
+        for bound_name, warning in self._unused:
+            if bound_name not in self._exported:
+                self.warnings.append(warning)
+        self.warnings.sort(key=lambda w: w.line_no)
+
+    def visit_IndentedBlock(self, node: cst.IndentedBlock):
+        self._blocks.append(id(node))
+
+    def leave_IndentedBlock(self, original_node: cst.IndentedBlock):
+        self._blocks.pop()
+
+    def visit_SimpleStatementSuite(self, node: cst.SimpleStatementSuite):
+        self._blocks.append(id(node))
+
+    def leave_SimpleStatementSuite(self, original_node: cst.SimpleStatementSuite):
+        self._blocks.pop()
+
+    def visit_Assign(self, node: cst.Assign):
+        # names listed in a module level __all__ are used
+        for target in node.targets:
+            if (isinstance(target.target, cst.Name) and target.target.value == '__all__'
+                    and isinstance(node.value, (cst.List, cst.Tuple))):
+                for element in node.value.elements:
+                    if isinstance(element.value, cst.SimpleString):
+                        self._exported.add(element.value.evaluated_value)
+
+    def _is_used(self, scope: cst.metadata.Scope, node: cst.CSTNode,
+            bound_names: tp.Iterable[str]) -> bool:
+        for bound_name in bound_names:
+            for assignment in scope.assignments[bound_name]:
+                if getattr(assignment, 'node', None) is node and assignment.references:
+                    return True
+        return False
+
+    def _is_reimport(self, record: _ImportRecord) -> bool:
+        candidates = (self._imports_by_fullname.get(record.fullname, [])
+                + self._from_by_fullname.get((record.level, record.fullname), []))
+        if not record.aliased:
+            candidates += self._from_by_name.get((record.level, record.name), [])
+        for first in candidates:
+            if first.scope is not record.scope and not isinstance(
+                    first.scope, cst.metadata.GlobalScope):
                 continue
-            new_import_alias.append(import_alias)
-        if new_import_alias:
-            new_import_alias[-1] = new_import_alias[-1].with_changes(
-                    comma=cst.MaybeSentinel.DEFAULT)
-            return updated_node.with_changes(names=new_import_alias)
-        if len(new_import_alias) == 0:
-            return cst.RemoveFromParent()
-        return updated_node
+            if record.block_path[:len(first.block_path)] == first.block_path:
+                return True
+        return False
+
+    def _report_import(self, node: tp.Union[cst.Import, cst.ImportFrom],
+            scope: cst.metadata.Scope, line_no: int,
+            entries: tp.List[tp.Tuple[_ImportRecord, tp.Tuple[str, ...], BaseWarning]]):
+        # like pylint, unused imports of a class body are not reported
+        reportable_scope = isinstance(
+                scope, (cst.metadata.GlobalScope, cst.metadata.FunctionScope))
+        for record, bound_names, warning in entries:
+            if self.detect_reimports and self._is_reimport(record):
+                self.warnings.append(ReimportWarning(
+                        file_path=self.file_path,
+                        line_no=line_no,
+                        import_as_name=record.name))
+            if (self.detect_unused and reportable_scope
+                    and not self._is_used(scope, node, bound_names)):
+                self._unused.append((bound_names[0], warning))
+
+    def visit_Import(self, node: cst.Import):
+        line_no = self.get_metadata(cst.metadata.PositionProvider, node).start.line
+        scope = self.get_metadata(cst.metadata.ScopeProvider, node)
+        entries = []
+        for import_alias in node.names:
+            dotted_name = ".".join(_build_dotted_name(import_alias.name))
+            asname = _alias_name(import_alias)
+            if asname:
+                bound_names = (asname,)
+            else:
+                # `import a.b` binds `a.b` and `a`
+                parts = dotted_name.split('.')
+                bound_names = tuple('.'.join(parts[:i]) for i in range(len(parts), 0, -1))
+            record = _ImportRecord(
+                    name=dotted_name, fullname=dotted_name, level=0,
+                    aliased=asname is not None, block_path=tuple(self._blocks), scope=scope)
+            entries.append((record, bound_names, UnusedImportsWarning(
+                    file_path=self.file_path, line_no=line_no,
+                    alias=asname, dotted_as_name=dotted_name)))
+        self._report_import(node, scope, line_no, entries)
+        for record, _, _ in entries:
+            self._imports_by_fullname[record.fullname].append(record)
+        return False
+
+    def visit_ImportFrom(self, node: cst.ImportFrom):
+        if isinstance(node.names, cst.ImportStar):
+            return False
+        module_name = _module_name(node.module)
+        if module_name == '__future__':
+            return False
+        line_no = self.get_metadata(cst.metadata.PositionProvider, node).start.line
+        scope = self.get_metadata(cst.metadata.ScopeProvider, node)
+        level = len(node.relative)
+        entries = []
+        for import_alias in node.names:
+            name = import_alias.name.value
+            asname = _alias_name(import_alias)
+            record = _ImportRecord(
+                    name=name, fullname=f'{module_name}.{name}' if module_name else name,
+                    level=level, aliased=asname is not None,
+                    block_path=tuple(self._blocks), scope=scope)
+            entries.append((record, (asname or name,), UnusedFromImportsWarning(
+                    file_path=self.file_path, line_no=line_no, import_as_name=name,
+                    dotted_as_name=module_name, alias=asname)))
+        self._report_import(node, scope, line_no, entries)
+        for record, _, _ in entries:
+            self._from_by_fullname[(record.level, record.fullname)].append(record)
+            if not record.aliased:
+                self._from_by_name[(record.level, record.name)].append(record)
+        return False
+
+
+def transform_module(module: cst.Module, transformer: BaseImportTransformer,
+        source_code: tp.Union[str, bytes]) -> cst.Module:
+    '''
+    Apply `transformer` to a freshly parsed `module` without copying it, and
+    with the line numbers of the ast of its `source_code`, so that only the
+    statements holding warned lines are visited. If the ast does not match
+    the module, the positions of libcst are used instead.
+    '''
+    try:
+        transformer.statement_lines = statement_lines(module, source_code)
+    except ValueError:
+        transformer.statement_lines = None
+        return cst.MetadataWrapper(module, unsafe_skip_copy=True).visit(transformer)
+    return module.visit(transformer)
+
+
+def detect_import_warnings(wrapper: cst.MetadataWrapper, file_path: str,
+        msg_ids: tp.Iterable[str]) -> tp.List[BaseWarning]:
+    '''
+    Return the W0611 and W0404 warnings of the module in `wrapper`, without
+    running pylint. Only the warnings of the requested `msg_ids` are detected.
+    '''
+    visitor = ImportWarningsVisitor(file_path, msg_ids)
+    wrapper.visit(visitor)
+    return visitor.warnings
@@ -0,0 +1,628 @@
+'''
+Run the linter in-process and collect its messages as the warnings defined
+in `delinter.imports`, without formatting and re-parsing pylint's text output.
+
+Besides pylint, the unused imports and reimports can be found with the
+faster linters that report the pyflakes codes F401 and F811, see
+`LINTER_BACKENDS`.
+'''
+import io
+import os
+import re
+import ast
+import sys
+import json
+import queue
+import shutil
+import inspect
+import logging
+import threading
+import subprocess
+import dataclasses
+import typing as tp
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+from astroid import MANAGER
+from astroid.builder import AstroidBuilder
+from astroid.exceptions import AstroidBuildingError
+from pylint.lint import Run
+from pylint.reporters import BaseReporter
+
+from delinter.imports import BaseDelinter
+from delinter.imports import BaseWarning
+from delinter.imports import ReimportDelinter
+from delinter.imports import ReimportWarning
+from delinter.imports import UnusedImportsDelinter
+from delinter.imports import UnusedImportsWarning
+from delinter.imports import UnusedFromImportsWarning
+from delinter.imports import WarningIndex
+from delinter.imports import normalize_path
+from delinter.discovery import chunk_files
+
+_logger = logging.getLogger(__name__)
+
+
+# pylint < 2.5 names the argument that keeps `Run` from calling sys.exit `do_exit`
+_RUN_KWARGS = ({'exit': False} if 'exit' in inspect.signature(Run.__init__).parameters
+        else {'do_exit': False})
+
+
+class WarningReporter(BaseReporter):
+    '''
+    Pylint reporter that hands every message of a requested message id to its
+    delinter class and keeps the resulting warning, instead of printing it.
+    '''
+
+    name = 'delinter'
+
+    def __init__(self, delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]):
+        super().__init__()
+        self.delinter_classes = delinter_classes
+        self.warnings: tp.List[BaseWarning] = []
+
+    def handle_message(self, msg):
+        class_ = self.delinter_classes.get(msg.msg_id)
+        if class_ is None:
+            return
+        self.warnings.append(class_.parse_pylint_message(msg))
+
+    def display_reports(self, layout):
+        pass
+
+    def display_messages(self, layout):
+        pass
+
+    def _display(self, layout):
+        pass
+
+
+class StreamingWarningReporter(WarningReporter):
+    '''
+    Reporter that hands the warnings of a file to `on_file_done` as soon as
+    pylint moves past the file, instead of keeping the warnings of the run.
+    Files without any warning are not handed over.
+    '''
+
+    def __init__(self, delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+            on_file_done: tp.Callable[[str, tp.List[BaseWarning]], None]):
+        super().__init__(delinter_classes)
+        self.on_file_done = on_file_done
+        self._file_path = None
+        self._done_file_paths: tp.Set[str] = set()
+
+    def handle_message(self, msg):
+        class_ = self.delinter_classes.get(msg.msg_id)
+        if class_ is None:
+            return
+        if msg.path != self._file_path:
+            self.flush()
+            self._file_path = msg.path
+        if msg.path in self._done_file_paths:
+            # the fix of the file has started already, do not fix it twice
+            _logger.warning('Dropped a late %s message for %s', msg.msg_id, msg.path)
+            return
+        self.warnings.append(class_.parse_pylint_message(msg))
+
+    def on_set_current_module(self, module, filepath):
+        self.flush()
+
+    def flush(self):
+        if not self.warnings:
+            return
+        self._done_file_paths.add(self._file_path)
+        warnings, self.warnings = self.warnings, []
+        self.on_file_done(self._file_path, warnings)
+
+
+def pylint_args(paths: tp.Iterable[tp.Union[str, os.PathLike]],
+        msg_ids: tp.Iterable[str]) -> tp.List[str]:
+    '''
+    Return the pylint arguments that only enable the requested messages, so
+    that pylint skips every checker that cannot emit one of them.
+    '''
+    return [
+            '--disable=all',
+            f'--enable={",".join(msg_ids)}',
+            '--reports=n',
+            '--score=n',
+            '--persistent=n',
+            *[str(p) for p in paths]]
+
+
+def forget_modules(paths: tp.Iterable[tp.Union[str, os.PathLike]]):
+    '''
+    Drop the modules under `paths` from the astroid cache, so that linting
+    them again in the same process sees their current content. The rest of
+    the cache, eg the standard library, stays warm.
+    '''
+    prefixes = tuple(normalize_path(p) for p in paths)
+    dir_prefixes = tuple(p + os.sep for p in prefixes)
+    for name, module in list(MANAGER.astroid_cache.items()):
+        file_path = getattr(module, 'file', None)
+        if not file_path:
+            continue
+        file_path = normalize_path(file_path)
+        if file_path in prefixes or file_path.startswith(dir_prefixes):
+            del MANAGER.astroid_cache[name]
+
+
+def _module_name(file_path: str) -> str:
+    # the name pylint gives the module of a file, from the outermost package
+    # that holds it
+    parts = os.path.relpath(os.path.splitext(file_path)[0], _package_root(file_path)).split(os.sep)
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+def _cache_sources(sources: tp.Mapping[str, str]) -> tp.Dict[str, tp.Any]:
+    # build the modules of the unsaved sources into the astroid cache, where
+    # pylint looks up the module of a file before reading it
+    builder = AstroidBuilder(MANAGER)
+    modules = {}
+    for file_path, source_code in sources.items():
+        file_path = os.path.abspath(file_path)
+        module_name = _module_name(file_path)
+        # astroid keeps the module it cached first under a name, eg the one of
+        # a file of the same name linted earlier in another folder
+        MANAGER.astroid_cache.pop(module_name, None)
+        try:
+            modules[file_path] = builder.string_build(source_code, module_name, file_path)
+        except AstroidBuildingError as e:
+            raise ValueError(f'Unable to build the module of {file_path}: {e}')
+    return modules
+
+
+def run_pylint(paths: tp.Iterable[tp.Union[str, os.PathLike]],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+        sources: tp.Optional[tp.Mapping[str, str]] = None) -> tp.List[BaseWarning]:
+    '''
+    Lint the `paths` in this process and return the parsed warnings of the
+    message ids in `delinter_classes`.
+
+    The `sources` map some of the paths to an unsaved content, eg a fix not
+    written yet, that is linted in place of the file: pylint, and the modules
+    that import it, see the unsaved content together with the rest of the tree
+    as it is on disk.
+    '''
+    paths = list(paths)
+    forget_modules(paths)
+    sources = sources or {}
+    modules = _cache_sources(sources)
+    reporter = WarningReporter(delinter_classes)
+    try:
+        Run(pylint_args(paths, delinter_classes), reporter=reporter, **_RUN_KWARGS)
+        built = {id(module) for module in modules.values()}
+        read = {module.file for module in MANAGER.astroid_cache.values()
+                if id(module) not in built and getattr(module, 'file', None)}
+        for file_path in modules:
+            if file_path in read:
+                raise ValueError(f'pylint read {file_path} instead of its unsaved source')
+    finally:
+        # the modules built from the sources must not stand in for the files
+        forget_modules(sources)
+    return reporter.warnings
+
+
+def run_pylint_on_source(file_path: tp.Union[str, os.PathLike], source_code: str,
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]) -> tp.List[BaseWarning]:
+    '''
+    Lint `source_code`, eg the unsaved buffer of an editor, as if it were the
+    content of `file_path`. Pylint reads it from stdin, which is swapped for
+    the duration of the run.
+    '''
+    forget_modules([file_path])
+    reporter = WarningReporter(delinter_classes)
+    stdin = sys.stdin
+    # pylint detaches the buffer of stdin and reads it as utf-8
+    sys.stdin = io.TextIOWrapper(io.BytesIO(source_code.encode('utf-8')), encoding='utf-8')
+    try:
+        Run(['--from-stdin', *pylint_args([file_path], delinter_classes)],
+                reporter=reporter, **_RUN_KWARGS)
+    finally:
+        sys.stdin = stdin
+        # the module built from the buffer must not stand in for the file
+        forget_modules([file_path])
+    return reporter.warnings
+
+
+_DONE = object()
+
+
+def iter_pylint_warnings(paths: tp.Iterable[tp.Union[str, os.PathLike]],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+        max_pending: int = 64) -> tp.Iterator[tp.Tuple[str, tp.List[BaseWarning]]]:
+    '''
+    Lint the `paths` in a background thread and yield the path and warnings
+    of each file with warnings as soon as pylint is done with it. Once
+    `max_pending` files wait to be consumed, pylint blocks until the consumer
+    catches up, so memory does not grow with the size of the tree.
+    '''
+    paths = list(paths)
+    pending: queue.Queue = queue.Queue(maxsize=max_pending)
+
+    def lint():
+        try:
+            forget_modules(paths)
+            reporter = StreamingWarningReporter(
+                    delinter_classes, lambda *file_warnings: pending.put(file_warnings))
+            Run(pylint_args(paths, delinter_classes), reporter=reporter, **_RUN_KWARGS)
+            reporter.flush()
+        except BaseException as e: # forwarded to the consumer
+            pending.put(e)
+        else:
+            pending.put(_DONE)
+
+    # a daemon thread does not keep the process alive if the consumer stops early
+    thread = threading.Thread(target=lint, name='delinter-pylint', daemon=True)
+    thread.start()
+    while True:
+        item = pending.get()
+        if item is _DONE:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
+
+
+# the pyflakes codes of the messages of the delinter, that flake8 and ruff
+# report as well
+PYFLAKES_CODES = {'F401': UnusedImportsDelinter.CODE, 'F811': ReimportDelinter.CODE}
+
+# pyflakes quotes the names with repr, ruff with backticks
+_UNUSED_IMPORT = re.compile(r"['`](?P<name>[^'`]+)['`] imported but unused")
+_REDEFINITION = re.compile(
+        r"[Rr]edefinition of unused ['`](?P<name>[^'`]+)['`] from line (?P<line_no>\d+)")
+
+# the default output format of flake8
+_FLAKE8_LINE = re.compile(
+        r'(?P<path>.+?):(?P<line_no>\d+):(?P<col>\d+): (?P<code>[A-Z]+\d+) (?P<text>.*)')
+
+# files given to a linter run in a subprocess at once
+_BATCH_SIZE = 1000
+
+# a parallel lint splits the files in several chunks per job, so that a
+# slow chunk does not keep the other workers idle at the end, but not in
+# chunks so small that starting the linter dominates
+_CHUNKS_PER_JOB = 4
+_MIN_CHUNK_FILES = 8
+
+
+@dataclasses.dataclass(frozen=True)
+class LinterMessage:
+    '''
+    A message of a linter reporting pyflakes codes. The column counts from 1
+    and is None when unknown.
+    '''
+    file_path: str
+    line_no: int
+    col: tp.Optional[int]
+    code: str
+    text: str
+
+
+def _full_names(node: tp.Union[ast.Import, ast.ImportFrom], alias: ast.alias) -> tp.Tuple[str, ...]:
+    # the names pyflakes and ruff give the import, with and without its alias
+    if isinstance(node, ast.Import):
+        full_name = alias.name
+    else:
+        module = '.' * node.level + (node.module or '')
+        full_name = module + alias.name if module.endswith('.') else f'{module}.{alias.name}'
+    if alias.asname:
+        return (full_name, f'{full_name} as {alias.asname}')
+    return (full_name,)
+
+
+def _bound_names(node: tp.Union[ast.Import, ast.ImportFrom], alias: ast.alias) -> tp.Tuple[str, ...]:
+    if alias.asname:
+        return (alias.asname,)
+    if isinstance(node, ast.Import):
+        # `import a.b` binds `a`, pyflakes names it `a.b`
+        return (alias.name, alias.name.split('.')[0])
+    return (alias.name,)
+
+
+class ImportStatements:
+    '''
+    The import statements of a module, by the lines they span, to find the
+    import a message of pyflakes, flake8 or ruff is about. These linters give
+    the same name to `import a.b` and `from a import b`, ruff leaves out the
+    alias and reports the line of the name rather than of the statement.
+    '''
+
+    def __init__(self, tree: ast.AST):
+        self._statements: tp.Dict[int, tp.Union[ast.Import, ast.ImportFrom]] = {}
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                for line_no in range(node.lineno, (node.end_lineno or node.lineno) + 1):
+                    self._statements[line_no] = node
+
+    def find(self, line_no: int, col: tp.Optional[int], name: str, bound: bool = False
+            ) -> tp.Optional[tp.Tuple[tp.Union[ast.Import, ast.ImportFrom], ast.alias]]:
+        '''
+        Return the statement on `line_no` and its alias named `name`, or that
+        binds `name` if `bound`. None is returned if there is no such alias,
+        or more than one that the column `col` does not tell apart.
+        '''
+        node = self._statements.get(line_no)
+        if node is None:
+            return None
+        names = _bound_names if bound else _full_names
+        aliases = [alias for alias in node.names if name in names(node, alias)]
+        if len(aliases) > 1 and col is not None:
+            # ruff points at the name, the aliases have positions since python 3.10
+            aliases = [alias for alias in aliases if getattr(alias, 'lineno', None) == line_no
+                    and alias.col_offset < col <= alias.end_col_offset] or aliases
+        return (node, aliases[0]) if len(aliases) == 1 else None
+
+
+def warning_from_message(statements: ImportStatements, file_path: str, message: LinterMessage
+        ) -> tp.Optional[BaseWarning]:
+    '''
+    Return the warning of a F401 or F811 `message` about the module of the
+    import `statements`, with the line of the statement like pylint. None is
+    returned when the message is not about an import the delinter can fix,
+    eg the redefinition of a function, or of a name imported from another
+    module, which is no reimport.
+    '''
+    if message.code == 'F401':
+        if os.path.basename(file_path) == '__init__.py':
+            # like pylint, do not report unused imports of a package __init__
+            return None
+        m = _UNUSED_IMPORT.search(message.text)
+        found = m and statements.find(message.line_no, message.col, m.group('name'))
+        if not found:
+            return None
+        node, alias = found
+        if isinstance(node, ast.Import):
+            return UnusedImportsWarning(file_path=file_path, line_no=node.lineno,
+                    alias=alias.asname, dotted_as_name=alias.name)
+        # `from . import a` has no module, like in the warnings of the libcst detector
+        return UnusedFromImportsWarning(file_path=file_path, line_no=node.lineno,
+                import_as_name=alias.name, dotted_as_name=node.module or '', alias=alias.asname)
+    if message.code == 'F811':
+        m = _REDEFINITION.search(message.text)
+        if not m:
+            return None
+        found = statements.find(message.line_no, message.col, m.group('name'), bound=True)
+        first = statements.find(int(m.group('line_no')), None, m.group('name'), bound=True)
+        if not (found and first and _full_names(*found)[0] == _full_names(*first)[0]):
+            return None
+        node, alias = found
+        return ReimportWarning(file_path=file_path, line_no=node.lineno, import_as_name=alias.name)
+    return None
+
+
+def warnings_from_messages(messages: tp.Iterable[LinterMessage],
+        files: tp.Iterable[tp.Union[str, os.PathLike]]) -> tp.List[BaseWarning]:
+    '''
+    Return the warnings of the F401 and F811 `messages` about the `files`,
+    reading the import statements of each file with messages. The warnings
+    hold the paths of `files` rather than the reported ones.
+    '''
+    file_paths = {normalize_path(file_path): str(file_path) for file_path in files}
+    by_file: tp.Dict[str, tp.List[LinterMessage]] = {}
+    for message in messages:
+        by_file.setdefault(normalize_path(message.file_path), []).append(message)
+    warnings = []
+    for file_path, file_messages in by_file.items():
+        file_path = file_paths.get(file_path, file_messages[0].file_path)
+        try:
+            with open(file_path, 'rb') as f:
+                statements = ImportStatements(ast.parse(f.read(), file_path))
+        except (OSError, SyntaxError, ValueError) as e:
+            _logger.warning('Unable to read the imports of %s: %s', file_path, e)
+            continue
+        for message in file_messages:
+            warning = warning_from_message(statements, file_path, message)
+            if warning is not None:
+                warnings.append(warning)
+    return warnings
+
+
+def _run_tool(args: tp.List[str]) -> str:
+    try:
+        completed = subprocess.run(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True)
+    except OSError as e:
+        raise ValueError(f'Unable to run {args[0]}: {e}')
+    if completed.returncode != 0:
+        raise ValueError(f'{" ".join(args[:3])} failed: {completed.stderr.strip()}')
+    return completed.stdout
+
+
+def _tool_command(name: str) -> tp.List[str]:
+    # the tool of the environment of the delinter, or else the one on the path
+    if importlib.util.find_spec(name) is not None:
+        return [sys.executable, '-m', name]
+    executable = shutil.which(name)
+    if executable is None:
+        raise ValueError(f'{name} is not installed')
+    return [executable]
+
+
+class LinterBackend:
+    '''
+    A linter that finds the warnings of the delinter in a list of files.
+    '''
+
+    name = ''
+    # whether the files are split over a process pool to lint them in
+    # parallel, see `run_linter`
+    parallel = True
+
+    def run(self, files: tp.Sequence[tp.Union[str, os.PathLike]],
+            delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+            sources: tp.Optional[tp.Mapping[str, str]] = None) -> tp.List[BaseWarning]:
+        '''
+        Lint the `files` and return the warnings of the message ids in
+        `delinter_classes`. The `sources` map some of the files to an unsaved
+        content that is linted instead, see `run_pylint`.
+        '''
+        raise NotImplementedError
+
+
+class PylintBackend(LinterBackend):
+
+    name = 'pylint'
+
+    def run(self, files, delinter_classes, sources=None):
+        return run_pylint(files, delinter_classes, sources)
+
+
+class PyflakesCodesBackend(LinterBackend):
+    '''
+    A linter that reports the pyflakes codes, whose F401 and F811 messages
+    are mapped onto the W0611 and W0404 warnings of pylint.
+    '''
+
+    def run(self, files, delinter_classes, sources=None):
+        if sources:
+            raise ValueError(f'{self.name} cannot lint unsaved sources')
+        codes = [code for code, msg_id in PYFLAKES_CODES.items() if msg_id in delinter_classes]
+        if not codes or not files:
+            return []
+        messages = (message for start in range(0, len(files), _BATCH_SIZE)
+                for message in self.messages(files[start:start + _BATCH_SIZE], codes))
+        return warnings_from_messages(
+                (message for message in messages if message.code in codes), files)
+
+    def messages(self, files: tp.Sequence[tp.Union[str, os.PathLike]],
+            codes: tp.Sequence[str]) -> tp.Iterable[LinterMessage]:
+        raise NotImplementedError
+
+
+class _PyflakesReporter:
+
+    def __init__(self):
+        self.messages = []
+
+    def flake(self, message):
+        self.messages.append(message)
+
+    def unexpectedError(self, filename, message):
+        _logger.warning('pyflakes failed on %s: %s', filename, message)
+
+    def syntaxError(self, filename, message, line_no, offset, text):
+        _logger.warning('pyflakes failed on %s:%s: %s', filename, line_no, message)
+
+
+class PyflakesBackend(PyflakesCodesBackend):
+    '''
+    Run pyflakes in this process.
+    '''
+
+    name = 'pyflakes'
+
+    def messages(self, files, codes):
+        try:
+            from pyflakes import api
+            from pyflakes import messages
+        except ImportError:
+            raise ValueError('pyflakes is not installed')
+        message_codes = {messages.UnusedImport: 'F401', messages.RedefinedWhileUnused: 'F811'}
+        reporter = _PyflakesReporter()
+        for file_path in files:
+            api.checkPath(str(file_path), reporter)
+        for message in reporter.messages:
+            code = message_codes.get(type(message))
+            if code is not None:
+                yield LinterMessage(message.filename, message.lineno, message.col + 1,
+                        code, message.message % message.message_args)
+
+
+class Flake8Backend(PyflakesCodesBackend):
+
+    # flake8 and ruff lint in parallel on their own
+    name = 'flake8'
+    parallel = False
+
+    def messages(self, files, codes):
+        output = _run_tool([*_tool_command('flake8'), '--select', ','.join(codes),
+                '--exit-zero', '--format', 'default', *map(str, files)])
+        for line in output.splitlines():
+            m = _FLAKE8_LINE.fullmatch(line)
+            if m:
+                yield LinterMessage(m.group('path'), int(m.group('line_no')),
+                        int(m.group('col')), m.group('code'), m.group('text'))
+
+
+class RuffBackend(PyflakesCodesBackend):
+
+    name = 'ruff'
+    parallel = False
+
+    def messages(self, files, codes):
+        output = _run_tool([*_tool_command('ruff'), 'check', '--select', ','.join(codes),
+                '--exit-zero', '--no-fix', '--output-format', 'json', *map(str, files)])
+        for message in json.loads(output or '[]'):
+            yield LinterMessage(message['filename'], message['location']['row'],
+                    message['location']['column'], message['code'], message['message'])
+
+
+LINTER_PYLINT = PylintBackend.name
+
+LINTER_BACKENDS: tp.Dict[str, tp.Type[LinterBackend]] = {
+        class_.name: class_
+        for class_ in (PylintBackend, PyflakesBackend, Flake8Backend, RuffBackend)}
+
+
+def _package_root(file_path: tp.Union[str, os.PathLike]) -> str:
+    # the folder above the outermost package of the module, which pylint
+    # puts on sys.path to import the modules it lints
+    root = os.path.dirname(os.path.abspath(file_path))
+    while os.path.isfile(os.path.join(root, '__init__.py')):
+        parent = os.path.dirname(root)
+        if parent == root:
+            break
+        root = parent
+    return root
+
+
+def _lint_chunk(name: str, files: tp.Sequence[tp.Union[str, os.PathLike]],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+        package_roots: tp.Sequence[str],
+        sources: tp.Optional[tp.Mapping[str, str]] = None) -> WarningIndex:
+    # run in a worker, which may lint several chunks
+    sys.path[:0] = [root for root in package_roots if root not in sys.path]
+    return WarningIndex(LINTER_BACKENDS[name]().run(files, delinter_classes, sources))
+
+
+def run_linter(name: str, files: tp.Sequence[tp.Union[str, os.PathLike]],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+        jobs: int = 1,
+        sources: tp.Optional[tp.Mapping[str, str]] = None) -> WarningIndex:
+    '''
+    Lint the `files` with the linter `name` and index the warnings of the
+    message ids in `delinter_classes`, with the unsaved `sources` of some of
+    the files, see `LinterBackend.run`. With more than one job, the files are
+    split in chunks of about the same size, see `delinter.discovery.chunk_files`,
+    that are linted in a process pool, and the warnings are merged in the
+    order of the chunks.
+
+    A chunk is linted like the whole run would be, except for the other
+    files: the package roots of all the files are put on sys.path, as
+    pylint does for its own jobs, so that a module imported from another
+    chunk resolves the same way.
+    '''
+    backend = LINTER_BACKENDS[name]()
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    count = min(jobs * _CHUNKS_PER_JOB, len(files) // _MIN_CHUNK_FILES)
+    if not backend.parallel or jobs <= 1 or count <= 1:
+        return WarningIndex(backend.run(files, delinter_classes, sources))
+    chunks = chunk_files(files, count)
+    package_roots = sorted({_package_root(file_path) for file_path in files})
+    warning_index = WarningIndex()
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+        futures = [executor.submit(_lint_chunk, name, chunk, delinter_classes, package_roots,
+                        sources and {str(f): sources[str(f)] for f in chunk if str(f) in sources})
+                for chunk in chunks]
+        for future in futures:
+            warning_index.update(future.result())
+    return warning_index
@@ -15,29 +15,73 @@ also be used as template for Python modules.
 Note: This skeleton file can be safely removed if not needed!
 """
 
+import io
 import os
 import re
 import sys
+import json
+import base64
 import typing as tp
-import difflib
+import cProfile
 import logging
+import tokenize
 import argparse
 import collections
 import dataclasses
+import multiprocessing
 from typing import Set
 from typing import Dict
 from typing import Union
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import libcst as cst
-from pylint import epylint as lint
 
 from delinter import __version__
+from delinter import client
+from delinter import merge
 from delinter.imports import UnusedImportsDelinter
 from delinter.imports import RemoveUnusedImportTransformer
 from delinter.imports import ReimportDelinter
 from delinter.imports import ReimportTransformer
+from delinter.imports import BaseImportTransformer
+from delinter.imports import CombinedImportTransformer
+from delinter.imports import BaseWarning
+from delinter.imports import UnusedFromImportsWarning
+from delinter.imports import FileWarnings
+from delinter.imports import detect_import_warnings
+from delinter.imports import transform_module
+from delinter.imports import warning_from_dict
+from delinter.imports import warning_to_dict
+from delinter.cache import DEFAULT_MAX_BYTES
+from delinter.cache import ResultCache
+from delinter.discovery import FileFilter
+from delinter.discovery import filter_files
+from delinter.discovery import find_python_files
+from delinter.discovery import git_changed_files
+from delinter.discovery import parse_shard
+from delinter.discovery import shard_files
+from delinter.imports import WarningIndex
+from delinter.imports import normalize_path
+from delinter.linters import LINTER_BACKENDS
+from delinter.linters import LINTER_PYLINT
+from delinter.linters import run_linter
+from delinter.linters import run_pylint_on_source
+from delinter.linters import iter_pylint_warnings
+from delinter.reports import index_reports
+from delinter.writer import AtomicWriter
+from delinter.profiling import Profiler
+from delinter.profiling import Span
+from delinter.diffs import Edit
+from delinter.diffs import apply_edits
+from delinter.diffs import changed_edits
+from delinter.diffs import edit_from_dict
+from delinter.diffs import edit_to_dict
+from delinter.diffs import edits_from_lines
+from delinter.diffs import split_lines
+from delinter.diffs import unified_diff
+from delinter.header import split_import_header
 
 
 __author__ = "grdvnl"
@@ -52,8 +96,73 @@ SUPPORTED_LINTER_MAP = {
         ReimportDelinter.CODE: (ReimportDelinter, ReimportTransformer)
         }
 
+ALL_MSG_IDS = 'all'
+
+DETECTOR_PYLINT = 'pylint'
+DETECTOR_LIBCST = 'libcst'
+# run both detectors, fix with the pylint warnings and report the differences
+DETECTOR_CROSS_CHECK = 'cross-check'
+DETECTORS = (DETECTOR_PYLINT, DETECTOR_LIBCST, DETECTOR_CROSS_CHECK)
+
+FORMAT_DIFF = 'diff'
+# one json record per file
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_DIFF, FORMAT_NDJSON)
+
+# fixes of a file with --until-stable, past which it is left as is
+MAX_STABLE_ROUNDS = 10
+
 pylint_str = str # output formatted string of Pylint output
 
+
+def parse_msg_ids(msg_ids: tp.Union[str, tp.Iterable[str]]) -> tp.Tuple[str, ...]:
+    '''
+    Parse a comma separated list of message ids, eg `W0611,W0404`, into a
+    tuple of unique ids. `all` selects every supported message id.
+    '''
+    if isinstance(msg_ids, str):
+        msg_ids = msg_ids.split(',')
+    parsed = []
+    for msg_id in msg_ids or ():
+        msg_id = msg_id.strip()
+        if not msg_id:
+            continue
+        if msg_id.lower() == ALL_MSG_IDS:
+            parsed.extend(SUPPORTED_LINTER_MAP)
+            continue
+        if msg_id not in SUPPORTED_LINTER_MAP:
+            raise ValueError(f'{msg_id} not currently supported for delinting.')
+        parsed.append(msg_id)
+    if not parsed:
+        raise ValueError('No message id provided for delinting.')
+    return tuple(dict.fromkeys(parsed))
+
+
+def _msg_ids_arg(value: str) -> tp.Tuple[str, ...]:
+    try:
+        return parse_msg_ids(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _shard_arg(value: str) -> tp.Tuple[int, int]:
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def get_transformer(msg_ids: tp.Union[str, tp.Iterable[str]],
+        warnings) -> BaseImportTransformer:
+    '''
+    Return a single transformer applying the fixes of all the `msg_ids`.
+    '''
+    transformer_classes = [SUPPORTED_LINTER_MAP[msg_id][1] for msg_id in parse_msg_ids(msg_ids)]
+    if len(transformer_classes) == 1:
+        return transformer_classes[0](warnings)
+    return CombinedImportTransformer(warnings, transformer_classes)
+
+
 class Delinter:
 
     pattern = re.compile(
@@ -63,8 +172,7 @@ class Delinter:
     @classmethod
     def parse_linter_warnings(cls, warnings: tp.Iterable[pylint_str], msg_id):
 
-        if msg_id not in SUPPORTED_LINTER_MAP:
-            raise ValueError(f'{msg_id} not currently supported for delinting.')
+        msg_ids = parse_msg_ids(msg_id)
         parsed_warnings = []
         for warning in warnings:
             m = re.match(cls.pattern, warning)
@@ -76,9 +184,7 @@ class Delinter:
             code = m.group('code')
             warning_text = m.group('warning')
 
-            if code != msg_id:
-                continue
-            if code not in SUPPORTED_LINTER_MAP:
+            if code not in msg_ids:
                 continue
             class_ = SUPPORTED_LINTER_MAP[code][0]
             parsed_warning = class_.parse_linter_warning(
@@ -86,6 +192,14 @@ class Delinter:
             parsed_warnings.append(parsed_warning)
         return parsed_warnings
 
+    @classmethod
+    def index_linter_warnings(cls, warnings: tp.Iterable[pylint_str], msg_id) -> WarningIndex:
+        '''
+        Parse the linter warnings into a `WarningIndex` keyed by file path and
+        line number, so that each file only looks up its own warnings.
+        '''
+        return WarningIndex(cls.parse_linter_warnings(warnings, msg_id))
+
 def get_arg_parser():
     '''
     Return the arg parse for the delinter.
@@ -126,11 +240,252 @@ def get_arg_parser():
             ''')
     parser.add_argument(
             '--msg_id',
+            type=_msg_ids_arg,
+            help=("The pylint message that will be delinterd. Eg W0611. "
+                "Several messages can be fixed in one pass with a comma "
+                "separated list, eg W0611,W0404, or all supported messages with 'all'."))
+
+    parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=1,
+            help=("Number of worker processes used to lint and fix files in parallel. "
+                "Use 0 to use all the available cores. The files are linted in chunks "
+                "of about the same size, keeping the modules of a folder together. "
+                "The diffs are printed in the same order as a serial run."))
+
+    parser.add_argument(
+            '--detector',
+            choices=DETECTORS,
+            default=DETECTOR_PYLINT,
+            help=("How the warnings are found. 'libcst' detects unused imports and "
+                "reimports from the parsed module without running pylint. "
+                "'cross-check' runs both, fixes with the pylint warnings and reports "
+                "the differences on stderr."))
+
+    parser.add_argument(
+            '--linter',
+            choices=list(LINTER_BACKENDS),
+            default=LINTER_PYLINT,
+            help=("The linter that finds the warnings, unless the detector is 'libcst'. "
+                "The unused imports and redefinitions that pyflakes, flake8 and ruff "
+                "report as F401 and F811 are fixed as W0611 and W0404. Flake8 and "
+                "ruff are run from the environment of the delinter, or else from the "
+                "path."))
+
+    parser.add_argument(
+            '--from-report',
+            action='append',
+            metavar='FILE',
+            default=None,
+            help=("Take the warnings from a saved pylint report instead of running "
+                "pylint, either its text output with the msg-template of the delinter "
+                "or the parseable format, or its json output. Can be given several "
+                "times. The warnings of a file modified after its report was written "
+                "are ignored."))
+
+    parser.add_argument(
+            '--cache-dir',
             type=str,
-            help=("The pylint message that will be delinterd. Eg W0611"))
+            default=None,
+            help=("Directory of a persistent cache of the warnings and fixes of each "
+                "file, keyed by its content. Unchanged files skip pylint and parsing. "
+                "The directory can be shared between runs and machines."))
+
+    parser.add_argument(
+            '--cache-max-size',
+            type=int,
+            default=DEFAULT_MAX_BYTES // 2 ** 20,
+            help=("Size in MB above which the least recently used cache entries "
+                "are evicted."))
+
+    parser.add_argument(
+            '--changed-since',
+            type=str,
+            metavar='REV',
+            default=None,
+            help=("Only lint and fix the .py files changed since the current branch "
+                "forked from the git revision REV, eg origin/master, including "
+                "uncommitted changes."))
+
+    parser.add_argument(
+            '--staged',
+            action='store_true',
+            help="Only lint and fix the .py files staged in the git index.")
+
+    parser.add_argument(
+            '--exclude',
+            action='append',
+            metavar='GLOB',
+            default=None,
+            help=("Skip the files and folders whose path relative to file_path_or_folder, "
+                "or whose name, matches GLOB, eg 'tests/*' or '*_pb2.py'. Can be given "
+                "several times. Virtualenvs, caches and version control folders are "
+                "always skipped."))
+
+    parser.add_argument(
+            '--include',
+            action='append',
+            metavar='GLOB',
+            default=None,
+            help=("Only lint and fix the .py files whose relative path or name matches "
+                "GLOB. Can be given several times."))
+
+    parser.add_argument(
+            '--no-gitignore',
+            action='store_true',
+            help="Also lint and fix the .py files ignored by the .gitignore files.")
+
+    parser.add_argument(
+            '--max-file-size',
+            type=int,
+            metavar='KB',
+            default=None,
+            help="Skip the .py files larger than KB kilobytes, eg generated modules.")
+
+    parser.add_argument(
+            '--skip-generated',
+            action='store_true',
+            help=("Skip the .py files whose leading comments mark them as generated, "
+                "eg with '@generated' or 'DO NOT EDIT'."))
+
+    parser.add_argument(
+            '--shard',
+            type=_shard_arg,
+            metavar='i/N',
+            default=None,
+            help=("Only lint and fix the i-th of N shards of the files, to split a run "
+                "over N machines. A file is assigned by a hash of its path relative to "
+                "file_path_or_folder. The outputs of the shards are combined with "
+                "'delint merge'."))
+
+    parser.add_argument(
+            '--shard-by-size',
+            action='store_true',
+            help=("With --shard, spread the files so that the shards have about the "
+                "same number of bytes. Every shard must see the same files."))
+
+    parser.add_argument(
+            '--stream',
+            action='store_true',
+            help=("Fix and print the diff of each file as soon as pylint is done "
+                "with it, instead of waiting for pylint to lint the whole tree. "
+                "The diffs follow the order pylint lints the files in."))
+
+    parser.add_argument(
+            '--stream-buffer',
+            type=int,
+            default=64,
+            metavar='FILES',
+            help=("With --stream, the number of linted files that may wait to be "
+                "fixed before pylint pauses."))
+
+    parser.add_argument(
+            '-w',
+            '--write',
+            action='store_true',
+            help=("Fix the files in place instead of printing a diff. Each file is "
+                "replaced atomically and keeps its encoding and line endings."))
+
+    parser.add_argument(
+            '--summary',
+            action='store_true',
+            help="With --write, print the path of each modified file and a total.")
+
+    parser.add_argument(
+            '--until-stable',
+            action='store_true',
+            help=("Fix the modified files again until the fix changes nothing, eg "
+                "to remove the imports a removed reimport left unused. Only the "
+                "modified files are linted again, in one run per round over the "
+                "--jobs workers, and a file gets a single diff of all the rounds "
+                "with the warnings of the first round. Does not work with --stream."))
+
+    parser.add_argument(
+            '--check-compile',
+            action='store_true',
+            help=("With --until-stable, byte-compile the fixed source of each "
+                "modified file and leave the files that fail to compile as they "
+                "are, with an error."))
+
+    parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=FORMAT_DIFF,
+            help=("Output format. 'ndjson' prints one json record per file, with the "
+                "warnings of the file and the edits of the fix as line ranges and "
+                "their new lines. In write mode, a record tells if the file was "
+                "modified."))
+
+    parser.add_argument(
+            '--include-diff',
+            action='store_true',
+            help="With --format ndjson, add the unified diff of the fix to each record.")
+
+    parser.add_argument(
+            '--profile',
+            type=str,
+            metavar='FILE',
+            default=None,
+            help=("Write a JSON summary of the wall and CPU time, the files, bytes "
+                "and warnings of each stage to FILE, along with the slowest files."))
+
+    parser.add_argument(
+            '--trace',
+            type=str,
+            metavar='FILE',
+            default=None,
+            help=("Write the timings of each stage and file to FILE as Chrome trace "
+                "events, to load in chrome://tracing or Perfetto."))
+
+    parser.add_argument(
+            '--cprofile',
+            type=str,
+            metavar='FILE',
+            default=None,
+            help=("Profile the main process with cProfile and dump the stats to FILE, "
+                "to read with pstats. Worker processes are not profiled."))
+
+    parser.add_argument(
+            '--stdin-filename',
+            type=str,
+            metavar='PATH',
+            default=None,
+            help=("Fix the source read from stdin, eg an editor buffer, as the "
+                "content of PATH and print the fixed source. PATH is not read."))
+
+    parser.add_argument(
+            '--serve',
+            action='store_true',
+            help=("Run a server that keeps pylint, libcst and the recently parsed "
+                "modules warm and fixes the requests of --daemon runs, until it "
+                "received no request for --idle-timeout seconds."))
+
+    parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help=("Have the server on --socket lint and fix the files, starting it "
+                "in the background if it is not running."))
+
+    parser.add_argument(
+            '--socket',
+            type=str,
+            metavar='PATH',
+            default=client.default_socket_path(),
+            help=("Unix socket of the server. By default, a socket named after the "
+                "user and the delinter version in $XDG_RUNTIME_DIR or the temporary folder."))
+
+    parser.add_argument(
+            '--idle-timeout',
+            type=float,
+            metavar='SECONDS',
+            default=client.DEFAULT_IDLE_TIMEOUT,
+            help="Seconds without a request after which the server exits.")
 
     parser.add_argument('file_path_or_folder',
             type=str,
+            nargs='?',
             help=(
             "Path to a .py file or folder contain *.py files. "
             "This relative path will be used to generate the unified diff files.")
@@ -157,53 +512,672 @@ def get_arg_parser():
         const=logging.DEBUG)
     return parser
 
+@dataclasses.dataclass(frozen=True)
+class FixOptions:
+    '''
+    Settings shared by every file of a run.
+    '''
+    msg_ids: tp.Tuple[str, ...]
+    sep: str = '/'
+    detector: str = DETECTOR_PYLINT
+    linter: str = LINTER_PYLINT
+    write: bool = False
+    profile: bool = False
+    # keep the edits of the fix in write mode, they are always kept with a diff
+    edits: bool = False
+
+
+@dataclasses.dataclass
+class FileResult:
+    '''
+    Outcome of fixing a single file. In cross-check mode, the warnings only
+    one of pylint and libcst reported are kept for the parity report. In
+    write mode, no diff is built and the fixed module is kept instead when it
+    differs from the file. `edits` are the changed lines of the fix. When
+    profiling, the timings of the fix are kept in `spans`.
+    '''
+    file_path: tp.Union[str, Path]
+    diff: str = ''
+    fixed_source: tp.Optional[tp.Union[bytes, str]] = None
+    warnings: tp.List[BaseWarning] = dataclasses.field(default_factory=list)
+    edits: tp.List[Edit] = dataclasses.field(default_factory=list)
+    pylint_only: tp.List[BaseWarning] = dataclasses.field(default_factory=list)
+    libcst_only: tp.List[BaseWarning] = dataclasses.field(default_factory=list)
+    spans: tp.List[Span] = dataclasses.field(default_factory=list)
+
+
 def _run_delinter(options):
     '''
     Run the delinter and produce the diff.
     '''
     root_file_path = options.file_path_or_folder
     # TODO: Handle Windows paths
-    if Path(root_file_path).is_absolute():
-        msg_template = r'{abspath}:{line}:[{msg_id}({symbol}),{obj}]{msg}'
-        sep = ''
-    else:
-        msg_template = r'{path}:{line}:[{msg_id}({symbol}),{obj}]{msg}'
-        sep = '/'
-
-    pylint_command = f"{root_file_path} --enable=W --disable=C,R,E,F --msg-template={msg_template} --score=n"
-
-    out, _ = lint.py_run(pylint_command, return_std=True)
-    orig_result = "".join(out.readlines()).split('\n')
-    result = [r.strip() for r in orig_result if r.strip() and not r.strip().
-            startswith('************* Module ')]
-    parsed_warnings = Delinter.parse_linter_warnings(result, options.msg_id)
-    if os.path.isdir(root_file_path):
-        files = list(Path(root_file_path).glob('**/*.py'))
+    sep = '' if Path(root_file_path).is_absolute() else '/'
+    profiler = Profiler(enabled=bool(options.profile or options.trace))
+    ndjson = options.format == FORMAT_NDJSON
+    fix_options = FixOptions(msg_ids=options.msg_id, sep=sep, detector=options.detector,
+            linter=options.linter, write=options.write, profile=profiler.enabled, edits=ndjson)
+
+    with profiler.span('run', jobs=options.jobs):
+        with profiler.span('discover') as discover_args:
+            file_filter = FileFilter(
+                    exclude=tuple(options.exclude or ()),
+                    include=tuple(options.include or ()),
+                    gitignore=not options.no_gitignore,
+                    max_size=options.max_file_size and options.max_file_size * 2 ** 10,
+                    skip_generated=options.skip_generated)
+            if options.changed_since or options.staged:
+                files = filter_files(git_changed_files(
+                        root_file_path, rev=options.changed_since, staged=options.staged),
+                        root_file_path, file_filter)
+            elif os.path.isdir(root_file_path):
+                files = find_python_files(root_file_path, file_filter)
+            else:
+                files = filter_files([root_file_path], root_file_path, file_filter)
+            if options.shard:
+                files = shard_files(
+                        files, options.shard, root_file_path, by_size=options.shard_by_size)
+            discover_args['files'] = len(files)
+
+        cache = None
+        if options.cache_dir:
+            cache = ResultCache(options.cache_dir, max_bytes=options.cache_max_size * 2 ** 20)
+
+        if options.daemon:
+            results = _iter_server_results(files, fix_options, options)
+        elif options.stream:
+            results = _iter_streamed_results(
+                    files, fix_options, options.jobs, max_pending=options.stream_buffer)
+        else:
+            results = _iter_run_results(files, fix_options, options.jobs, cache, profiler,
+                    report_paths=options.from_report)
+        if options.until_stable:
+            results = _iter_stable_results(
+                    results, fix_options, options.jobs, options.check_compile)
+
+        mismatched_files = 0
+        with AtomicWriter() as writer:
+            for result in results:
+                profiler.extend(result.spans)
+                if ndjson:
+                    print(json.dumps(_result_to_record(result, fix_options, options.include_diff)),
+                            flush=options.stream)
+                elif result.diff:
+                    print(result.diff, flush=options.stream)
+                if result.fixed_source is not None:
+                    writer.write(result.file_path, result.fixed_source)
+                    if options.summary:
+                        print(result.file_path, flush=options.stream)
+                if result.pylint_only or result.libcst_only:
+                    mismatched_files += 1
+                    _print_mismatch(result)
+        if options.write and options.summary:
+            print(f'{len(writer.written)} of {len(files)} files modified')
+        if fix_options.detector == DETECTOR_CROSS_CHECK:
+            print(f'cross-check: {mismatched_files} of {len(files)} files differ '
+                    'between pylint and libcst', file=sys.stderr)
+        if cache is not None:
+            cache.evict()
+            _logger.info('cache: %s hits, %s misses', cache.hits, cache.misses)
+
+    if options.profile:
+        profiler.write_summary(options.profile)
+    if options.trace:
+        profiler.write_chrome_trace(options.trace)
+
+
+def _run_on_buffer(options):
+    '''
+    Fix the source read from stdin and print the fixed source.
+    '''
+    source_code = sys.stdin.read()
+    fix_options = FixOptions(msg_ids=options.msg_id, detector=options.detector)
+    if options.daemon:
+        response = client.request(options.socket, dict(
+                command='fix',
+                msg_ids=list(fix_options.msg_ids),
+                detector=fix_options.detector,
+                file_path=os.path.abspath(options.stdin_filename),
+                source=source_code), idle_timeout=options.idle_timeout)
+        fixed_source = response['results'][0]['fixed_source']
+        if options.until_stable and fixed_source is not None:
+            # the next rounds are run here
+            stable_source = fix_buffer_until_stable(options.stdin_filename, fixed_source,
+                    fix_options, MAX_STABLE_ROUNDS - 1).fixed_source
+            if stable_source is not None:
+                fixed_source = stable_source
+    elif options.until_stable:
+        fixed_source = fix_buffer_until_stable(
+                options.stdin_filename, source_code, fix_options).fixed_source
     else:
-        files = [root_file_path]
+        fixed_source = fix_buffer(options.stdin_filename, source_code, fix_options).fixed_source
+    sys.stdout.write(source_code if fixed_source is None else fixed_source)
+
+
+def _iter_server_results(
+        files: tp.Sequence[tp.Union[str, Path]],
+        fix_options: FixOptions,
+        options) -> tp.Iterator[FileResult]:
+    '''
+    Have the server lint and fix the `files`, yielding one result per file
+    in their order. The server is sent absolute paths, and the diffs and
+    warnings are given back the paths of `files`.
+    '''
+    if not files:
+        return
+    response = client.request(options.socket, dict(
+            command='fix',
+            msg_ids=list(fix_options.msg_ids),
+            detector=fix_options.detector,
+            linter=fix_options.linter,
+            write=fix_options.write,
+            edits=fix_options.edits,
+            file_paths=[os.path.abspath(file_path) for file_path in files]),
+            idle_timeout=options.idle_timeout)
+    for file_path, entry in zip(files, response['results']):
+        result = _result_from_cache(entry, file_path, fix_options.sep)
+        if entry['fixed_source'] is not None:
+            result.fixed_source = base64.b64decode(entry['fixed_source'])
+        yield result
+
+
+def _iter_run_results(
+        files: tp.Sequence[tp.Union[str, Path]],
+        fix_options: FixOptions,
+        jobs: int = 1,
+        cache: tp.Optional[ResultCache] = None,
+        profiler: tp.Optional[Profiler] = None,
+        report_paths: tp.Optional[tp.Sequence[str]] = None) -> tp.Iterator[FileResult]:
+    '''
+    Lint and fix the `files`, yielding one result per file in their order.
+    The linter is given the same explicit list of files as the fix stage, split
+    over `jobs` workers, unless the warnings are read from the saved pylint
+    reports at `report_paths`. With a `cache`, unchanged files are served
+    from it and only the other files are linted and parsed. In write mode,
+    only the files left clean are served from the cache, since an entry holds
+    the diff but not the fixed module.
+    '''
+    profiler = profiler or Profiler(enabled=False)
+    cached: Dict[int, FileResult] = {}
+    keys: Dict[int, str] = {}
+    if cache is not None:
+        settings = (*fix_options.msg_ids, fix_options.detector)
+        if fix_options.linter != LINTER_PYLINT:
+            settings += (fix_options.linter,)
+        with profiler.span('cache_lookup', files=len(files)) as lookup_args:
+            for i, file_path in enumerate(files):
+                with open(file_path, 'rb') as f:
+                    key = cache.key(file_path, f.read(), settings)
+                entry = cache.get(key)
+                if entry is None or (fix_options.write and entry['warnings']):
+                    keys[i] = key
+                else:
+                    cached[i] = _result_from_cache(entry, file_path, fix_options.sep)
+            lookup_args['hits'] = len(cached)
+    lint_files = [file_path for i, file_path in enumerate(files) if i not in cached]
+
+    warning_index = None
+    if lint_files and fix_options.detector != DETECTOR_LIBCST:
+        delinter_classes = {
+                msg_id: SUPPORTED_LINTER_MAP[msg_id][0] for msg_id in fix_options.msg_ids}
+        if report_paths:
+            with profiler.span('read_reports', reports=len(report_paths)) as report_args:
+                warning_index = index_reports(report_paths, lint_files, delinter_classes)
+                report_args['warnings'] = len(warning_index)
+        else:
+            with profiler.span(fix_options.linter, files=len(lint_files)) as lint_args:
+                warning_index = run_linter(
+                        fix_options.linter, lint_files, delinter_classes, jobs)
+                lint_args['warnings'] = len(warning_index)
+
+    fresh_results = _iter_file_results(lint_files, warning_index, fix_options, jobs)
+    next_result = next(fresh_results, None)
+    for i, file_path in enumerate(files):
+        if i in cached:
+            yield cached[i]
+            continue
+        if next_result is not None and next_result.file_path == file_path:
+            result = next_result
+            next_result = next(fresh_results, None)
+        else:
+            # the file had no warnings, so it was neither read nor parsed
+            result = FileResult(file_path)
+        if i in keys and result.fixed_source is None:
+            cache.put(keys[i], _result_to_cache(result))
+        yield result
+
+
+def _iter_streamed_results(
+        files: tp.Sequence[tp.Union[str, Path]],
+        fix_options: FixOptions,
+        jobs: int = 1,
+        max_pending: int = 64) -> tp.Iterator[FileResult]:
+    '''
+    Fix each file with warnings as soon as pylint is done with it, yielding
+    the results in the order pylint lints the files. Only the warnings of
+    the files in flight are held in memory.
+    '''
+    if not files:
+        return
+    # map the paths pylint reports back to the paths used for the diff headers
+    file_paths = {normalize_path(file_path): file_path for file_path in files}
+    stream = iter_pylint_warnings(
+            files,
+            {msg_id: SUPPORTED_LINTER_MAP[msg_id][0] for msg_id in fix_options.msg_ids},
+            max_pending=max_pending)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        for file_path, warnings in stream:
+            file_path = file_paths.get(normalize_path(file_path), file_path)
+            yield _delint_file(file_path, FileWarnings(warnings), fix_options)
+        return
+
+    # the workers are started once the pylint thread runs, and a forked
+    # worker could inherit a lock that thread holds, so they are not forked
+    # from this process
+    start_method = ('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+            else 'spawn')
+    with ProcessPoolExecutor(max_workers=jobs,
+            mp_context=multiprocessing.get_context(start_method)) as executor:
+        in_flight: tp.Deque = collections.deque()
+        for file_path, warnings in stream:
+            file_path = file_paths.get(normalize_path(file_path), file_path)
+            in_flight.append(executor.submit(
+                    _delint_file, file_path, FileWarnings(warnings), fix_options))
+            # keep the workers busy, but do not read ahead of the output
+            while in_flight and (len(in_flight) >= 2 * jobs or in_flight[0].done()):
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _diff_headers(file_path: tp.Union[str, Path], sep: str) -> str:
+    return f'--- a{sep}{file_path}\n+++ b{sep}{file_path}\n'
+
+
+def _result_to_cache(result: FileResult) -> tp.Dict[str, tp.Any]:
+    # the diff headers and the warning paths depend on the file path, which
+    # is not part of the cache key, so they are rebuilt on load
+    return dict(
+            warnings=[warning_to_dict(w) for w in result.warnings],
+            pylint_only=[warning_to_dict(w) for w in result.pylint_only],
+            libcst_only=[warning_to_dict(w) for w in result.libcst_only],
+            edits=[edit_to_dict(edit) for edit in result.edits],
+            hunks=result.diff.split('\n', 2)[2] if result.diff else '')
+
+
+def _result_from_cache(entry: tp.Dict[str, tp.Any], file_path: tp.Union[str, Path],
+        sep: str) -> FileResult:
+    def load(warnings):
+        return [warning_from_dict(w, file_path=str(file_path)) for w in warnings]
+    hunks = entry['hunks']
+    return FileResult(
+            file_path,
+            diff=_diff_headers(file_path, sep) + hunks if hunks else '',
+            warnings=load(entry['warnings']),
+            pylint_only=load(entry['pylint_only']),
+            libcst_only=load(entry['libcst_only']),
+            edits=[edit_from_dict(edit) for edit in entry['edits']])
+
+
+def _result_to_record(result: FileResult, fix_options: FixOptions,
+        include_diff: bool = False) -> tp.Dict[str, tp.Any]:
+    '''
+    Return the ndjson record of a file.
+    '''
+    record = dict(
+            file_path=str(result.file_path),
+            warnings=[warning_to_dict(w) for w in result.warnings],
+            edits=[edit_to_dict(edit) for edit in result.edits])
+    if fix_options.detector == DETECTOR_CROSS_CHECK:
+        record['pylint_only'] = [warning_to_dict(w) for w in result.pylint_only]
+        record['libcst_only'] = [warning_to_dict(w) for w in result.libcst_only]
+    if fix_options.write:
+        record['modified'] = result.fixed_source is not None
+    elif include_diff:
+        record['diff'] = result.diff
+    return record
+
+
+def _warning_identity(warning: BaseWarning) -> tp.Tuple:
+    if isinstance(warning, UnusedFromImportsWarning) and not warning.dotted_as_name:
+        # pylint reports `from . import a` like `import a`
+        return ('UnusedImportsWarning', warning.line_no,
+                (warning.import_as_name, warning.alias))
+    return (type(warning).__name__, warning.line_no, warning.key)
+
+
+def _print_mismatch(result: FileResult):
+    for source, warnings in (('pylint', result.pylint_only), ('libcst', result.libcst_only)):
+        for warning in warnings:
+            print(f'cross-check: {result.file_path}:{warning.line_no}: only {source} reports '
+                    f'{type(warning).__name__}{warning.key}', file=sys.stderr)
 
-    for file_path in files:
-        with open(file_path) as f:
-            source_code = "".join(f.readlines())
-            if not source_code:
+
+# set by a long running server or a session, see `delinter.session.ModuleCache`
+_module_cache = None
+
+
+def set_module_cache(module_cache):
+    '''
+    Parse the modules with `module_cache`, an object with a `parse` method
+    like `cst.parse_module`, or directly again when it is None. The previous
+    module cache is returned.
+    '''
+    global _module_cache
+    previous, _module_cache = _module_cache, module_cache
+    return previous
+
+
+def _parse_module(source_code: tp.Union[str, bytes]) -> cst.Module:
+    if _module_cache is None:
+        return cst.parse_module(source_code)
+    return _module_cache.parse(source_code)
+
+
+def _decode(source_code: bytes) -> str:
+    # as python reads a module, from its coding cookie or else as utf-8
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(source_code).readline)
+    return source_code.decode(encoding)
+
+
+def fix_buffer(file_path: tp.Union[str, Path], source_code: tp.Union[str, bytes],
+        fix_options: FixOptions) -> FileResult:
+    '''
+    Lint and fix `source_code`, the unsaved content of `file_path`, eg an
+    editor buffer. The fixed source is returned in the result, with the type
+    of `source_code`, or None if nothing changed; the file itself is neither
+    read nor written.
+    '''
+    local_warnings = None
+    if fix_options.detector != DETECTOR_LIBCST:
+        if fix_options.linter != LINTER_PYLINT:
+            raise ValueError('Only pylint can lint a buffer')
+        local_warnings = FileWarnings(run_pylint_on_source(
+                file_path,
+                source_code if isinstance(source_code, str) else _decode(source_code),
+                {msg_id: SUPPORTED_LINTER_MAP[msg_id][0] for msg_id in fix_options.msg_ids}))
+    return _fix_buffer(file_path, source_code, local_warnings, fix_options)
+
+
+def _fix_buffer(file_path: tp.Union[str, Path], source_code: tp.Union[str, bytes],
+        local_warnings: tp.Optional[FileWarnings], fix_options: FixOptions) -> FileResult:
+    result = FileResult(file_path)
+    if fix_options.detector == DETECTOR_PYLINT and not local_warnings:
+        return result
+    _fix_source(result, source_code, local_warnings,
+            dataclasses.replace(fix_options, write=True), Profiler(enabled=False))
+    return result
+
+
+def fix_buffer_until_stable(file_path: tp.Union[str, Path], source_code: tp.Union[str, bytes],
+        fix_options: FixOptions, max_rounds: int = MAX_STABLE_ROUNDS) -> FileResult:
+    '''
+    Fix `source_code` like `fix_buffer`, then fix the fixed source again
+    until the fix changes nothing or `max_rounds` fixes were made. The
+    result holds the last fixed source, but only the warnings of the first
+    round, as the line numbers of the later ones are those of a fixed source.
+    '''
+    result = fix_buffer(file_path, source_code, fix_options)
+    fixed_source = result.fixed_source
+    for _ in range(max_rounds - 1):
+        if fixed_source is None:
+            return result
+        result.fixed_source = fixed_source
+        fixed_source = fix_buffer(file_path, fixed_source, fix_options).fixed_source
+    if fixed_source is not None:
+        result.fixed_source = fixed_source
+        _logger.warning('The fix of %s still changes it after %s rounds', file_path, max_rounds)
+    return result
+
+
+def _lint_sources(sources: tp.Sequence[tp.Tuple[tp.Union[str, Path], tp.Union[str, bytes]]],
+        fix_options: FixOptions, jobs: int = 1) -> tp.List[FileWarnings]:
+    '''
+    Lint the unsaved sources of files, pairs of a file path and its source,
+    in a single run of the linter over `jobs` workers, and return the
+    warnings of each file. The sources are linted in place of the files, see
+    `delinter.linters.run_pylint`, so the rest of the tree is seen as in the
+    first round.
+    '''
+    delinter_classes = {
+            msg_id: SUPPORTED_LINTER_MAP[msg_id][0] for msg_id in fix_options.msg_ids}
+    files = [str(file_path) for file_path, _ in sources]
+    warning_index = run_linter(fix_options.linter, files, delinter_classes, jobs, sources={
+            str(file_path): source_code if isinstance(source_code, str) else _decode(source_code)
+            for file_path, source_code in sources})
+    return [warning_index.for_file(file_path) for file_path in files]
+
+
+def _iter_stable_results(results: tp.Iterable[FileResult], fix_options: FixOptions,
+        jobs: int = 1, check_compile: bool = False) -> tp.Iterator[FileResult]:
+    '''
+    Fix the files the `results` modified again until they are stable, see
+    `fix_buffer_until_stable`, and yield a result per file that combines
+    all the rounds. Each round lints the files the previous round modified
+    in a single run over `jobs` workers, see `_lint_sources`, so the results
+    are only yielded once the last round is done. The other files are passed
+    through as they are, so the cost of the extra rounds only follows the
+    number of modified files. As with `fix_buffer_until_stable`, only the
+    warnings of the first round are kept. With `check_compile`, the fix of a
+    file that does not compile is dropped.
+    '''
+    results = list(results)
+    source_codes: Dict[int, tp.Union[str, bytes]] = {}
+    fixed_sources: Dict[int, tp.Union[str, bytes]] = {}
+    for i, result in enumerate(results):
+        if result.fixed_source is None and not result.edits:
+            continue
+        if fix_options.write:
+            with open(result.file_path, 'rb') as f:
+                source_codes[i] = f.read()
+            fixed_sources[i] = result.fixed_source
+        else:
+            with open(result.file_path) as f:
+                source_codes[i] = "".join(f.readlines())
+            fixed_sources[i] = "".join(
+                    apply_edits(split_lines(source_codes[i]), result.edits))
+
+    round_options = dataclasses.replace(fix_options, edits=False)
+    # the files the last round modified, and those a later round modified
+    pending = list(fixed_sources)
+    refixed: Set[int] = set()
+    for _ in range(MAX_STABLE_ROUNDS - 1):
+        if not pending:
+            break
+        round_warnings: tp.List[tp.Optional[FileWarnings]] = [None] * len(pending)
+        if fix_options.detector != DETECTOR_LIBCST:
+            round_warnings = _lint_sources(
+                    [(results[i].file_path, fixed_sources[i]) for i in pending],
+                    fix_options, jobs)
+        modified = []
+        for i, local_warnings in zip(pending, round_warnings):
+            fixed_source = _fix_buffer(results[i].file_path, fixed_sources[i],
+                    local_warnings, round_options).fixed_source
+            if fixed_source is not None:
+                fixed_sources[i] = fixed_source
+                refixed.add(i)
+                modified.append(i)
+        pending = modified
+    for i in pending:
+        _logger.warning('The fix of %s still changes it after %s rounds',
+                results[i].file_path, MAX_STABLE_ROUNDS)
+
+    for i, result in enumerate(results):
+        if i not in fixed_sources:
+            yield result
+            continue
+        file_path = result.file_path
+        source_code, fixed_source = source_codes[i], fixed_sources[i]
+        if check_compile:
+            try:
+                compile(fixed_source, str(file_path), 'exec', dont_inherit=True)
+            except (SyntaxError, ValueError) as e:
+                _logger.error('The fix of %s does not compile and is dropped: %s', file_path, e)
+                yield FileResult(file_path, warnings=result.warnings)
                 continue
-            source_tree = cst.parse_module(source_code)
-            wrapper = cst.MetadataWrapper(source_tree)
-            local_warnings = [p for p in parsed_warnings if p.file_path == str(file_path)]
-            fixed_module = wrapper.visit(
-                    SUPPORTED_LINTER_MAP[options.msg_id][1](local_warnings))
-            a_file_path = f'a{sep}{file_path}'
-            b_file_path = f'b{sep}{file_path}'
-            result = "".join(difflib.unified_diff(
-                    source_code.splitlines(1),
-                    fixed_module.code.splitlines(1),
-                    fromfile=a_file_path,
-                    tofile=b_file_path
-                    ))
-            if result:
-                print(result)
+        if i not in refixed:
+            yield result
+            continue
+        if fix_options.write:
+            result.fixed_source = fixed_source
+            if fix_options.edits:
+                result.edits = edits_from_lines(_decode(source_code).splitlines(1),
+                        _decode(fixed_source).splitlines(1))
+        else:
+            source_lines = source_code.splitlines(1)
+            result.edits = edits_from_lines(source_lines, fixed_source.splitlines(1))
+            result.diff = unified_diff(source_lines, result.edits,
+                    f'a{fix_options.sep}{file_path}', f'b{fix_options.sep}{file_path}')
+        yield result
 
 
+def _delint_file(file_path: tp.Union[str, Path],
+        local_warnings: tp.Optional[FileWarnings],
+        fix_options: FixOptions) -> FileResult:
+    '''
+    Fix a single file and return the unified diff of the fix. In write
+    mode, the file is parsed from its bytes so the fixed module keeps its
+    encoding and line endings, and no diff is built.
+    '''
+    result = FileResult(file_path)
+    profiler = Profiler(enabled=fix_options.profile)
+    with profiler.span('fix', file_path=str(file_path)) as fix_args:
+        _fix_file(result, local_warnings, fix_options, profiler, fix_args)
+    result.spans = profiler.spans
+    return result
+
+
+def _fix_file(result: FileResult,
+        local_warnings: tp.Optional[FileWarnings],
+        fix_options: FixOptions,
+        profiler: Profiler,
+        fix_args: tp.Dict[str, tp.Any]):
+    file_path = result.file_path
+    with profiler.span('read', file_path=str(file_path)) as read_args:
+        if fix_options.write:
+            with open(file_path, 'rb') as f:
+                source_code = f.read()
+        else:
+            with open(file_path) as f:
+                source_code = "".join(f.readlines())
+        read_args['bytes'] = fix_args['bytes'] = os.path.getsize(file_path)
+    _fix_source(result, source_code, local_warnings, fix_options, profiler, fix_args)
+
+
+def _fix_source(result: FileResult,
+        source_code: tp.Union[str, bytes],
+        local_warnings: tp.Optional[FileWarnings],
+        fix_options: FixOptions,
+        profiler: Profiler,
+        fix_args: tp.Optional[tp.Dict[str, tp.Any]] = None):
+    '''
+    Fix `source_code`, the content of `result.file_path`, into `result`. In
+    write mode, the fixed source has the type of `source_code`.
+    '''
+    file_path = result.file_path
+    fix_args = {} if fix_args is None else fix_args
+    if not source_code:
+        return
+    # with pylint warnings that are all in the leading import section, only
+    # that section is parsed and the rest of the module is kept as is
+    header, rest = source_code, source_code[:0]
+    if fix_options.detector == DETECTOR_PYLINT and local_warnings:
+        split = split_import_header(source_code, max(local_warnings.line_nos))
+        if split is not None:
+            header, rest = split
+    with profiler.span('parse', file_path=str(file_path)) as parse_args:
+        source_tree = _parse_module(header)
+        parse_args['bytes'] = len(header)
+    wrapper = None
+    if fix_options.detector != DETECTOR_PYLINT:
+        # the detector reuses the module and the metadata of the fix, the
+        # module was just parsed so it does not need to be copied
+        wrapper = cst.MetadataWrapper(source_tree, unsafe_skip_copy=True)
+        with profiler.span('detect', file_path=str(file_path)):
+            detected = detect_import_warnings(wrapper, str(file_path), fix_options.msg_ids)
+        if fix_options.detector == DETECTOR_LIBCST:
+            local_warnings = FileWarnings(detected)
+        else:
+            pylint_keys = {_warning_identity(w) for w in local_warnings}
+            libcst_keys = {_warning_identity(w) for w in detected}
+            result.pylint_only = [w for w in local_warnings
+                    if _warning_identity(w) not in libcst_keys]
+            result.libcst_only = [w for w in detected
+                    if _warning_identity(w) not in pylint_keys]
+    if not local_warnings:
+        return
+    result.warnings = list(local_warnings)
+    fix_args['warnings'] = len(result.warnings)
+    with profiler.span('transform', file_path=str(file_path)):
+        transformer = get_transformer(fix_options.msg_ids, local_warnings)
+        if wrapper is None:
+            transform_module(source_tree, transformer, header)
+        else:
+            wrapper.visit(transformer)
+    # the edits are text, so the parsed lines of a bytes source are decoded
+    # as libcst did, without rendering the fixed module
+    encoding = source_tree.encoding
+    header_lines = split_lines(header.decode(encoding) if isinstance(header, bytes) else header)
+    if fix_options.write:
+        fixed_header = "".join(apply_edits(header_lines, transformer.edits))
+        fixed_source = (fixed_header.encode(encoding) if isinstance(header, bytes)
+                else fixed_header) + rest
+        if fixed_source != source_code:
+            result.fixed_source = fixed_source
+            if fix_options.edits:
+                # the edits only reach into the parsed lines
+                result.edits = changed_edits(header_lines, transformer.edits)
+        return
+    with profiler.span('diff', file_path=str(file_path)):
+        source_lines = header_lines + split_lines(rest)
+        result.edits = changed_edits(source_lines, transformer.edits)
+        result.diff = unified_diff(source_lines, result.edits,
+                f'a{fix_options.sep}{file_path}', f'b{fix_options.sep}{file_path}')
+
+
+def _iter_file_results(
+        files: tp.Sequence[tp.Union[str, Path]],
+        warning_index: tp.Optional[WarningIndex],
+        fix_options: FixOptions,
+        jobs: int = 1) -> tp.Iterator[FileResult]:
+    '''
+    Yield the result of every file to fix, in the order of `files`. With more
+    than one job the files are fixed in a process pool.
+
+    Without a `warning_index` the warnings are detected with libcst, so every
+    file is parsed.
+    '''
+    if warning_index is None:
+        tasks = [(file_path, None) for file_path in files]
+    elif fix_options.detector == DETECTOR_CROSS_CHECK:
+        tasks = [(file_path, warning_index.for_file(file_path)) for file_path in files]
+    else:
+        # files without any warnings are never opened or parsed
+        tasks = [(file_path, warning_index.for_file(file_path))
+                for file_path in files if file_path in warning_index]
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(tasks) <= 1:
+        for file_path, local_warnings in tasks:
+            yield _delint_file(file_path, local_warnings, fix_options)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        # submit the largest files first, so that a big file picked up last
+        # does not keep the other workers idle at the end of the run
+        by_size = sorted(range(len(tasks)),
+                key=lambda i: os.path.getsize(tasks[i][0]), reverse=True)
+        futures = [None] * len(tasks)
+        for i in by_size:
+            file_path, local_warnings = tasks[i]
+            futures[i] = executor.submit(
+                    _delint_file, file_path, local_warnings, fix_options)
+        # results are streamed back in the original order of the files
+        for future in futures:
+            yield future.result()
+
 
 def setup_logging(loglevel):
     """Setup basic logging
@@ -212,7 +1186,8 @@ def setup_logging(loglevel):
       loglevel (int): minimum loglevel for emitting messages
     """
     logformat = "[%(asctime)s] %(levelname)s:%(name)s:%(message)s"
-    logging.basicConfig(level=loglevel, stream=sys.stdout,
+    # stdout is kept for the diffs
+    logging.basicConfig(level=loglevel, stream=sys.stderr,
                         format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
 
 
@@ -222,10 +1197,55 @@ def main(args=None):
     Args:
       args ([str]): command line parameter list
     """
-    args = get_arg_parser().parse_args(args)
-    #setup_logging(args.loglevel)
+    args = sys.argv[1:] if args is None else list(args)
+    if args[:1] == ['merge']:
+        merge.main(args[1:])
+        return
+    parser = get_arg_parser()
+    args = parser.parse_args(args)
+    if args.stream and (args.detector != DETECTOR_PYLINT or args.cache_dir):
+        parser.error('--stream only works with the pylint detector and without a cache.')
+    if args.linter != LINTER_PYLINT and (
+            args.stream or args.from_report or args.stdin_filename):
+        parser.error('--stream, --from-report and --stdin-filename only work with pylint.')
+    if args.summary and not args.write:
+        parser.error('--summary only works with --write.')
+    if args.until_stable and args.linter != LINTER_PYLINT and args.detector != DETECTOR_LIBCST:
+        parser.error('--until-stable only works with pylint or the libcst detector.')
+    if args.until_stable and args.stream:
+        parser.error('--until-stable does not work with --stream.')
+    if args.check_compile and not args.until_stable:
+        parser.error('--check-compile only works with --until-stable.')
+    if args.format == FORMAT_NDJSON and args.summary:
+        parser.error('--summary only works with the diff format.')
+    if args.include_diff and args.format != FORMAT_NDJSON:
+        parser.error('--include-diff only works with --format ndjson.')
+    if args.shard_by_size and not args.shard:
+        parser.error('--shard-by-size only works with --shard.')
+    if args.daemon and (args.stream or args.cache_dir):
+        parser.error('--daemon does not work with --stream or a cache.')
+    if args.from_report and (args.detector == DETECTOR_LIBCST or args.stream
+            or args.daemon or args.cache_dir or args.stdin_filename):
+        parser.error('--from-report does not work with the libcst detector, --stream, '
+                '--daemon, --stdin-filename or a cache.')
+    if not (args.serve or args.msg_id):
+        parser.error('the following arguments are required: --msg_id')
+    if not (args.serve or args.stdin_filename or args.file_path_or_folder):
+        parser.error('the following arguments are required: file_path_or_folder')
+    setup_logging(args.loglevel)
     _logger.debug('Starting the pydelint process...')
-    _run_delinter(args)
+    if args.serve:
+        # the server imports this module
+        from delinter.server import serve
+        serve(args.socket, args.idle_timeout)
+    elif args.stdin_filename:
+        _run_on_buffer(args)
+    elif args.cprofile:
+        profile = cProfile.Profile()
+        profile.runcall(_run_delinter, args)
+        profile.dump_stats(args.cprofile)
+    else:
+        _run_delinter(args)
     _logger.debug('pydeling complete')
 
 
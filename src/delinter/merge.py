@@ -0,0 +1,128 @@
+'''
+Merge the outputs of the shards of a run, see `--shard`, into the output of
+a single run over all the files. The outputs are either the printed diffs or
+the ndjson records of the shards.
+
+    delint merge shard-1.diff shard-2.diff > all.diff
+'''
+import re
+import sys
+import json
+import argparse
+import typing as tp
+from pathlib import Path
+
+_HUNK_HEADER = re.compile(r'@@ -\d+(?:,(?P<old>\d+))? \+\d+(?:,(?P<new>\d+))? @@')
+
+
+def split_diffs(text: str) -> tp.List[tp.Tuple[str, str]]:
+    '''
+    Split the printed diffs of a run into the (path, diff) of each file, the
+    path being the one of the `+++` header. The hunks are read by the line
+    counts of their headers, so that a removed line starting with `--`
+    is not taken for the start of the next file.
+    '''
+    lines = text.splitlines(True)
+    diffs = []
+    i = 0
+    while i < len(lines):
+        if not lines[i].strip():
+            # the blank line printed after each diff
+            i += 1
+            continue
+        if not (lines[i].startswith('--- ') and i + 1 < len(lines)
+                and lines[i + 1].startswith('+++ ')):
+            raise ValueError(f'Expected the header of a diff on line {i + 1}: {lines[i]!r}')
+        start = i
+        path = lines[i + 1][4:].rstrip('\r\n')
+        i += 2
+        while i < len(lines) and lines[i].startswith('@@ '):
+            m = _HUNK_HEADER.match(lines[i])
+            if not m:
+                raise ValueError(f'Invalid hunk header on line {i + 1}: {lines[i]!r}')
+            old = int(m.group('old') or 1)
+            new = int(m.group('new') or 1)
+            i += 1
+            while (old > 0 or new > 0) and i < len(lines):
+                tag = lines[i][:1]
+                if tag in (' ', '-'):
+                    old -= 1
+                if tag in (' ', '+'):
+                    new -= 1
+                i += 1
+            if old > 0 or new > 0:
+                raise ValueError(f'The last hunk of {path} is truncated')
+        diffs.append((path, ''.join(lines[start:i])))
+    return diffs
+
+
+def merge_diffs(texts: tp.Iterable[str]) -> str:
+    '''
+    Merge the printed diffs of several shards, ordered by path like the
+    files of a single run.
+    '''
+    diffs = {}
+    for text in texts:
+        for path, diff in split_diffs(text):
+            if path in diffs:
+                raise ValueError(f'{path} is in more than one shard')
+            diffs[path] = diff
+    return ''.join(diffs[path] + '\n' for path in sorted(diffs, key=Path))
+
+
+def merge_ndjson(texts: tp.Iterable[str]) -> str:
+    '''
+    Merge the ndjson records of several shards, ordered by path like the
+    files of a single run. The records are kept as they were printed.
+    '''
+    records = {}
+    for text in texts:
+        for line in text.splitlines(True):
+            if not line.strip():
+                continue
+            path = json.loads(line)['file_path']
+            if path in records:
+                raise ValueError(f'{path} is in more than one shard')
+            records[path] = line if line.endswith('\n') else line + '\n'
+    return ''.join(records[path] for path in sorted(records, key=Path))
+
+
+def merge(texts: tp.Sequence[str]) -> str:
+    '''
+    Merge the outputs of several shards, telling the printed diffs from the
+    ndjson records by their first character.
+    '''
+    kinds = {text.lstrip()[:1] == '{' for text in texts if text.strip()}
+    if len(kinds) > 1:
+        raise ValueError('Unable to merge diffs with ndjson records')
+    if kinds == {True}:
+        return merge_ndjson(texts)
+    return merge_diffs(texts)
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+            prog='delint merge',
+            description='Merge the outputs of the shards of a run, ordered by path.')
+    parser.add_argument('inputs', nargs='+', metavar='FILE',
+            help="Output of a shard, or '-' for stdin.")
+    parser.add_argument('-o', '--output', default=None,
+            help='Write the merged output to this file instead of stdout.')
+    return parser
+
+
+def main(args=None):
+    options = get_arg_parser().parse_args(args)
+    texts = []
+    for file_path in options.inputs:
+        if file_path == '-':
+            texts.append(sys.stdin.read())
+        else:
+            with open(file_path) as f:
+                texts.append(f.read())
+    merged = merge(texts)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(merged)
+    else:
+        sys.stdout.write(merged)
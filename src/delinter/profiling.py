@@ -0,0 +1,118 @@
+'''
+Time the stages of a run and of each file, to find where a slow run spends
+its time.
+'''
+import os
+import json
+import time
+import threading
+import contextlib
+import dataclasses
+import collections
+import typing as tp
+
+SLOWEST_FILES = 20
+
+
+@dataclasses.dataclass
+class Span:
+    '''
+    A timed stage. `start` is a wall clock time, so that the spans of the
+    worker processes line up with the spans of the main process. `cpu` is
+    the CPU time of the thread that ran the stage.
+    '''
+    name: str
+    start: float
+    wall: float = 0.0
+    cpu: float = 0.0
+    pid: int = 0
+    tid: int = 0
+    args: tp.Dict[str, tp.Any] = dataclasses.field(default_factory=dict)
+
+
+class Profiler:
+    '''
+    Collect the spans of a run. A disabled profiler records nothing, so the
+    stages can be wrapped unconditionally.
+    '''
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.spans: tp.List[Span] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: tp.Any) -> tp.Iterator[tp.Dict[str, tp.Any]]:
+        '''
+        Time the body of the `with` statement as the stage `name`. The
+        yielded dict holds the `args` of the span, eg a count of warnings,
+        and can be updated in the body.
+        '''
+        if not self.enabled:
+            yield args
+            return
+        span = Span(name, time.time(), pid=os.getpid(), tid=threading.get_ident(), args=args)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield span.args
+        finally:
+            span.wall = time.perf_counter() - wall_start
+            span.cpu = time.thread_time() - cpu_start
+            self.spans.append(span)
+
+    def extend(self, spans: tp.Iterable[Span]):
+        if self.enabled:
+            self.spans.extend(spans)
+
+    def summary(self, slowest_files: int = SLOWEST_FILES) -> tp.Dict[str, tp.Any]:
+        '''
+        Return the totals of each stage: the number of spans, the wall and
+        CPU time, and the sum of their numeric args, eg the bytes and the
+        warnings processed. The files that took the longest to fix are
+        listed with their timings.
+        '''
+        stages: tp.Dict[str, tp.Dict[str, tp.Any]] = collections.OrderedDict()
+        for span in self.spans:
+            stage = stages.setdefault(span.name, dict(count=0, wall=0.0, cpu=0.0))
+            stage['count'] += 1
+            stage['wall'] += span.wall
+            stage['cpu'] += span.cpu
+            for key, value in span.args.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[key] = stage.get(key, 0) + value
+        files = sorted((span for span in self.spans if 'file_path' in span.args
+                and span.name == 'fix'), key=lambda span: span.wall, reverse=True)
+        return dict(
+                stages=stages,
+                slowest_files=[dict(span.args, wall=span.wall, cpu=span.cpu)
+                        for span in files[:slowest_files]])
+
+    def chrome_trace(self) -> tp.Dict[str, tp.Any]:
+        '''
+        Return the spans in the Chrome trace event format, which
+        chrome://tracing and Perfetto load.
+        '''
+        origin = min((span.start for span in self.spans), default=0.0)
+        events = []
+        for span in self.spans:
+            events.append(dict(
+                    name=span.name,
+                    ph='X',
+                    ts=(span.start - origin) * 1e6,
+                    dur=span.wall * 1e6,
+                    pid=span.pid,
+                    tid=span.tid,
+                    args=dict(span.args, cpu_ms=span.cpu * 1e3)))
+        return dict(traceEvents=events, displayTimeUnit='ms')
+
+    def write_summary(self, file_path: str):
+        _write_json(file_path, self.summary())
+
+    def write_chrome_trace(self, file_path: str):
+        _write_json(file_path, self.chrome_trace())
+
+
+def _write_json(file_path: str, data: tp.Dict[str, tp.Any]):
+    with open(file_path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+        f.write('\n')
@@ -0,0 +1,191 @@
+'''
+Parse the warnings out of a whole pylint report at once, instead of matching
+every line against every pattern.
+
+A report is searched for the message id of each requested delinter, so the
+lines of the other messages are never matched. Each line found is then
+matched once, against a single anchored pattern of its message id that
+combines the layout of the line and the messages of the delinter.
+
+Reports of the json reporters of pylint are read as well, see
+`index_reports` to use saved reports in place of a pylint run.
+'''
+import os
+import re
+import mmap
+import json
+import logging
+import contextlib
+import typing as tp
+
+from delinter.imports import BaseDelinter
+from delinter.imports import BaseWarning
+from delinter.imports import WarningIndex
+from delinter.imports import normalize_path
+
+_logger = logging.getLogger(__name__)
+
+Buffer = tp.Union[str, bytes, mmap.mmap]
+
+# the layout of the msg-template of the delinter,
+# {path}:{line}:[{msg_id}({symbol}),{obj}]{msg}, and of the parseable output
+# format of pylint, {path}:{line}: [{msg_id}({symbol}), {obj}] {msg}, from
+# the message id on
+_LINE_LAYOUT = r'\[{code}\([^)\n]*\), ?[^\]\n]*\] ?(?:{message})\r?$'
+
+
+def _line_pattern(delinter_class: tp.Type[BaseDelinter], binary: bool) -> tp.Pattern:
+    pattern = _LINE_LAYOUT.format(
+            code=re.escape(delinter_class.CODE),
+            message=delinter_class.report_message_pattern.pattern)
+    return re.compile(pattern.encode('utf-8') if binary else pattern, re.MULTILINE)
+
+
+def parse_report(report: Buffer,
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]) -> tp.List[BaseWarning]:
+    '''
+    Return the warnings of the message ids in `delinter_classes` found in the
+    text of a pylint `report`, in the order of the report. The report can be
+    a str, bytes or a memory map of the report file. Lines of other message
+    ids, or of no message at all, are skipped. A line of a requested message
+    id that cannot be parsed raises a ValueError.
+    '''
+    found = list(_iter_report(report, delinter_classes))
+    if len(delinter_classes) > 1:
+        found.sort(key=lambda item: item[0])
+    return [warning for _, warning in found]
+
+
+def _iter_report(report: Buffer, delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]
+        ) -> tp.Iterator[tp.Tuple[int, BaseWarning]]:
+    # yields the offset of the line of each warning, one message id after the other
+    binary = not isinstance(report, str)
+    newline, colon, space, suffix = ((b'\n', b':', b' ', b'.py') if binary
+            else ('\n', ':', ' ', '.py'))
+    # a single string per path, a report repeats them on every line
+    file_paths: tp.Dict[tp.Union[str, bytes], str] = {}
+    for code, delinter_class in delinter_classes.items():
+        marker = f'[{code}('.encode('utf-8') if binary else f'[{code}('
+        pattern = _line_pattern(delinter_class, binary)
+        position = report.find(marker)
+        while position != -1:
+            start = report.rfind(newline, 0, position) + 1
+            end = report.find(newline, position)
+            if end == -1:
+                end = len(report)
+            # the path and line number are split off the start of the line,
+            # which is cheaper than matching a path of any length
+            location = report[start:position].rsplit(colon, 2)
+            m = pattern.match(report, position, end)
+            if (m is None or len(location) != 3 or location[2] not in (colon[:0], space)
+                    or not location[1].isdigit() or not location[0].endswith(suffix)):
+                line = report[start:end]
+                if binary:
+                    line = line.decode('utf-8', 'replace')
+                raise ValueError(f'Parsing failed for {line.rstrip()}')
+            file_path = file_paths.get(location[0])
+            if file_path is None:
+                file_path = file_paths[location[0]] = (
+                        os.fsdecode(location[0]) if binary else location[0])
+            groups = m.groupdict()
+            if binary:
+                groups = {name: None if value is None else value.decode('utf-8')
+                        for name, value in groups.items()}
+            yield start, delinter_class.warning_from_groups(file_path, int(location[1]), groups)
+            position = report.find(marker, end)
+
+
+def parse_json_report(report: tp.Union[str, bytes],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]) -> tp.List[BaseWarning]:
+    '''
+    Return the warnings of the message ids in `delinter_classes` in the
+    output of the json reporter of pylint, a list of messages, or of its
+    json2 reporter, an object holding the list of messages.
+    '''
+    messages = json.loads(report)
+    if isinstance(messages, dict):
+        messages = messages.get('messages', [])
+    warnings = []
+    for message in messages:
+        class_ = delinter_classes.get(message.get('message-id', message.get('messageId')))
+        if class_ is None:
+            continue
+        warnings.append(class_.parse_linter_warning(
+                (message['path'], message['line'], message['message'])))
+    return warnings
+
+
+@contextlib.contextmanager
+def _open_report(file_path: tp.Union[str, os.PathLike], use_mmap: bool) -> tp.Iterator[Buffer]:
+    with open(file_path, 'rb') as f:
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+            yield f.read()
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as report:
+                yield report
+
+
+def _is_json(report: Buffer) -> bool:
+    return report[:64].lstrip()[:1] in (b'[', b'{')
+
+
+def read_report(file_path: tp.Union[str, os.PathLike],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]],
+        use_mmap: bool = True) -> tp.List[BaseWarning]:
+    '''
+    Parse the pylint report at `file_path`, either a json report or the text
+    of a report, see `parse_report`. The report is memory mapped unless
+    `use_mmap` is False, so that a large report is not read in memory at once.
+    '''
+    with _open_report(file_path, use_mmap) as report:
+        if _is_json(report):
+            return parse_json_report(report[:], delinter_classes)
+        return parse_report(report, delinter_classes)
+
+
+def index_report(file_path: tp.Union[str, os.PathLike],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]) -> WarningIndex:
+    '''
+    Index the warnings of the pylint report at `file_path`, like
+    `read_report`. The warnings of a text report are added to the index one
+    at a time, so they are never all held as objects.
+    '''
+    with _open_report(file_path, use_mmap=True) as report:
+        if _is_json(report):
+            return WarningIndex(parse_json_report(report[:], delinter_classes))
+        return WarningIndex(warning for _, warning in _iter_report(report, delinter_classes))
+
+
+def index_reports(report_paths: tp.Iterable[tp.Union[str, os.PathLike]],
+        files: tp.Iterable[tp.Union[str, os.PathLike]],
+        delinter_classes: tp.Dict[str, tp.Type[BaseDelinter]]) -> WarningIndex:
+    '''
+    Index the warnings of the saved pylint reports at `report_paths` that
+    are about the `files`, as pylint would have reported them. The paths in
+    a report are relative to the current directory, like those of pylint.
+
+    A file modified after a report was written is stale: its warnings in
+    the report are dropped, since its lines may have moved. When several
+    reports hold the same file, the most recent one is used.
+    '''
+    file_paths = {normalize_path(file_path): file_path for file_path in files}
+    mtimes = {report_path: os.stat(report_path).st_mtime_ns for report_path in report_paths}
+    seen: tp.Set[str] = set()
+    stale = []
+    warning_index = WarningIndex()
+    for report_path in sorted(mtimes, key=mtimes.get, reverse=True):
+        report_index = index_report(report_path, delinter_classes)
+        fresh = []
+        for file_path in report_index.files():
+            if file_path not in file_paths or file_path in seen:
+                continue
+            seen.add(file_path)
+            if os.stat(file_path).st_mtime_ns > mtimes[report_path]:
+                stale.append(file_paths[file_path])
+            else:
+                fresh.append(file_path)
+        warning_index.update(report_index.select(files=fresh))
+    if stale:
+        _logger.warning('%s files changed since their report was written, their '
+                'warnings are ignored: %s', len(stale), ', '.join(map(str, stale)))
+    return warning_index
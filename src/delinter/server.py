@@ -0,0 +1,154 @@
+'''
+Long running delinter server, for editors and pre-commit hooks that fix a few
+files at a time. The server keeps pylint and libcst imported, the astroid
+cache of the modules the files import, and the recently parsed modules, so a
+request only pays for linting and fixing its own files.
+
+The server listens on a unix socket and handles one request at a time, as
+pylint is not thread safe. It exits once it received no request for its idle
+timeout. See `delinter.client` for the protocol.
+'''
+import os
+import json
+import fcntl
+import base64
+import logging
+import socketserver
+import typing as tp
+
+from delinter import __version__
+from delinter.client import DEFAULT_IDLE_TIMEOUT
+from delinter.linters import LINTER_BACKENDS
+from delinter.linters import LINTER_PYLINT
+from delinter.main import DETECTORS
+from delinter.main import DETECTOR_PYLINT
+from delinter.main import FixOptions
+from delinter.main import FileResult
+from delinter.main import fix_buffer
+from delinter.main import parse_msg_ids
+from delinter.main import set_module_cache
+from delinter.main import _iter_run_results
+from delinter.main import _result_to_cache
+from delinter.session import DEFAULT_MAX_MODULES
+from delinter.session import ModuleCache
+
+_logger = logging.getLogger(__name__)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.respond(json.loads(line))
+            except Exception as e: # reported to the client, the server keeps running
+                _logger.exception('Failed request')
+                response = dict(error=f'{type(e).__name__}: {e}')
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DelinterServer(socketserver.UnixStreamServer):
+    '''
+    Serve the requests sent to `socket_path` until none came for
+    `idle_timeout` seconds or a client asks for a shutdown.
+
+    A `fix` request holds the `msg_ids`, optionally the `detector` and the
+    `linter`, and either the absolute `file_paths` to fix or the `file_path`
+    and `source` of a buffer. Each result is a cache entry of the file, see
+    `delinter.main._result_to_cache`, with the fixed source of a buffer as
+    text, and the fixed source of a file in `write` mode in base64.
+    '''
+
+    def __init__(self, socket_path: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+            max_modules: int = DEFAULT_MAX_MODULES):
+        self.socket_path = socket_path
+        super().__init__(socket_path, _RequestHandler)
+        # the clients of other users must not run fixes as this user
+        os.chmod(socket_path, 0o600)
+        self.timeout = idle_timeout
+        self.modules = ModuleCache(max_modules)
+        self._running = True
+
+    def handle_timeout(self):
+        _logger.info('No request for %s seconds, stopping', self.timeout)
+        self._running = False
+
+    def serve_until_idle(self):
+        set_module_cache(self.modules)
+        try:
+            while self._running:
+                self.handle_request()
+        finally:
+            set_module_cache(None)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def respond(self, request: tp.Dict[str, tp.Any]) -> tp.Dict[str, tp.Any]:
+        command = request.get('command')
+        if command == 'ping':
+            return dict(pid=os.getpid(), version=__version__, modules=len(self.modules))
+        if command == 'shutdown':
+            self._running = False
+            return {}
+        if command == 'fix':
+            return self.fix(request)
+        raise ValueError(f'Unknown command {command!r}')
+
+    def fix(self, request: tp.Dict[str, tp.Any]) -> tp.Dict[str, tp.Any]:
+        detector = request.get('detector', DETECTOR_PYLINT)
+        if detector not in DETECTORS:
+            raise ValueError(f'Unknown detector {detector!r}')
+        linter = request.get('linter', LINTER_PYLINT)
+        if linter not in LINTER_BACKENDS:
+            raise ValueError(f'Unknown linter {linter!r}')
+        fix_options = FixOptions(
+                msg_ids=parse_msg_ids(request['msg_ids']),
+                detector=detector,
+                linter=linter,
+                write=bool(request.get('write')),
+                edits=bool(request.get('edits')))
+        if 'source' in request:
+            result = fix_buffer(request['file_path'], request['source'], fix_options)
+            return dict(results=[dict(_result_to_cache(result), fixed_source=result.fixed_source)])
+        file_paths = request['file_paths']
+        if not all(os.path.isabs(file_path) for file_path in file_paths):
+            raise ValueError('The file paths must be absolute')
+        return dict(results=[_file_entry(result)
+                for result in _iter_run_results(file_paths, fix_options)])
+
+
+def _file_entry(result: FileResult) -> tp.Dict[str, tp.Any]:
+    fixed_source = result.fixed_source
+    if fixed_source is not None:
+        fixed_source = base64.b64encode(fixed_source).decode('ascii')
+    return dict(_result_to_cache(result), fixed_source=fixed_source)
+
+
+def serve(socket_path: str, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+    '''
+    Run a server on `socket_path` until it is idle for `idle_timeout`
+    seconds. Nothing is done if another server already runs there.
+    '''
+    # the lock is held for the life of the server, so that concurrent
+    # clients starting a server on demand only start one
+    lock = open(socket_path + '.lock', 'w')
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            _logger.info('A server already runs on %s', socket_path)
+            return
+        if os.path.exists(socket_path):
+            # left behind by a server that did not exit cleanly
+            os.unlink(socket_path)
+        with DelinterServer(socket_path, idle_timeout) as server:
+            _logger.info('Serving on %s', socket_path)
+            server.serve_until_idle()
+    finally:
+        lock.close()
@@ -0,0 +1,166 @@
+'''
+Use the delinter from python, eg in a review bot or an editor plugin, instead
+of running `delint` and reading its printed diffs.
+
+    from delinter import DelinterSession
+
+    with DelinterSession(msg_ids='W0611') as session:
+        result = session.fix_source('import os\nimport sys\nsys.exit()\n')
+        result.fixed_source, result.edits, result.warnings
+
+A session keeps its warm state between calls: the recently parsed modules,
+and the astroid cache pylint keeps of the modules the files import, so that
+many small requests are served at a low latency in the same process.
+'''
+import os
+import contextlib
+import collections
+import typing as tp
+
+import libcst as cst
+
+from delinter.main import DETECTORS
+from delinter.main import DETECTOR_PYLINT
+from delinter.main import FixOptions
+from delinter.main import FileResult
+from delinter.main import fix_buffer
+from delinter.main import parse_msg_ids
+from delinter.main import set_module_cache
+from delinter.main import _iter_run_results
+from delinter.writer import AtomicWriter
+from delinter.linters import LINTER_BACKENDS
+from delinter.linters import LINTER_PYLINT
+from delinter.discovery import FileFilter
+from delinter.discovery import find_python_files
+
+DEFAULT_MAX_MODULES = 256
+
+MsgIds = tp.Union[str, tp.Iterable[str]]
+
+
+class ModuleCache:
+    '''
+    The last `max_entries` parsed modules, keyed by their source, so that a
+    file or buffer fixed again without changes is not parsed again. The
+    fixes never modify a parsed module, so it can be shared by requests.
+    '''
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_MODULES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._modules: tp.Dict[tp.Union[str, bytes], cst.Module] = collections.OrderedDict()
+
+    def parse(self, source_code: tp.Union[str, bytes]) -> cst.Module:
+        module = self._modules.get(source_code)
+        if module is not None:
+            self._modules.move_to_end(source_code)
+            self.hits += 1
+            return module
+        self.misses += 1
+        module = cst.parse_module(source_code)
+        self._modules[source_code] = module
+        if len(self._modules) > self.max_entries:
+            self._modules.popitem(last=False)
+        return module
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+
+class DelinterSession:
+    '''
+    Lint and fix sources, files and trees in this process, for the message
+    ids `msg_ids`, a comma separated list, a list or 'all'. The `detector`
+    and `linter` are those of the command line, and `jobs` the number of
+    worker processes of a call on many files.
+
+    Each call returns a `FileResult` per file, with the `warnings` found,
+    the `fixed_source` or None when nothing changed, and the `edits` of the
+    fix. The `msg_ids` of a call replace those of the session. A bad
+    setting raises a ValueError.
+    '''
+
+    def __init__(self, msg_ids: MsgIds = 'all', detector: str = DETECTOR_PYLINT,
+            linter: str = LINTER_PYLINT, jobs: int = 1,
+            max_modules: int = DEFAULT_MAX_MODULES):
+        if detector not in DETECTORS:
+            raise ValueError(f'Unknown detector {detector!r}')
+        if linter not in LINTER_BACKENDS:
+            raise ValueError(f'Unknown linter {linter!r}')
+        self.msg_ids = parse_msg_ids(msg_ids)
+        self.detector = detector
+        self.linter = linter
+        self.jobs = jobs
+        self.modules = ModuleCache(max_modules)
+
+    def __enter__(self) -> 'DelinterSession':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Drop the parsed modules of the session.
+        '''
+        self.modules = ModuleCache(self.modules.max_entries)
+
+    def _fix_options(self, msg_ids: tp.Optional[MsgIds]) -> FixOptions:
+        # in write mode the fixed source is kept instead of a diff, the
+        # files are only written if asked
+        return FixOptions(
+                msg_ids=self.msg_ids if msg_ids is None else parse_msg_ids(msg_ids),
+                detector=self.detector,
+                linter=self.linter,
+                write=True,
+                edits=True)
+
+    @contextlib.contextmanager
+    def _parsing(self) -> tp.Iterator[None]:
+        previous = set_module_cache(self.modules)
+        try:
+            yield
+        finally:
+            set_module_cache(previous)
+
+    def fix_source(self, source_code: str, file_path: tp.Union[str, os.PathLike] = 'module.py',
+            msg_ids: tp.Optional[MsgIds] = None) -> FileResult:
+        '''
+        Fix `source_code` as the content of `file_path`, which is not read
+        and need not exist. Only pylint and the libcst detector can lint a
+        source that is not in a file.
+        '''
+        with self._parsing():
+            return fix_buffer(file_path, source_code, self._fix_options(msg_ids))
+
+    def fix_file(self, file_path: tp.Union[str, os.PathLike],
+            msg_ids: tp.Optional[MsgIds] = None, write: bool = False) -> FileResult:
+        '''
+        Fix the file at `file_path`, see `fix_paths`.
+        '''
+        return self.fix_paths([file_path], msg_ids, write)[0]
+
+    def fix_paths(self, paths: tp.Iterable[tp.Union[str, os.PathLike]],
+            msg_ids: tp.Optional[MsgIds] = None, write: bool = False,
+            file_filter: tp.Optional[FileFilter] = None) -> tp.List[FileResult]:
+        '''
+        Fix the files at `paths` and the .py files under the folders among
+        them, selected by `file_filter`, in the order they are found. The
+        fixed source of a file is in bytes, in the encoding and with the
+        line endings of the file. With `write`, the fixed files are replaced.
+        '''
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(find_python_files(path, file_filter or FileFilter()))
+            else:
+                files.append(path)
+        with self._parsing():
+            results = list(_iter_run_results(files, self._fix_options(msg_ids), self.jobs))
+        if write:
+            with AtomicWriter() as writer:
+                for result in results:
+                    if result.fixed_source is not None:
+                        writer.write(result.file_path, result.fixed_source)
+        return results
@@ -0,0 +1,87 @@
+'''
+Write the fixed modules back to disk.
+'''
+import os
+import uuid
+import typing as tp
+
+DEFAULT_BATCH_SIZE = 64
+
+
+class AtomicWriter:
+    '''
+    Replace files atomically: the new content goes to a temporary file in the
+    folder of the original file, which is then renamed over it. A reader sees
+    either the old or the new content, never a partial write.
+
+    The syncs are batched: up to `batch_size` temporary files are written
+    before they are synced and renamed together, and then each folder of the
+    batch is synced once. Use it as a context manager so the last batch is
+    flushed, or the temporary files removed if something fails.
+    '''
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, fsync: bool = True):
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.written: tp.List[str] = []
+        self._pending: tp.List[tp.Tuple[str, str]] = []
+
+    def write(self, file_path: tp.Union[str, os.PathLike], content: bytes):
+        file_path = str(file_path)
+        tmp_path = os.path.join(
+                os.path.dirname(file_path) or '.',
+                f'.{os.path.basename(file_path)}.{uuid.uuid4().hex}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        try:
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+        except OSError:
+            pass
+        self._pending.append((tmp_path, file_path))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        if self.fsync:
+            for tmp_path, _ in pending:
+                fd = os.open(tmp_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        for tmp_path, file_path in pending:
+            os.replace(tmp_path, file_path)
+            self.written.append(file_path)
+        if self.fsync:
+            # make the renames durable, once per folder
+            for folder in {os.path.dirname(file_path) or '.' for _, file_path in pending}:
+                try:
+                    fd = os.open(folder, os.O_RDONLY)
+                except OSError:
+                    continue
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+
+    def discard(self):
+        for tmp_path, _ in self._pending:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
@@ -0,0 +1,86 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from delinter.cache import ResultCache
+from delinter.main import FixOptions
+from delinter.main import _iter_run_results
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_key(self):
+        cache = ResultCache(self.root)
+        key = cache.key('a/module.py', b'import os\n', ('W0611', 'pylint'))
+        self.assertEqual(key, cache.key('b/module.py', b'import os\n', ('W0611', 'pylint')))
+        self.assertNotEqual(key, cache.key('a/module.py', b'import sys\n', ('W0611', 'pylint')))
+        self.assertNotEqual(key, cache.key('a/module.py', b'import os\n', ('W0404', 'pylint')))
+        self.assertNotEqual(key, cache.key('a/__init__.py', b'import os\n', ('W0611', 'pylint')))
+
+    def test_put_get(self):
+        cache = ResultCache(self.root)
+        self.assertIsNone(cache.get('ab' * 32))
+        cache.put('ab' * 32, {'hunks': 'x'})
+        self.assertEqual(ResultCache(self.root).get('ab' * 32), {'hunks': 'x'})
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_evict_least_recently_used(self):
+        cache = ResultCache(self.root, max_bytes=250)
+        keys = [f'{i:02}' * 32 for i in range(4)]
+        for i, key in enumerate(keys):
+            cache.put(key, {'hunks': 'x' * 100})
+            entry_path = cache._entry_path(key)
+            os.utime(entry_path, (time.time() - 100 + i, time.time() - 100 + i))
+        # reading the oldest entry makes it the most recently used
+        cache.get(keys[0])
+        cache.evict()
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertIsNotNone(cache.get(keys[3]))
+
+
+class TestCachedRun(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.files = []
+        for i, source_code in enumerate(('import os\n', 'import os\nos.getcwd()\n')):
+            file_path = os.path.join(self.root, f'module_{i}.py')
+            with open(file_path, 'w') as f:
+                f.write(source_code)
+            self.files.append(file_path)
+
+    def test_unchanged_files_skip_linting(self):
+        cache = ResultCache(os.path.join(self.root, '.cache'))
+        fix_options = FixOptions(msg_ids=('W0611',), sep='')
+        results = list(_iter_run_results(self.files, fix_options, cache=cache))
+        self.assertEqual(cache.misses, 2)
+        self.assertIn('-import os', results[0].diff)
+        self.assertEqual(results[1].diff, '')
+
+        with mock.patch('delinter.linters.run_pylint', side_effect=AssertionError), \
+                mock.patch('delinter.main.cst.parse_module', side_effect=AssertionError):
+            cached_results = list(_iter_run_results(
+                    self.files, fix_options, cache=cache))
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cached_results, results)
+
+        # a changed file is linted again
+        with open(self.files[1], 'w') as f:
+            f.write('import sys\n')
+        results = list(_iter_run_results(self.files, fix_options, cache=cache))
+        self.assertEqual(cache.hits, 3)
+        self.assertIn('-import sys', results[1].diff)
+
+
+if __name__ == '__main__':
+    unittest.main()
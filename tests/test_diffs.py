@@ -0,0 +1,141 @@
+import difflib
+import unittest
+
+import libcst as cst
+from delinter.diffs import Edit
+from delinter.diffs import apply_edits
+from delinter.diffs import changed_edits
+from delinter.diffs import unified_diff
+from delinter.diffs import edits_from_lines
+from delinter.diffs import split_lines
+from delinter.imports import RemoveUnusedImportTransformer
+from delinter.imports import UnusedImportsWarning
+from delinter.imports import UnusedFromImportsWarning
+from delinter.imports import transform_module
+
+
+class TestUnifiedDiff(unittest.TestCase):
+
+    def assert_same_as_difflib(self, lines, edits):
+        fixed_lines = apply_edits(lines, edits)
+        self.assertEqual(
+                unified_diff(lines, edits, 'a/m.py', 'b/m.py'),
+                ''.join(difflib.unified_diff(lines, fixed_lines, 'a/m.py', 'b/m.py')))
+
+    def test_hunks(self):
+        lines = [f'line {i}\n' for i in range(1, 31)]
+        for edits in (
+                [Edit(1, 1)],
+                [Edit(5, 6, ('new 5\n',))],
+                [Edit(3, 3), Edit(4, 4, ('new 4\n',))],
+                # close enough to share a hunk, then far enough for two hunks
+                [Edit(5, 5), Edit(11, 11)],
+                [Edit(5, 5), Edit(13, 13)],
+                [Edit(10, 9, ('inserted\n',))],
+                [Edit(28, 30, ('line 28\n', 'new 29\n', 'line 30\n'))],
+                [Edit(29, 29), Edit(30, 30)]):
+            with self.subTest(edits=edits):
+                self.assert_same_as_difflib(lines, edits)
+
+    def test_no_change(self):
+        lines = ['import os\n']
+        self.assertEqual(unified_diff(lines, [Edit(1, 1, ('import os\n',))], 'a', 'b'), '')
+        self.assertEqual(unified_diff(lines, [], 'a', 'b'), '')
+
+    def test_out_of_order(self):
+        with self.assertRaises(ValueError):
+            apply_edits(['a\n', 'b\n'], [Edit(2, 2), Edit(1, 1)])
+
+    def test_changed_edits(self):
+        lines = [f'line {i}\n' for i in range(1, 11)]
+        edits = [Edit(1, 1, ('line 1\n',)), Edit(2, 2),
+                Edit(3, 5, ('line 3\n', 'new 4\n', 'line 5\n'))]
+        changed = changed_edits(lines, edits)
+        self.assertEqual(changed, [Edit(2, 2), Edit(4, 4, ('new 4\n',))])
+        self.assertEqual(apply_edits(lines, changed), apply_edits(lines, edits))
+        self.assertEqual(unified_diff(lines, changed, 'a', 'b'),
+                unified_diff(lines, edits, 'a', 'b'))
+
+    def test_edits_from_lines(self):
+        lines = [f'line {i}\n' for i in range(1, 11)]
+        fixed_lines = lines[:2] + ['new\n'] + lines[4:8] + ['    pass\n'] + lines[8:]
+        edits = edits_from_lines(lines, fixed_lines)
+        self.assertEqual(edits, [Edit(3, 4, ('new\n',)), Edit(9, 8, ('    pass\n',))])
+        self.assertEqual(apply_edits(lines, edits), fixed_lines)
+
+
+class TestTransformerEdits(unittest.TestCase):
+
+    def fix(self, source_code, warnings):
+        transformer = RemoveUnusedImportTransformer(warnings)
+        fixed_module = cst.MetadataWrapper(cst.parse_module(source_code)).visit(transformer)
+        return transformer.edits, fixed_module.code
+
+    def assert_edits_match_module(self, source_code, line_no, from_module=None):
+        warnings = [UnusedImportsWarning('m.py', line_no, alias=None, dotted_as_name='os')
+                if from_module is None else UnusedFromImportsWarning('m.py', line_no,
+                        import_as_name='path', dotted_as_name=from_module, alias=None)]
+        edits, fixed_code = self.fix(source_code, warnings)
+        self.assertTrue(edits)
+        self.assertEqual(''.join(apply_edits(split_lines(source_code), edits)), fixed_code)
+        # the same with the line numbers of the ast
+        transformer = RemoveUnusedImportTransformer(warnings)
+        transform_module(cst.parse_module(source_code), transformer, source_code)
+        self.assertEqual(transformer.edits, edits)
+
+    def test_local_edits(self):
+        source_code = (
+                'import os, sys\n'
+                '# the json module\n'
+                'import json\n'
+                'def f():\n'
+                '    from collections import (\n'
+                '        OrderedDict,\n'
+                '        deque,\n'
+                '    )\n'
+                '    return sys, deque\n')
+        edits, fixed_code = self.fix(source_code, [
+                UnusedImportsWarning('m.py', 1, alias=None, dotted_as_name='os'),
+                UnusedImportsWarning('m.py', 3, alias=None, dotted_as_name='json'),
+                UnusedFromImportsWarning('m.py', 5, import_as_name='OrderedDict',
+                        dotted_as_name='collections', alias=None)])
+        self.assertEqual(edits[:2], [Edit(1, 1, ('import sys\n',)), Edit(2, 3)])
+        lines = source_code.splitlines(True)
+        self.assertEqual(''.join(apply_edits(lines, edits)), fixed_code)
+        self.assertIn('-        OrderedDict,\n', unified_diff(lines, edits, 'a', 'b'))
+
+    def test_empty_block_gets_pass(self):
+        source_code = 'try:\n    # os\n    import os\nexcept ImportError:\n    pass\n'
+        edits, _ = self.fix(source_code, [
+                UnusedImportsWarning('m.py', 3, alias=None, dotted_as_name='os')])
+        self.assertEqual(edits, [Edit(2, 3, ('    pass\n',))])
+        self.assert_edits_match_module(source_code, 3)
+        self.assert_edits_match_module('if x:\n\tif y:\n\t\timport os\n\t\timport os\n', 3)
+
+    def test_edits_match_module(self):
+        for source_code, line_no in [
+                ('def f():\n    import os, sys\n    return sys\n', 2),
+                ('class C:\n\tdef f(self):\n\t\timport os, \\\n\t\t\tsys\n', 3),
+                ('import os, sys\r\nsys.exit()\r\n', 1),
+                ('import sys\n\x0cimport os, sys\n', 2),
+                ('import json\nimport os, sys', 2),
+                # the statements without warnings are left as they are
+                ('from a import (\n    b,\n)\nimport os, sys\n', 4)]:
+            with self.subTest(source_code=source_code):
+                self.assert_edits_match_module(source_code, line_no)
+        self.assert_edits_match_module(
+                'if x:\n    from os import (\n        path,\n        sep)\n', 2, 'os')
+
+    def test_suite_renders_its_statement(self):
+        for source_code, line_no in [
+                ('x = 1\nif x: import os\nelse: import sys\n', 2),
+                ('if x:\n    pass\nelif y: import os; import sys\n', 3),
+                ('try: import os\nexcept ImportError:\n    import os\n', 1),
+                ('@decorator\n\ndef f(): import os\n', 3),
+                ('class C:\n    def f(self): import os\n', 2)]:
+            with self.subTest(source_code=source_code):
+                self.assert_edits_match_module(source_code, line_no)
+
+
+if __name__ == '__main__':
+    unittest.main()
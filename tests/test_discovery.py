@@ -0,0 +1,205 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+
+from delinter.discovery import FileFilter
+from delinter.discovery import chunk_files
+from delinter.discovery import filter_files
+from delinter.discovery import find_python_files
+from delinter.discovery import git_changed_files
+from delinter.discovery import parse_shard
+from delinter.discovery import shard_files
+
+
+class TestGitChangedFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.git('init', '-q')
+        self.write('pkg/a.py', 'import os\n')
+        self.write('pkg/b.py', 'import os\n')
+        self.write('other/c.py', 'import os\n')
+        self.git('add', '.')
+        self.git('commit', '-q', '-m', 'base')
+        self.git('tag', 'base')
+
+    def git(self, *args):
+        subprocess.run(
+                ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                cwd=self.root, check=True)
+
+    def write(self, name, source_code):
+        file_path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(source_code)
+
+    def test_changed_since(self):
+        self.write('pkg/a.py', 'import sys\n')
+        self.write('pkg/notes.txt', 'notes\n')
+        self.write('other/c.py', 'import sys\n')
+        self.git('add', '.')
+        self.git('commit', '-q', '-m', 'change')
+        # uncommitted changes count as well
+        self.write('pkg/b.py', 'import sys\n')
+        root = os.path.join(self.root, 'pkg')
+        self.assertEqual(
+                git_changed_files(root, rev='base'),
+                [Path(root) / 'a.py', Path(root) / 'b.py'])
+        self.assertEqual(git_changed_files(root, rev='HEAD'), [Path(root) / 'b.py'])
+
+    def test_staged(self):
+        self.write('pkg/a.py', 'import sys\n')
+        self.write('pkg/b.py', 'import sys\n')
+        self.git('add', 'pkg/a.py')
+        self.assertEqual(
+                git_changed_files(self.root, staged=True),
+                [Path(self.root) / 'pkg' / 'a.py'])
+
+    def test_not_a_repository(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with self.assertRaises(ValueError):
+            git_changed_files(root, rev='HEAD')
+
+
+class TestFindPythonFiles(unittest.TestCase):
+
+    def setUp(self):
+        # the root is in a repository, whose .gitignore applies to it
+        self.top = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.top)
+        os.mkdir(os.path.join(self.top, '.git'))
+        self.root = os.path.join(self.top, 'src')
+        for name, text in (
+                ('.gitignore', 'build/\n'),
+                ('src/.gitignore', '*_local.py\n'),
+                ('src/pkg/.gitignore', 'gen/\n!keep_local.py\n'),
+                ('src/pkg/a.py', 'import os\n'),
+                ('src/pkg/b_local.py', 'import os\n'),
+                ('src/pkg/keep_local.py', 'import os\n'),
+                ('src/pkg/gen/c.py', 'import os\n'),
+                ('src/pkg/msg_pb2.py', '# Generated by the protocol buffer compiler.  '
+                        'DO NOT EDIT!\nimport os\n'),
+                ('src/pkg/big.py', 'import os\n' + 'x = 1\n' * 500),
+                ('src/pkg/tests/test_a.py', 'import os\n'),
+                ('src/pkg/notes.txt', 'notes\n'),
+                ('src/build/d.py', 'import os\n'),
+                ('src/.venv/lib/e.py', 'import os\n'),
+                ('src/node_modules/f.py', 'import os\n'),
+                ('src/mod.egg-info/g.py', 'import os\n')):
+            file_path = os.path.join(self.top, name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w') as f:
+                f.write(text)
+        # a link back to the root is not followed
+        os.symlink(self.root, os.path.join(self.root, 'pkg', 'loop'))
+
+    def find(self, **kwargs):
+        return [os.path.relpath(f, self.root)
+                for f in find_python_files(self.root, FileFilter(**kwargs))]
+
+    def test_gitignore_and_default_excludes(self):
+        self.assertEqual(self.find(), ['pkg/a.py', 'pkg/big.py', 'pkg/keep_local.py',
+                'pkg/msg_pb2.py', 'pkg/tests/test_a.py'])
+        self.assertEqual(self.find(gitignore=False), ['build/d.py', 'pkg/a.py',
+                'pkg/b_local.py', 'pkg/big.py', 'pkg/gen/c.py', 'pkg/keep_local.py',
+                'pkg/msg_pb2.py', 'pkg/tests/test_a.py'])
+
+    def test_same_paths_as_glob(self):
+        root = os.path.join(self.root, 'pkg', 'tests')
+        self.assertEqual(find_python_files(root), sorted(Path(root).glob('**/*.py')))
+        root = os.path.relpath(root)
+        self.assertEqual(find_python_files(root), sorted(Path(root).glob('**/*.py')))
+
+    def test_filters(self):
+        self.assertEqual(self.find(exclude=('tests', '*_pb2.py')),
+                ['pkg/a.py', 'pkg/big.py', 'pkg/keep_local.py'])
+        self.assertEqual(self.find(include=('pkg/*_local.py', 'a.py')),
+                ['pkg/a.py', 'pkg/keep_local.py'])
+        self.assertEqual(self.find(max_size=1024, skip_generated=True),
+                ['pkg/a.py', 'pkg/keep_local.py', 'pkg/tests/test_a.py'])
+
+    def test_filter_files(self):
+        files = [Path(self.root) / name for name in (
+                'pkg/a.py', 'pkg/msg_pb2.py', 'pkg/tests/test_a.py', '.venv/lib/e.py')]
+        self.assertEqual(
+                filter_files(files, self.root, FileFilter(exclude=('tests',), skip_generated=True)),
+                files[:1])
+
+    def test_filter_single_file(self):
+        file_path = os.path.join(self.root, 'pkg', 'a.py')
+        self.assertEqual(filter_files([file_path], file_path, FileFilter()), [file_path])
+        file_path = os.path.join(self.root, 'pkg', 'msg_pb2.py')
+        self.assertEqual(filter_files([file_path], file_path, FileFilter(skip_generated=True)), [])
+
+
+class TestShardFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.files = []
+        for i in range(40):
+            file_path = os.path.join(self.root, f'pkg_{i % 3}', f'module_{i}.py')
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w') as f:
+                f.write('x = 1\n' * (i * 7 % 23))
+            self.files.append(file_path)
+
+    def shards(self, count, files=None, root=None, by_size=False):
+        return [shard_files(files or self.files, (i, count), root or self.root, by_size=by_size)
+                for i in range(1, count + 1)]
+
+    def test_partition(self):
+        for by_size in (False, True):
+            shards = self.shards(4, by_size=by_size)
+            self.assertTrue(all(shards))
+            self.assertEqual(sorted(sum(shards, [])), sorted(self.files))
+            for shard in shards:
+                # the order of the files is kept
+                self.assertEqual(shard, [f for f in self.files if f in shard])
+
+    def test_stable_paths(self):
+        # the checkout folder does not matter, nor do the other files
+        moved = [os.path.relpath(f, self.root) for f in self.files]
+        self.assertEqual(
+                [[os.path.relpath(f, self.root) for f in shard] for shard in self.shards(3)],
+                self.shards(3, files=moved, root='.'))
+        self.assertEqual(
+                self.shards(3, files=self.files[:10]),
+                [[f for f in shard if f in self.files[:10]] for shard in self.shards(3)])
+
+    def test_by_size(self):
+        loads = [sum(os.path.getsize(f) for f in shard)
+                for shard in self.shards(3, by_size=True)]
+        self.assertLessEqual(max(loads) - min(loads),
+                max(os.path.getsize(f) for f in self.files))
+
+    def test_chunk_files(self):
+        self.assertEqual(chunk_files(self.files, 1), [self.files])
+        self.assertEqual(chunk_files([], 4), [])
+        for count in (2, 12):
+            chunks = chunk_files(self.files, count)
+            self.assertEqual(len(chunks), count)
+            self.assertEqual(sorted(sum(chunks, [])), sorted(self.files))
+            for chunk in chunks:
+                self.assertEqual(chunk, [f for f in self.files if f in chunk])
+            self.assertEqual(chunk_files(self.files, count), chunks)
+        # the folders are smaller than half of the files, so they are not split
+        folders = [{os.path.dirname(f) for f in chunk} for chunk in chunk_files(self.files, 2)]
+        self.assertEqual(sum(len(chunk_folders) for chunk_folders in folders), 3)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for shard in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(ValueError):
+                parse_shard(shard)
+
+
+if __name__ == '__main__':
+    unittest.main()
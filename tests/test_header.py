@@ -0,0 +1,51 @@
+import unittest
+
+from delinter.header import import_header_lines
+from delinter.header import split_import_header
+
+SOURCE_CODE = (
+        '#!/usr/bin/env python\n'
+        '"""Docstring."""\n'
+        'from __future__ import annotations\n'
+        '\n'
+        'import os, \\\n'
+        '    sys\n'
+        '# a comment\n'
+        'from collections import (\n'
+        '    deque,\n'
+        ')\n'
+        '\n'
+        'def f():\n'
+        '    import json\n'
+        'import re\n')
+
+
+class TestImportHeader(unittest.TestCase):
+
+    def test_header_lines(self):
+        self.assertEqual(import_header_lines(SOURCE_CODE.splitlines(True)), 11)
+        self.assertEqual(import_header_lines(['import os\n', 'import sys\n']), 2)
+        self.assertEqual(import_header_lines(['x = 1\n', 'import os\n']), 0)
+        # only the first statement can be the docstring
+        self.assertEqual(import_header_lines(['import os\n', '"""Text."""\n']), 1)
+        self.assertEqual(import_header_lines(['import (\n']), 0)
+
+    def test_split(self):
+        header, rest = split_import_header(SOURCE_CODE, 8)
+        self.assertEqual(header + rest, SOURCE_CODE)
+        self.assertTrue(rest.startswith('def f():\n'))
+        # the warning is below the header
+        self.assertIsNone(split_import_header(SOURCE_CODE, 13))
+        # the whole module is the header
+        self.assertIsNone(split_import_header('import os\nimport sys\n', 1))
+
+    def test_split_bytes(self):
+        source_code = SOURCE_CODE.replace('\n', '\r\n').encode()
+        header, rest = split_import_header(source_code, 5)
+        self.assertEqual(header + rest, source_code)
+        self.assertTrue(rest.startswith(b'def f():\r\n'))
+        self.assertIsNone(split_import_header(source_code.replace(b'\r\n', b'\r'), 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
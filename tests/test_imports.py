@@ -1,9 +1,13 @@
+import os
+import sys
 import difflib
 import unittest
 
 import libcst as cst
 import delinter.imports as imports
 from delinter.main import Delinter
+from delinter.main import get_transformer
+from delinter.main import parse_msg_ids
 
 from fixtures import unused_imports
 from fixtures import reimports
@@ -42,5 +46,315 @@ class TestReimports(BaseTest):
         self.assert_expected_diff(reimports)
 
 
+class TestWarningIndex(unittest.TestCase):
+
+    def test_index_by_file_and_line(self):
+        warnings = [w for w in unused_imports.pylint_messages.split('\n') if w]
+        warning_index = Delinter.index_linter_warnings(warnings, 'W0611')
+        self.assertEqual(len(warning_index), 10)
+        self.assertIn('./test_unused_imports.py', warning_index)
+        self.assertNotIn('other.py', warning_index)
+
+        file_warnings = warning_index.for_file('test_unused_imports.py')
+        self.assertEqual(sorted(file_warnings.line_nos), [1, 3, 5, 6, 7, 8, 9])
+        self.assertIsNotNone(file_warnings.get(
+                6, imports.UnusedImportsWarning, ('numpy', 'np')))
+        self.assertIsNone(file_warnings.get(
+                6, imports.UnusedImportsWarning, ('numpy', None)))
+        self.assertIsNotNone(file_warnings.get(
+                8, imports.UnusedFromImportsWarning, ('itertools', 'filterfalse', '_filterfalse')))
+        self.assertEqual(len(warning_index.for_file('other.py')), 0)
+
+    def test_select_and_update(self):
+        warning_index = Delinter.index_linter_warnings([
+                'a.py:1:[W0611(unused-import),]Unused import os',
+                "a.py:2:[W0404(reimported),]Reimport 'os' (imported line 1)",
+                'b.py:3:[W0611(unused-import),]Unused os imported as o',
+                'c.py:4:[W0611(unused-import),]Unused path imported from os as p',
+                ], 'all')
+        self.assertEqual(len(warning_index), 4)
+        self.assertFalse(hasattr(next(iter(warning_index)), '__dict__'))
+
+        selected = warning_index.select(msg_ids=['W0611'], files=['c.py', './a.py', 'd.py'])
+        self.assertEqual(selected.files(), [os.path.abspath('c.py'), os.path.abspath('a.py')])
+        self.assertEqual(list(selected), [
+                imports.UnusedFromImportsWarning(file_path='c.py', line_no=4,
+                        import_as_name='path', dotted_as_name='os', alias='p'),
+                imports.UnusedImportsWarning(file_path='a.py', line_no=1,
+                        alias=None, dotted_as_name='os')])
+        self.assertEqual([w.line_no for w in warning_index.select(msg_ids=['W0404'])], [2])
+        self.assertEqual(len(warning_index.select(files=['b.py'])), 1)
+
+        updated = imports.WarningIndex()
+        updated.update(warning_index.select(files=['a.py']))
+        updated.update(warning_index.select(files=['b.py', 'c.py']))
+        self.assertEqual(list(updated), list(warning_index))
+        self.assertEqual(len(updated.for_file('a.py')), 2)
+
+
+class TestCombinedTransformer(unittest.TestCase):
+
+    source_code = (
+            'import os\n'
+            'import os, sys\n'
+            'from collections import deque, OrderedDict\n'
+            'from collections import deque\n'
+            'deque()\n')
+
+    pylint_messages = [
+            "sample.py:2:[W0404(reimported),]Reimport 'os' (imported line 1)",
+            'sample.py:2:[W0611(unused-import),]Unused import sys',
+            'sample.py:3:[W0611(unused-import),]Unused OrderedDict imported from collections',
+            "sample.py:4:[W0404(reimported),]Reimport 'deque' (imported line 3)",
+            ]
+
+    def test_parse_msg_ids(self):
+        self.assertEqual(parse_msg_ids('W0611'), ('W0611',))
+        self.assertEqual(parse_msg_ids('W0404, W0611,W0404'), ('W0404', 'W0611'))
+        self.assertEqual(parse_msg_ids('all'), ('W0611', 'W0404'))
+        with self.assertRaises(ValueError):
+            parse_msg_ids('W0611,W9999')
+
+    def test_single_pass(self):
+        warning_index = Delinter.index_linter_warnings(self.pylint_messages, 'W0611,W0404')
+        self.assertEqual(len(warning_index), 4)
+        wrapper = cst.MetadataWrapper(cst.parse_module(self.source_code))
+        fixed_module = wrapper.visit(get_transformer(
+                ('W0611', 'W0404'), warning_index.for_file('sample.py')))
+        self.assertEqual(fixed_module.code, (
+                'import os\n'
+                'from collections import deque\n'
+                'deque()\n'))
+
+    def test_keep_reimport_of_removed_import(self):
+        warning_index = Delinter.index_linter_warnings([
+                'sample.py:1:[W0611(unused-import),]Unused import sys',
+                "sample.py:4:[W0404(reimported),]Reimport 'sys' (imported line 1)",
+                ], 'W0611,W0404')
+        source_code = 'import sys\n\ndef main():\n    import sys\n    return sys.argv\n'
+        wrapper = cst.MetadataWrapper(cst.parse_module(source_code))
+        fixed_module = wrapper.visit(get_transformer(
+                ('W0611', 'W0404'), warning_index.for_file('sample.py')))
+        self.assertEqual(fixed_module.code,
+                '\ndef main():\n    import sys\n    return sys.argv\n')
+
+    def test_aliased_import_does_not_keep_reimport(self):
+        # the unused `import sys as system` binds another name than the reimport
+        warning_index = Delinter.index_linter_warnings([
+                'sample.py:1:[W0611(unused-import),]Unused sys imported as system',
+                "sample.py:3:[W0404(reimported),]Reimport 'sys' (imported line 2)",
+                ], 'W0611,W0404')
+        source_code = 'import sys as system\nimport sys\nimport sys\nsys.exit()\n'
+        wrapper = cst.MetadataWrapper(cst.parse_module(source_code))
+        fixed_module = wrapper.visit(get_transformer(
+                ('W0611', 'W0404'), warning_index.for_file('sample.py')))
+        self.assertEqual(fixed_module.code, 'import sys\nsys.exit()\n')
+
+
+class TestStatementLines(unittest.TestCase):
+
+    source_code = (
+            'import os; import sys\n'
+            'from collections import (\n'
+            '    deque,\n'
+            '    OrderedDict,\n'
+            ')\n'
+            '@decorator\n'
+            'def f(x):\n'
+            '    if x: import re\n'
+            '    elif x > 1:\n'
+            '        import abc\n'
+            '    else:\n'
+            '        import io\n'
+            '    for i in x:\n'
+            '        import csv\n'
+            '    else:\n'
+            '        import gc\n'
+            '    try:\n'
+            '        import zlib\n'
+            '    except ImportError:\n'
+            '        import gzip\n'
+            '    finally:\n'
+            '        import lzma\n'
+            'class C:\n'
+            '    async def g(self):\n'
+            '        async with x:\n'
+            '            import bisect\n'
+            'deque()\n')
+
+    def test_same_lines_as_positions(self):
+        module = cst.parse_module(self.source_code)
+        lines = imports.statement_lines(module, self.source_code)
+        positions = cst.MetadataWrapper(module, unsafe_skip_copy=True).resolve(
+                cst.metadata.PositionProvider)
+        self.assertEqual(len(lines), 31)
+        for node, line_range in lines.items():
+            self.assertEqual(
+                    line_range, (positions[node].start.line, positions[node].end.line))
+
+    def test_every_statement_type(self):
+        source_code = (
+                'import os\n'
+                'x: int = 1; x += 1; y = x; del y; assert x; print(x)\n'
+                'class C(object):\n'
+                '    import abc\n'
+                '    @staticmethod\n'
+                '    @decorator(\n'
+                '        1)\n'
+                '    def f():\n'
+                '        global x\n'
+                '        def g():\n'
+                '            nonlocal x; import io; return x\n'
+                '        raise ValueError()\n'
+                '    async def h(self):\n'
+                '        async for i in x: import re\n'
+                '        async with x as y, x as z:\n'
+                '            import gc\n'
+                'while x:\n'
+                '    import csv; break\n'
+                'else:\n'
+                '    import zlib; pass\n'
+                'for i in x:\n'
+                '    continue\n'
+                'else: import json\n'
+                'if x: import sys\n'
+                'elif y:\n'
+                '    import time\n'
+                'elif x: pass\n'
+                'else:\n'
+                '    import glob\n'
+                'try: import lzma\n'
+                'except (ImportError, ValueError):\n'
+                '    import gzip\n'
+                'except Exception as e: import bz2\n'
+                'else:\n'
+                '    import dbm\n'
+                'finally:\n'
+                '    import math\n')
+        if sys.version_info >= (3, 10) and hasattr(cst, 'Match'):
+            source_code += (
+                    'match x:\n'
+                    '    case [1, *rest] if rest:\n'
+                    '        import array\n'
+                    '    case {"a": 1}: import heapq\n'
+                    '    case _:\n'
+                    '        pass\n')
+        if sys.version_info >= (3, 11) and hasattr(cst, 'TryStar'):
+            source_code += (
+                    'try:\n'
+                    '    import uuid\n'
+                    'except* ValueError:\n'
+                    '    import enum\n'
+                    'except* TypeError: import copy\n'
+                    'finally:\n'
+                    '    import string\n')
+        module = cst.parse_module(source_code)
+        lines = imports.statement_lines(module, source_code)
+        positions = cst.MetadataWrapper(module, unsafe_skip_copy=True).resolve(
+                cst.metadata.PositionProvider)
+        imports_count = sum(1 for node in positions
+                if isinstance(node, (cst.Import, cst.ImportFrom)))
+        self.assertEqual(sum(1 for node in lines
+                if isinstance(node, (cst.Import, cst.ImportFrom))), imports_count)
+        for node, line_range in lines.items():
+            self.assertEqual(
+                    line_range, (positions[node].start.line, positions[node].end.line))
+
+    def test_branch_mismatch(self):
+        for module_code, source_code in [
+                ('for i in x:\n    pass\nelse:\n    import os\n', 'for i in x:\n    pass\n'),
+                ('def f():\n    pass\n', 'async def f():\n    pass\n'),
+                ('if x:\n    pass\nelse:\n    import os\n',
+                        'if x:\n    pass\nelif y:\n    import os\n'),
+                ('try:\n    pass\nexcept:\n    import os\n',
+                        'try:\n    pass\nfinally:\n    import os\n')]:
+            module = cst.parse_module(module_code)
+            with self.subTest(source_code=source_code), self.assertRaises(ValueError):
+                imports.statement_lines(module, source_code)
+
+    def test_mismatch(self):
+        module = cst.parse_module(self.source_code)
+        with self.assertRaises(ValueError):
+            imports.statement_lines(module, 'import os\n')
+
+    def test_transform_module(self):
+        warnings = [
+                imports.UnusedImportsWarning('m.py', 1, alias=None, dotted_as_name='os'),
+                imports.UnusedFromImportsWarning('m.py', 2, import_as_name='OrderedDict',
+                        dotted_as_name='collections', alias=None),
+                imports.UnusedImportsWarning('m.py', 10, alias=None, dotted_as_name='abc'),
+                imports.UnusedImportsWarning('m.py', 26, alias=None, dotted_as_name='bisect')]
+        transformer = imports.RemoveUnusedImportTransformer(warnings)
+        fixed_module = imports.transform_module(
+                cst.parse_module(self.source_code), transformer, self.source_code)
+        self.assertIsNotNone(transformer.statement_lines)
+        expected = imports.RemoveUnusedImportTransformer(warnings)
+        expected_module = cst.MetadataWrapper(cst.parse_module(self.source_code)).visit(expected)
+        self.assertEqual(fixed_module.code, expected_module.code)
+        self.assertEqual(transformer.edits, expected.edits)
+
+    def test_fallback(self):
+        warnings = [imports.UnusedImportsWarning('m.py', 1, alias=None, dotted_as_name='os')]
+        transformer = imports.RemoveUnusedImportTransformer(warnings)
+        # the module and the source differ, so the positions of libcst are used
+        fixed_module = imports.transform_module(
+                cst.parse_module('import os\n'), transformer, 'x = 1\n')
+        self.assertIsNone(transformer.statement_lines)
+        self.assertNotIn('import', fixed_module.code)
+
+    def test_delete_statement(self):
+        # libcst names the del statement Del where the ast names it Delete
+        source_code = 'import os\nx = 1\ndel x\n'
+        warnings = [imports.UnusedImportsWarning('m.py', 1, alias=None, dotted_as_name='os')]
+        transformer = imports.RemoveUnusedImportTransformer(warnings)
+        fixed_module = imports.transform_module(
+                cst.parse_module(source_code), transformer, source_code)
+        self.assertIsNotNone(transformer.statement_lines)
+        self.assertEqual(fixed_module.code, 'x = 1\ndel x\n')
+
+
+class TestImportWarningsVisitor(unittest.TestCase):
+
+    def detect(self, source_code, file_path='sample.py', msg_ids=('W0611', 'W0404')):
+        wrapper = cst.MetadataWrapper(cst.parse_module(source_code))
+        return imports.detect_import_warnings(wrapper, file_path, msg_ids)
+
+    def test_reimports_match_pylint(self):
+        warnings = self.detect(reimports.source_code, msg_ids=('W0404',))
+        parsed_warnings = Delinter.parse_linter_warnings(
+                [w for w in reimports.pylint_messages.split('\n') if w], 'W0404')
+        self.assertEqual(
+                [(w.line_no, w.import_as_name) for w in warnings],
+                [(w.line_no, w.import_as_name) for w in parsed_warnings])
+
+    def test_unused_imports(self):
+        source_code = (
+                'from __future__ import annotations\n'
+                'import os.path, sys as system, json\n'
+                'from collections import deque as dq, OrderedDict\n'
+                'from typing import *\n'
+                'try:\n'
+                '    import simplejson\n'
+                'except ImportError:\n'
+                '    import json as simplejson\n'
+                'def f():\n'
+                '    import re\n'
+                '    return os.getcwd()\n'
+                '__all__ = ["OrderedDict"]\n')
+        warnings = self.detect(source_code)
+        self.assertEqual(warnings, [
+                imports.UnusedImportsWarning(file_path='sample.py', line_no=2, alias='system', dotted_as_name='sys'),
+                imports.UnusedImportsWarning(file_path='sample.py', line_no=2, alias=None, dotted_as_name='json'),
+                imports.UnusedFromImportsWarning(file_path='sample.py', line_no=3, import_as_name='deque', dotted_as_name='collections', alias='dq'),
+                imports.UnusedImportsWarning(file_path='sample.py', line_no=6, alias=None, dotted_as_name='simplejson'),
+                imports.ReimportWarning(file_path='sample.py', line_no=8, import_as_name='json'),
+                imports.UnusedImportsWarning(file_path='sample.py', line_no=8, alias='simplejson', dotted_as_name='json'),
+                imports.UnusedImportsWarning(file_path='sample.py', line_no=10, alias=None, dotted_as_name='re'),
+                ])
+
+    def test_package_init(self):
+        self.assertEqual(self.detect('import os\n', file_path='pkg/__init__.py'), [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,285 @@
+import os
+import ast
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+import delinter.imports as imports
+from delinter.linters import run_pylint
+from delinter.linters import iter_pylint_warnings
+from delinter.linters import run_linter
+from delinter.linters import run_pylint_on_source
+from delinter.linters import LINTER_BACKENDS
+from delinter.linters import LinterMessage
+from delinter.linters import ImportStatements
+from delinter.linters import warning_from_message
+
+INPUT_PATH = os.path.join(os.path.dirname(__file__), 'input')
+
+
+class TestRunPylint(unittest.TestCase):
+
+    def test_only_requested_messages(self):
+        file_path = os.path.join(INPUT_PATH, 'sample_unused_imports.py')
+        warnings = run_pylint(
+                [file_path], {imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter})
+
+        self.assertTrue(warnings)
+        for warning in warnings:
+            self.assertIsInstance(warning, imports.BaseUnusedImportsWarning)
+            self.assertNotIsInstance(warning, imports.ReimportWarning)
+            self.assertEqual(imports.normalize_path(warning.file_path), file_path)
+        self.assertIn(
+                imports.UnusedImportsWarning(
+                        file_path=warnings[0].file_path, line_no=5, alias=None, dotted_as_name='os'),
+                warnings)
+        self.assertIn(
+                imports.UnusedFromImportsWarning(
+                        file_path=warnings[0].file_path, line_no=7, import_as_name='OrderedDict',
+                        dotted_as_name='collections.abc', alias=None),
+                warnings)
+
+    def test_several_messages(self):
+        file_path = os.path.join(INPUT_PATH, 'sample_reimport.py')
+        warnings = run_pylint([file_path], {
+                imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter,
+                imports.ReimportDelinter.CODE: imports.ReimportDelinter})
+        reimports = [(w.line_no, w.import_as_name)
+                for w in warnings if isinstance(w, imports.ReimportWarning)]
+        self.assertIn((2, 'unitest.mock.patch'), reimports)
+        self.assertIn((9, 'y'), reimports)
+        self.assertTrue(any(isinstance(w, imports.UnusedImportsWarning) for w in warnings))
+
+    def test_sources_in_place_of_files(self):
+        delinter_classes = {imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter}
+        file_paths = []
+        for folder in ('first', 'second'):
+            package = os.path.join(tempfile.mkdtemp(), 'package')
+            self.addCleanup(shutil.rmtree, os.path.dirname(package))
+            os.mkdir(package)
+            for name, source_code in [('__init__.py', ''), ('sibling.py', 'name = 1\n'),
+                    ('module.py', 'import json\n')]:
+                with open(os.path.join(package, name), 'w') as f:
+                    f.write(source_code)
+            file_paths.append(os.path.join(package, 'module.py'))
+        run_pylint(file_paths[:1], delinter_classes)
+
+        # the module of the same name linted before in another folder is not used
+        warnings = run_pylint(file_paths[1:], delinter_classes, sources={
+                file_paths[1]: 'import os\nfrom .sibling import name\n'})
+
+        self.assertEqual([(w.line_no, w.file_path) for w in warnings],
+                [(1, file_paths[1]), (2, file_paths[1])])
+        # the file is linted from its own content afterwards
+        self.assertEqual([w.dotted_as_name for w in run_pylint(file_paths[1:], delinter_classes)],
+                ['json'])
+
+
+class TestRunPylintOnSource(unittest.TestCase):
+
+    def test_buffer_instead_of_file(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        file_path = os.path.join(root, 'buffer.py')
+        with open(file_path, 'w') as f:
+            f.write('import json\n')
+        delinter_classes = {imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter}
+        stdin = sys.stdin
+
+        warnings = run_pylint_on_source(file_path, 'import os\nimport sys\nsys.exit()\n',
+                delinter_classes)
+
+        self.assertIs(sys.stdin, stdin)
+        self.assertEqual([(w.line_no, w.dotted_as_name) for w in warnings], [(1, 'os')])
+        self.assertEqual(warnings[0].file_path, file_path)
+        # the file is linted from its own content afterwards
+        self.assertEqual([w.dotted_as_name for w in run_pylint([file_path], delinter_classes)],
+                ['json'])
+
+
+class TestIterPylintWarnings(unittest.TestCase):
+
+    def test_one_batch_per_file(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        sources = {
+                'a.py': 'import os\nimport sys\n',
+                'b.py': 'import os\nos.getcwd()\n',
+                'c.py': 'import json\n'}
+        files = []
+        for name, source_code in sources.items():
+            files.append(os.path.join(root, name))
+            with open(files[-1], 'w') as f:
+                f.write(source_code)
+
+        batches = list(iter_pylint_warnings(
+                files,
+                {imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter},
+                max_pending=1))
+        # the file without warnings is not handed over
+        self.assertEqual(
+                sorted((os.path.basename(file_path), [w.dotted_as_name for w in warnings])
+                        for file_path, warnings in batches),
+                [('a.py', ['os', 'sys']), ('c.py', ['json'])])
+        for file_path, warnings in batches:
+            for warning in warnings:
+                self.assertEqual(warning.file_path, file_path)
+
+    def test_errors_are_raised(self):
+        with self.assertRaises(BaseException):
+            list(iter_pylint_warnings(
+                    ['--not-an-option'],
+                    {imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter}))
+
+
+class TestRunLinter(unittest.TestCase):
+
+    def test_chunks_in_parallel(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        files = []
+        for package, other in (('pkg_a', 'pkg_b'), ('pkg_b', 'pkg_a')):
+            os.makedirs(os.path.join(root, package))
+            open(os.path.join(root, package, '__init__.py'), 'w').close()
+            for i in range(10):
+                files.append(os.path.join(root, package, f'module_{i}.py'))
+                with open(files[-1], 'w') as f:
+                    f.write(f'import os\nimport sys\nimport sys\nfrom {other} import module_{i}\n'
+                            + 'sys.exit()\n' * i)
+        delinter_classes = {
+                imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter,
+                imports.ReimportDelinter.CODE: imports.ReimportDelinter}
+
+        serial = run_linter('pylint', files, delinter_classes)
+        parallel = run_linter('pylint', files, delinter_classes, jobs=2)
+
+        self.assertTrue(serial)
+        self.assertEqual(len(parallel), len(serial))
+        for file_path in files:
+            self.assertEqual(list(parallel.for_file(file_path)), list(serial.for_file(file_path)))
+        self.assertEqual(list(run_linter('pylint', files, delinter_classes, jobs=2)),
+                list(parallel))
+
+
+PYFLAKES_SOURCE = '''import os.path
+import numpy as np
+from collections import (
+        OrderedDict as od,
+        deque as dq, deque as dq2)
+from . import sibling
+from .sibling import name
+import sys
+import sys
+def sys():
+    pass
+from json import loads
+from pickle import loads
+'''
+
+
+def _installed(name):
+    return importlib.util.find_spec(name) is not None or shutil.which(name) is not None
+
+
+class TestWarningFromMessage(unittest.TestCase):
+
+    def warning(self, line_no, col, code, text):
+        statements = ImportStatements(ast.parse(PYFLAKES_SOURCE))
+        return warning_from_message(statements, 'a.py',
+                LinterMessage('a.py', line_no, col, code, text))
+
+    def test_unused_imports(self):
+        self.assertEqual(self.warning(1, 1, 'F401', "'os.path' imported but unused"),
+                imports.UnusedImportsWarning(
+                        file_path='a.py', line_no=1, alias=None, dotted_as_name='os.path'))
+        # pyflakes names the alias, ruff does not
+        for text in ("'numpy as np' imported but unused", '`numpy` imported but unused'):
+            self.assertEqual(self.warning(2, 1, 'F401', text),
+                    imports.UnusedImportsWarning(
+                            file_path='a.py', line_no=2, alias='np', dotted_as_name='numpy'))
+        # ruff reports the line of the name, pylint the line of the statement
+        self.assertEqual(self.warning(4, 9, 'F401', '`collections.OrderedDict` imported but unused'),
+                imports.UnusedFromImportsWarning(file_path='a.py', line_no=3,
+                        import_as_name='OrderedDict', dotted_as_name='collections', alias='od'))
+        self.assertEqual(self.warning(6, 1, 'F401', "'.sibling' imported but unused"),
+                imports.UnusedFromImportsWarning(file_path='a.py', line_no=6,
+                        import_as_name='sibling', dotted_as_name='', alias=None))
+        self.assertEqual(self.warning(7, 1, 'F401', "'.sibling.name' imported but unused"),
+                imports.UnusedFromImportsWarning(file_path='a.py', line_no=7,
+                        import_as_name='name', dotted_as_name='sibling', alias=None))
+        self.assertIsNone(self.warning(9, 1, 'F401', "'json' imported but unused"))
+
+    def test_package_init(self):
+        statements = ImportStatements(ast.parse(PYFLAKES_SOURCE))
+        self.assertIsNone(warning_from_message(statements, 'pkg/__init__.py',
+                LinterMessage('pkg/__init__.py', 1, 1, 'F401', "'os.path' imported but unused")))
+        self.assertIsNotNone(warning_from_message(statements, 'pkg/__init__.py',
+                LinterMessage('pkg/__init__.py', 9, 1, 'F811',
+                        "redefinition of unused 'sys' from line 8")))
+
+    def test_same_name_told_apart_by_column(self):
+        text = '`collections.deque` imported but unused'
+        self.assertEqual(self.warning(5, 22, 'F401', text).alias, 'dq2')
+        self.assertEqual(self.warning(5, 9, 'F401', text).alias, 'dq')
+        # pyflakes points at the statement, which does not tell them apart
+        self.assertIsNone(self.warning(3, 1, 'F401', text))
+
+    def test_reimports(self):
+        self.assertEqual(self.warning(9, 1, 'F811', "redefinition of unused 'sys' from line 8"),
+                imports.ReimportWarning(file_path='a.py', line_no=9, import_as_name='sys'))
+        # a function is no reimport, neither is the name of another module
+        self.assertIsNone(self.warning(10, 1, 'F811', "redefinition of unused 'sys' from line 9"))
+        self.assertIsNone(self.warning(
+                13, 1, 'F811', 'Redefinition of unused `loads` from line 12: `loads` redefined here'))
+
+
+class TestLinterBackends(unittest.TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.file_path = os.path.join(root, 'a.py')
+        with open(self.file_path, 'w') as f:
+            f.write(PYFLAKES_SOURCE)
+        self.delinter_classes = {
+                imports.UnusedImportsDelinter.CODE: imports.UnusedImportsDelinter,
+                imports.ReimportDelinter.CODE: imports.ReimportDelinter}
+
+    def check(self, name):
+        if not _installed(name):
+            self.skipTest(f'{name} is not installed')
+        warnings = LINTER_BACKENDS[name]().run([self.file_path], self.delinter_classes)
+        self.assertEqual(
+                sorted((type(w).__name__, w.line_no, getattr(w, 'alias', None)) for w in warnings),
+                [('ReimportWarning', 9, None),
+                        ('UnusedFromImportsWarning', 3, 'dq'),
+                        ('UnusedFromImportsWarning', 3, 'dq2'),
+                        ('UnusedFromImportsWarning', 3, 'od'),
+                        ('UnusedFromImportsWarning', 6, None),
+                        ('UnusedFromImportsWarning', 7, None),
+                        ('UnusedFromImportsWarning', 13, None),
+                        ('UnusedImportsWarning', 1, None),
+                        ('UnusedImportsWarning', 2, 'np')])
+        for warning in warnings:
+            self.assertEqual(warning.file_path, self.file_path)
+        # like pylint, the unused imports of a package __init__ are kept
+        init_path = os.path.join(os.path.dirname(self.file_path), '__init__.py')
+        shutil.copy(self.file_path, init_path)
+        warnings = LINTER_BACKENDS[name]().run([init_path], self.delinter_classes)
+        self.assertEqual([(type(w).__name__, w.line_no) for w in warnings],
+                [('ReimportWarning', 9)])
+
+    def test_pyflakes(self):
+        self.check('pyflakes')
+
+    def test_flake8(self):
+        self.check('flake8')
+
+    def test_ruff(self):
+        self.check('ruff')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,374 @@
+import io
+import os
+import json
+import shutil
+import difflib
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+import libcst as cst
+
+from delinter.diffs import Edit
+from delinter.diffs import apply_edits
+from delinter.main import Delinter
+from delinter.main import FixOptions
+from delinter.main import _iter_file_results
+from delinter.main import _iter_run_results
+from delinter.main import fix_buffer_until_stable
+from delinter.main import main
+from delinter.linters import run_linter
+
+from fixtures import unused_imports
+
+
+class BaseMainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_files(self, count, source_code, prefix='module'):
+        files = []
+        for i in range(count):
+            file_path = os.path.join(self.root, f'{prefix}_{i}.py')
+            with open(file_path, 'w') as f:
+                # vary the sizes so that the pool reorders the submissions
+                f.write(source_code + '\n' * i)
+            files.append(file_path)
+        return files
+
+    def warnings_for(self, files, pylint_messages):
+        warnings = []
+        for file_path in files:
+            warnings.extend(
+                    w.replace('test_unused_imports.py', file_path)
+                    for w in pylint_messages.split('\n') if w)
+        return warnings
+
+
+class TestFolder(BaseMainTest):
+
+    def test_folder_that_is_no_package(self):
+        file_path, = self.write_files(1, 'import os\n')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['--msg_id', 'W0611', self.root])
+        self.assertIn(f'--- a{file_path}\n', output.getvalue())
+        self.assertIn('\n-import os\n', output.getvalue())
+
+    def test_single_file_is_filtered(self):
+        file_path, = self.write_files(1, 'import os\n')
+        def run(*args):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(['--msg_id', 'W0611', *args, file_path])
+            return output.getvalue()
+        self.assertIn('\n-import os\n', run())
+        self.assertEqual(run('--exclude', 'module_*'), '')
+        self.assertEqual(run('--include', 'other_*'), '')
+
+    def test_msg_id_is_required(self):
+        with contextlib.redirect_stderr(io.StringIO()) as error, \
+                self.assertRaises(SystemExit):
+            main([self.root])
+        self.assertIn('--msg_id', error.getvalue())
+
+
+class TestParallelDiffs(BaseMainTest):
+
+    def test_jobs_keep_serial_order(self):
+        files = self.write_files(4, unused_imports.source_code)
+        # a file without warnings is skipped
+        files.append(self.write_files(1, 'import os\n', prefix='clean')[0])
+        warning_index = Delinter.index_linter_warnings(
+                self.warnings_for(files[:4], unused_imports.pylint_messages), 'W0611')
+
+        fix_options = FixOptions(msg_ids=('W0611',), sep='')
+        serial = [r.diff for r in _iter_file_results(files, warning_index, fix_options, jobs=1)]
+        parallel = [r.diff for r in _iter_file_results(files, warning_index, fix_options, jobs=2)]
+        self.assertEqual(len(serial), 4)
+        self.assertEqual(serial, parallel)
+        for file_path, diff in zip(files, serial):
+            self.assertTrue(diff.startswith(f'--- a{file_path}'))
+
+    def test_run_with_jobs(self):
+        files = self.write_files(3, 'import os\n')
+        files.insert(1, self.write_files(1, 'import os\nos.getcwd()\n', prefix='clean')[0])
+        fix_options = FixOptions(msg_ids=('W0611',), sep='')
+        # the results of the workers hold copies of the paths
+        results = list(_iter_run_results(files, fix_options, jobs=2))
+        self.assertEqual([r.file_path for r in results], files)
+        self.assertEqual([bool(r.diff) for r in results], [True, False, True, True])
+
+    def test_main_with_jobs(self):
+        files = self.write_files(3, 'import os\nimport sys\nsys.exit()\n')
+
+        def run(*args):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(['--msg_id', 'W0611', *args, self.root])
+            return output.getvalue()
+
+        diffs = run('--jobs', '2')
+        self.assertEqual(diffs.count('-import os\n'), 3)
+        for file_path in files:
+            self.assertIn(f'--- a{file_path}\n', diffs)
+        self.assertEqual(diffs, run())
+
+    def test_stream_with_jobs(self):
+        files = self.write_files(3, 'import os\nimport sys\nsys.exit()\n')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['--msg_id', 'W0611', '--stream', '--jobs', '2', self.root])
+        diffs = output.getvalue()
+        self.assertEqual(diffs.count('-import os\n'), 3)
+        for file_path in files:
+            self.assertIn(f'--- a{file_path}\n', diffs)
+
+
+class TestDetectors(BaseMainTest):
+
+    def test_libcst_detector(self):
+        files = self.write_files(2, 'import os\nimport sys\nimport sys\nsys.exit()\n')
+        fix_options = FixOptions(msg_ids=('W0611', 'W0404'), sep='', detector='libcst')
+        results = list(_iter_file_results(files, None, fix_options))
+        self.assertEqual([r.file_path for r in results], files)
+        for result in results:
+            self.assertIn('\n-import os\n', result.diff)
+            self.assertIn('\n-import sys\n', result.diff)
+
+    def test_cross_check(self):
+        files = self.write_files(1, 'import os\nimport sys\n')
+        warning_index = Delinter.index_linter_warnings(
+                [f'{files[0]}:1:[W0611(unused-import),]Unused import os'], 'W0611')
+        fix_options = FixOptions(msg_ids=('W0611',), sep='', detector='cross-check')
+        result, = _iter_file_results(files, warning_index, fix_options)
+        # the pylint warnings are used for the fix
+        self.assertIn('\n-import os\n', result.diff)
+        self.assertNotIn('\n-import sys\n', result.diff)
+        self.assertEqual(result.pylint_only, [])
+        self.assertEqual([(w.line_no, w.dotted_as_name) for w in result.libcst_only], [(2, 'sys')])
+
+    def test_cross_check_relative_import(self):
+        files = self.write_files(1, 'from . import sibling\nfrom . import other as o\n')
+        # pylint reports `from . import a` like `import a`
+        warning_index = Delinter.index_linter_warnings([
+                f'{files[0]}:1:[W0611(unused-import),]Unused import sibling',
+                f'{files[0]}:2:[W0611(unused-import),]Unused other imported as o'], 'W0611')
+        fix_options = FixOptions(msg_ids=('W0611',), sep='', detector='cross-check')
+        result, = _iter_file_results(files, warning_index, fix_options)
+        self.assertEqual(result.pylint_only, [])
+        self.assertEqual(result.libcst_only, [])
+
+
+class TestWrite(BaseMainTest):
+
+    def test_write_keeps_encoding_and_newlines(self):
+        sources = {
+                'crlf.py': b'import os\r\nimport sys\r\nsys.exit()\r\n',
+                'latin.py': b'# -*- coding: latin-1 -*-\nimport os\nNAME = "\xe9"\n',
+                'clean.py': b'import sys\nsys.exit()\n'}
+        for name, source_code in sources.items():
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(source_code)
+        main(['--msg_id', 'W0611', '--write', self.root])
+
+        def read(name):
+            with open(os.path.join(self.root, name), 'rb') as f:
+                return f.read()
+        self.assertEqual(read('crlf.py'), b'import sys\r\nsys.exit()\r\n')
+        self.assertEqual(read('latin.py'), b'# -*- coding: latin-1 -*-\nNAME = "\xe9"\n')
+        self.assertEqual(read('clean.py'), sources['clean.py'])
+
+    def test_no_diff(self):
+        files = self.write_files(1, 'import os\n')
+        warning_index = Delinter.index_linter_warnings(
+                [f'{files[0]}:1:[W0611(unused-import),]Unused import os'], 'W0611')
+        fix_options = FixOptions(msg_ids=('W0611',), sep='', write=True)
+        result, = _iter_file_results(files, warning_index, fix_options)
+        self.assertEqual(result.diff, '')
+        self.assertNotIn(b'import os', result.fixed_source)
+
+
+class TestHeaderOnly(BaseMainTest):
+
+    source_code = 'import os\nimport sys\n\ndef f():\n    import json\n    return sys\n'
+
+    def fix(self, line_nos, write=False):
+        files = self.write_files(1, self.source_code)
+        messages = {
+                1: f'{files[0]}:1:[W0611(unused-import),]Unused import os',
+                5: f'{files[0]}:5:[W0611(unused-import),]Unused import json'}
+        warning_index = Delinter.index_linter_warnings(
+                [messages[line_no] for line_no in line_nos], 'W0611')
+        fix_options = FixOptions(msg_ids=('W0611',), sep='', write=write)
+        with mock.patch('delinter.main.cst.parse_module', wraps=cst.parse_module) as parse:
+            result, = _iter_file_results(files, warning_index, fix_options)
+        parsed, = parse.call_args[0]
+        return result, parsed
+
+    def test_header_is_parsed(self):
+        result, parsed = self.fix([1])
+        self.assertEqual(parsed, 'import os\nimport sys\n\n')
+        self.assertEqual(result.diff.splitlines()[2:], [
+                '@@ -1,4 +1,3 @@', '-import os', ' import sys', ' ', ' def f():'])
+
+        result, parsed = self.fix([1], write=True)
+        self.assertEqual(parsed, b'import os\nimport sys\n\n')
+        self.assertEqual(result.fixed_source, self.source_code[len('import os\n'):].encode())
+
+    def test_warning_below_the_header(self):
+        result, parsed = self.fix([1, 5])
+        self.assertEqual(parsed, self.source_code)
+        self.assertIn('-    import json\n', result.diff)
+
+
+class TestProfile(BaseMainTest):
+
+    def test_summary_and_trace(self):
+        files = self.write_files(2, 'import os\n')
+        profile_path = os.path.join(self.root, 'profile.json')
+        trace_path = os.path.join(self.root, 'trace.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(['--msg_id', 'W0611', '--profile', profile_path, '--trace', trace_path,
+                    '-j', '2', *files[:1]])
+        with open(profile_path) as f:
+            summary = json.load(f)
+        stages = summary['stages']
+        for stage in ('run', 'discover', 'pylint', 'fix', 'read', 'parse', 'transform', 'diff'):
+            self.assertIn(stage, stages)
+        self.assertEqual(stages['fix']['count'], 1)
+        self.assertEqual(stages['fix']['warnings'], 1)
+        self.assertEqual(stages['fix']['bytes'], len('import os\n'))
+        self.assertEqual([f['file_path'] for f in summary['slowest_files']], files[:1])
+
+        with open(trace_path) as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual(len(events), sum(stage['count'] for stage in stages.values()))
+        self.assertTrue(all(event['ph'] == 'X' and event['dur'] >= 0 for event in events))
+
+
+class TestNdjson(BaseMainTest):
+
+    def run_main(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['--msg_id', 'all', '--format', 'ndjson', *args])
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_records(self):
+        source_code = 'import os\nimport sys\nimport sys\nsys.exit()\n\nif sys:\n    import json\n'
+        fixed_file, = self.write_files(1, source_code)
+        clean_file, = self.write_files(1, 'import sys\nsys.exit()\n', prefix='clean')
+        clean_record, record = self.run_main('--include-diff', self.root)
+        self.assertEqual(clean_record,
+                dict(file_path=clean_file, warnings=[], edits=[], diff=''))
+        self.assertEqual(record['file_path'], fixed_file)
+        self.assertEqual(
+                sorted((w['type'], w['line_no']) for w in record['warnings']),
+                [('ReimportWarning', 3), ('UnusedImportsWarning', 1),
+                        ('UnusedImportsWarning', 7)])
+        edits = [Edit(e['start_line'], e['end_line'], tuple(e['lines'])) for e in record['edits']]
+        self.assertEqual(''.join(apply_edits(source_code.splitlines(True), edits)),
+                'import sys\nsys.exit()\n\nif sys:\n    pass\n')
+        self.assertTrue(record['diff'].startswith(f'--- a{fixed_file}'))
+
+    def test_write_records(self):
+        file_path, = self.write_files(1, 'import os\nimport sys\nsys.exit()\n')
+        record, = self.run_main('--write', self.root)
+        self.assertTrue(record['modified'])
+        self.assertEqual(record['edits'], [dict(start_line=1, end_line=1, lines=[])])
+        with open(file_path) as f:
+            self.assertEqual(f.read(), 'import sys\nsys.exit()\n')
+
+
+class TestFromReport(BaseMainTest):
+
+    def run_main(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['--msg_id', 'all', *args])
+        return output.getvalue()
+
+    def test_same_as_pylint_run(self):
+        files = self.write_files(3, 'import os\nimport sys\nimport sys\nsys.exit()\n')
+        expected = self.run_main(self.root)
+        report_path = os.path.join(self.root, 'report.json')
+        with open(report_path, 'w') as f:
+            json.dump([{'path': file_path, 'line': line, 'message-id': msg_id,
+                    'message': message} for file_path in files for line, msg_id, message in (
+                            (1, 'W0611', 'Unused import os'),
+                            (3, 'W0404', "Reimport 'sys' (imported line 2)"))], f)
+        with mock.patch('delinter.linters.run_pylint', side_effect=AssertionError):
+            self.assertEqual(self.run_main('--from-report', report_path, self.root), expected)
+
+
+class TestUntilStable(BaseMainTest):
+
+    # the fallback import is only unused once the first one is removed
+    SOURCE = 'try:\n    import json\nexcept ImportError:\n    import json\n'
+    FIXED = 'try:\n    pass\nexcept ImportError:\n    pass\n'
+
+    def run_main(self, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['--msg_id', 'all', '--until-stable', *args])
+        return output.getvalue()
+
+    def test_single_diff_of_all_rounds(self):
+        file_path, = self.write_files(1, self.SOURCE)
+        self.write_files(1, 'import sys\nsys.exit()\n', prefix='clean')
+        self.assertEqual(self.run_main(self.root), ''.join(difflib.unified_diff(
+                self.SOURCE.splitlines(True), self.FIXED.splitlines(True),
+                f'a{file_path}', f'b{file_path}')) + '\n')
+        _, record = map(json.loads, self.run_main('--format', 'ndjson', self.root).splitlines())
+        edits = [Edit(e['start_line'], e['end_line'], tuple(e['lines'])) for e in record['edits']]
+        self.assertEqual(''.join(apply_edits(self.SOURCE.splitlines(True), edits)), self.FIXED)
+        # the warnings of the later rounds are not reported
+        self.assertEqual([w['line_no'] for w in record['warnings']], [2])
+
+    def test_batched_rounds(self):
+        files = self.write_files(3, self.SOURCE)
+        with mock.patch('delinter.main.run_linter', wraps=run_linter) as lint:
+            diffs = self.run_main('--jobs', '2', self.root)
+        self.assertEqual(diffs.count('+    pass\n'), 6)
+        # the first run, the round that fixes the files and the one that finds them stable
+        self.assertEqual(len(lint.call_args_list), 3)
+        _, round_files, _, jobs = lint.call_args_list[1][0]
+        self.assertEqual(len(round_files), len(files))
+        self.assertEqual(jobs, 2)
+
+    def test_write(self):
+        file_path = os.path.join(self.root, 'crlf.py')
+        with open(file_path, 'wb') as f:
+            f.write(self.SOURCE.replace('\n', '\r\n').encode('utf-8'))
+        self.run_main('--write', '--check-compile', self.root)
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.FIXED.replace('\n', '\r\n').encode('utf-8'))
+
+    def test_check_compile(self):
+        file_path, = self.write_files(1, 'import os\nimport sys\nreturn sys\n')
+        with self.assertLogs('delinter.main', 'ERROR'):
+            self.assertEqual(self.run_main('--check-compile', self.root), '')
+        self.assertIn('-import os', self.run_main(self.root))
+
+    def test_buffer(self):
+        result = fix_buffer_until_stable(
+                os.path.join(self.root, 'buffer.py'), self.SOURCE, FixOptions(msg_ids=('W0611',)))
+        self.assertEqual(result.fixed_source, self.FIXED)
+        self.assertEqual([w.line_no for w in result.warnings], [2])
+        result = fix_buffer_until_stable(os.path.join(self.root, 'buffer.py'), self.SOURCE,
+                FixOptions(msg_ids=('W0611',)), max_rounds=1)
+        self.assertEqual(result.fixed_source, 'try:\n    pass\nexcept ImportError:\n    import json\n')
+
+    def test_no_stream(self):
+        with contextlib.redirect_stderr(io.StringIO()) as error, \
+                self.assertRaises(SystemExit):
+            self.run_main('--stream', self.root)
+        self.assertIn('--until-stable does not work with --stream', error.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+from delinter.main import main
+from delinter.merge import merge
+from delinter.merge import merge_diffs
+from delinter.merge import split_diffs
+
+DIFF_A = '''--- a/pkg/a.py
++++ b/pkg/a.py
+@@ -1,2 +1 @@
+--- not a header
+ import sys
+'''
+
+DIFF_B = '''--- a/pkg/b.py
++++ b/pkg/b.py
+@@ -1 +0,0 @@
+-import os
+'''
+
+
+class TestMerge(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(split_diffs(DIFF_B + '\n' + DIFF_A + '\n'),
+                [('b/pkg/b.py', DIFF_B), ('b/pkg/a.py', DIFF_A)])
+        with self.assertRaises(ValueError):
+            split_diffs(DIFF_A[:-len(' import sys\n')])
+
+    def test_merge(self):
+        self.assertEqual(merge_diffs([DIFF_B + '\n', '', DIFF_A + '\n']),
+                DIFF_A + '\n' + DIFF_B + '\n')
+        with self.assertRaisesRegex(ValueError, 'more than one shard'):
+            merge_diffs([DIFF_A, DIFF_A])
+
+    def test_merge_ndjson(self):
+        records = ['{"file_path": "pkg/b.py", "edits": []}\n',
+                '{"file_path": "pkg/c/d.py", "edits": []}\n',
+                '{"file_path": "pkg/a.py", "edits": []}\n']
+        self.assertEqual(merge([records[0], '', records[2] + records[1]]),
+                records[2] + records[0] + records[1])
+        with self.assertRaisesRegex(ValueError, 'more than one shard'):
+            merge(records[:1] * 2)
+        with self.assertRaises(ValueError):
+            merge([records[0], DIFF_A])
+
+    def test_shards_merge_into_a_single_run(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for i in range(8):
+            os.makedirs(os.path.join(root, f'pkg_{i % 2}'), exist_ok=True)
+            with open(os.path.join(root, f'pkg_{i % 2}', f'module_{i}.py'), 'w') as f:
+                f.write('import os\nimport sys\nimport sys\n' + 'sys.exit()\n' * i)
+        output_path = os.path.join(root, 'output.txt')
+
+        def run(*args):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(['--msg_id', 'all', *args])
+            return output.getvalue()
+
+        for output_format in ('diff', 'ndjson'):
+            expected = run('--format', output_format, root)
+            for by_size in ([], ['--shard-by-size']):
+                with self.subTest(output_format=output_format, by_size=by_size):
+                    shards = []
+                    for i in range(1, 4):
+                        shards.append(os.path.join(root, f'shard_{i}.txt'))
+                        with open(shards[-1], 'w') as f:
+                            f.write(run('--format', output_format, '--shard', f'{i}/3',
+                                    *by_size, root))
+                    main(['merge', '--output', output_path, *shards])
+                    with open(output_path) as f:
+                        self.assertEqual(f.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
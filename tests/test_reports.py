@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import unittest
+
+from delinter.main import Delinter
+from delinter.imports import ReimportDelinter
+from delinter.imports import UnusedImportsDelinter
+from delinter.imports import ReimportWarning
+from delinter.imports import UnusedFromImportsWarning
+from delinter.reports import read_report
+from delinter.reports import parse_report
+from delinter.reports import index_reports
+from delinter.reports import parse_json_report
+
+DELINTER_CLASSES = {
+        UnusedImportsDelinter.CODE: UnusedImportsDelinter,
+        ReimportDelinter.CODE: ReimportDelinter}
+
+MESSAGES = [
+        'pkg/a.py:1:[W0611(unused-import),]Unused import os.path',
+        'pkg/a.py:2:[W0611(unused-import),]Unused numpy imported as np',
+        'pkg/a.py:3:[W0404(reimport),]Reimport \'sys\' (imported line 1)',
+        'pkg/a.py:4:[W0611(unused-import),]Unused OrderedDict imported from collections',
+        'pkg/b c.py:5:[W0611(unused-import),]Unused chain imported from itertools as _chain',
+        'pkg/b c.py:6:[W0404(reimport),Klass.method]Reimport \'os\' (imported line 2)',
+        ]
+
+REPORT = '''************* Module pkg.a
+{}
+{}
+pkg/a.py:9:[C0114(missing-module-docstring),]Missing module docstring
+{}
+{}
+************* Module pkg.b
+{}
+{}
+
+------------------------------------------------------------------
+Your code has been rated at 5.00/10
+'''.format(*MESSAGES)
+
+
+class TestParseReport(unittest.TestCase):
+
+    def test_same_as_parse_linter_warnings(self):
+        expected = Delinter.parse_linter_warnings(MESSAGES, 'all')
+        self.assertEqual(parse_report(REPORT, DELINTER_CLASSES), expected)
+        self.assertEqual(parse_report(REPORT.encode('utf-8'), DELINTER_CLASSES), expected)
+        self.assertEqual(parse_report(REPORT.replace('\n', '\r\n'), DELINTER_CLASSES),
+                expected)
+
+    def test_only_requested_codes(self):
+        self.assertEqual(parse_report(REPORT, {'W0404': ReimportDelinter}), [
+                ReimportWarning(file_path='pkg/a.py', line_no=3, import_as_name='sys'),
+                ReimportWarning(file_path='pkg/b c.py', line_no=6, import_as_name='os')])
+        self.assertEqual(parse_report('', DELINTER_CLASSES), [])
+
+    def test_parseable_format(self):
+        report = ('pkg/a.py:4: [W0611(unused-import), ] '
+                'Unused OrderedDict imported from collections')
+        self.assertEqual(parse_report(report, DELINTER_CLASSES), [
+                UnusedFromImportsWarning(file_path='pkg/a.py', line_no=4,
+                        import_as_name='OrderedDict', dotted_as_name='collections',
+                        alias=None)])
+
+    def test_report_message_pattern(self):
+        class DotsDelinter(ReimportDelinter):
+            CODE = 'W9999'
+            message_pattern = re.compile(r'Dots \.*(?P<dname>.*?)\.*')
+            report_message_pattern = re.compile(r'Dots \.*(?P<dname>[^.\r\n]*)\.*')
+
+        report = 'pkg/a.py:1:[W9999(dots),]Dots ...os...\r\npkg/a.py:2:[W9999(dots),]Dots sys\n'
+        self.assertEqual(parse_report(report, {DotsDelinter.CODE: DotsDelinter}), [
+                ReimportWarning(file_path='pkg/a.py', line_no=1, import_as_name='os'),
+                ReimportWarning(file_path='pkg/a.py', line_no=2, import_as_name='sys')])
+
+    def test_invalid_line(self):
+        for line in ('pkg/a.py:x:[W0611(unused-import),]Unused import os',
+                'pkg/a.txt:1:[W0611(unused-import),]Unused import os',
+                'pkg/a.py:1:[W0611(unused-import),]Unused os'):
+            with self.subTest(line=line), self.assertRaisesRegex(ValueError, 'Parsing failed'):
+                parse_report(line + '\n', DELINTER_CLASSES)
+
+    def test_read_report(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        file_path = os.path.join(root, 'report.txt')
+        expected = parse_report(REPORT, DELINTER_CLASSES)
+        with open(file_path, 'w') as f:
+            f.write(REPORT)
+        self.assertEqual(read_report(file_path, DELINTER_CLASSES), expected)
+        self.assertEqual(read_report(file_path, DELINTER_CLASSES, use_mmap=False), expected)
+        open(file_path, 'w').close()
+        self.assertEqual(read_report(file_path, DELINTER_CLASSES), [])
+
+
+class TestIndexReports(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write(self, name, text, mtime):
+        file_path = os.path.join(self.root, name)
+        with open(file_path, 'w') as f:
+            f.write(text)
+        os.utime(file_path, (mtime, mtime))
+        return file_path
+
+    def test_json_report(self):
+        messages = [
+                {'path': 'pkg/a.py', 'line': 1, 'message-id': 'W0611',
+                        'message': 'Unused import os.path'},
+                {'path': 'pkg/a.py', 'line': 9, 'message-id': 'C0114',
+                        'message': 'Missing module docstring'},
+                {'path': 'pkg/a.py', 'line': 3, 'messageId': 'W0404',
+                        'message': "Reimport 'sys' (imported line 1)"}]
+        expected = Delinter.parse_linter_warnings([MESSAGES[0], MESSAGES[2]], 'all')
+        self.assertEqual(parse_json_report(json.dumps(messages), DELINTER_CLASSES), expected)
+        self.assertEqual(parse_json_report(json.dumps(dict(messages=messages)),
+                DELINTER_CLASSES), expected)
+        report_path = self.write('report.json', json.dumps(messages), 0)
+        self.assertEqual(read_report(report_path, DELINTER_CLASSES), expected)
+
+    def test_stale_files_and_newest_report(self):
+        fresh = self.write('fresh.py', 'import os\n', 100)
+        stale = self.write('stale.py', 'import os\n', 300)
+        other = self.write('other.py', 'import os\n', 100)
+        line = '{}:1:[W0611(unused-import),]Unused import {}\n'
+        old_report = self.write('old.txt',
+                line.format(fresh, 'sys') + line.format(other, 'json'), 150)
+        new_report = self.write('new.txt',
+                line.format(os.path.relpath(fresh), 'os') + line.format(stale, 'os'), 200)
+        with self.assertLogs('delinter.reports', 'WARNING') as logs:
+            warning_index = index_reports([old_report, new_report],
+                    [fresh, stale, other], DELINTER_CLASSES)
+        self.assertIn(stale, logs.output[0])
+        self.assertEqual([w.dotted_as_name for w in warning_index.for_file(fresh)], ['os'])
+        self.assertNotIn(stale, warning_index)
+        self.assertEqual([w.dotted_as_name for w in warning_index.for_file(other)], ['json'])
+        # only the warnings of the files asked for are kept
+        self.assertEqual(len(index_reports([old_report], [fresh], DELINTER_CLASSES)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import threading
+import contextlib
+from unittest import mock
+
+from delinter import client
+from delinter.main import main
+from delinter.server import serve
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.socket_path = os.path.join(self.root, 'delinter.sock')
+
+    def start(self, idle_timeout=30):
+        thread = threading.Thread(target=serve, args=(self.socket_path, idle_timeout))
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def started(self, idle_timeout=30):
+        thread = self.start(idle_timeout)
+        self.addCleanup(self.stop)
+        client.request(self.socket_path, dict(command='ping'), start_timeout=10)
+        return thread
+
+    def stop(self):
+        with contextlib.suppress(OSError):
+            client.send_request(self.socket_path, dict(command='shutdown'))
+
+    def write(self, name, source_code):
+        file_path = os.path.join(self.root, name)
+        with open(file_path, 'w') as f:
+            f.write(source_code)
+        return file_path
+
+    def run_main(self, args, stdin=''):
+        output = io.StringIO()
+        with mock.patch('sys.stdin', io.StringIO(stdin)), \
+                contextlib.redirect_stdout(output):
+            main(['--socket', self.socket_path, *args])
+        return output.getvalue()
+
+    def test_daemon_matches_in_process_run(self):
+        self.write('a.py', 'import os\nimport sys\nsys.exit()\n')
+        self.write('b.py', 'import os\nos.getcwd()\n')
+        self.started()
+        expected = self.run_main(['--msg_id', 'W0611', self.root])
+        self.assertIn('-import os\n', expected)
+        self.assertEqual(self.run_main(['--daemon', '--msg_id', 'W0611', self.root]), expected)
+
+    def test_daemon_write(self):
+        file_path = self.write('a.py', 'import os\r\nimport sys\r\nsys.exit()\r\n')
+        self.started()
+        self.run_main(['--daemon', '--msg_id', 'W0611', '--write', self.root])
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), b'import sys\r\nsys.exit()\r\n')
+
+    def test_buffer(self):
+        file_path = self.write('a.py', 'import json\n')
+        buffer = 'import os\nimport sys\nimport sys\nsys.exit()\n'
+        expected = 'import sys\nsys.exit()\n'
+        self.assertEqual(self.run_main(
+                ['--msg_id', 'all', '--stdin-filename', file_path], buffer), expected)
+        self.started()
+        self.assertEqual(self.run_main(
+                ['--daemon', '--msg_id', 'all', '--stdin-filename', file_path], buffer), expected)
+        # an unchanged buffer is printed back
+        self.assertEqual(self.run_main(
+                ['--daemon', '--msg_id', 'all', '--stdin-filename', file_path], expected), expected)
+
+    def test_errors_are_returned(self):
+        self.started()
+        with self.assertRaisesRegex(ValueError, 'W0000'):
+            client.send_request(self.socket_path,
+                    dict(command='fix', msg_ids=['W0000'], file_paths=[]))
+        # the server keeps running
+        self.assertIn('pid', client.send_request(self.socket_path, dict(command='ping')))
+
+    def test_idle_timeout(self):
+        thread = self.start(idle_timeout=0.1)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_started_on_demand(self):
+        with mock.patch('delinter.client.start_server',
+                side_effect=lambda socket_path, idle_timeout: self.start(idle_timeout)) as start:
+            response = client.request(self.socket_path, dict(command='ping'), idle_timeout=30)
+            self.addCleanup(self.stop)
+            client.request(self.socket_path, dict(command='ping'))
+        self.assertEqual(response['pid'], os.getpid())
+        start.assert_called_once_with(self.socket_path, 30)
+
+    def test_second_server_exits(self):
+        self.started()
+        # returns at once while the first server holds the lock
+        serve(self.socket_path, idle_timeout=30)
+        self.assertIn('pid', client.send_request(self.socket_path, dict(command='ping')))
+
+
+if __name__ == '__main__':
+    unittest.main()
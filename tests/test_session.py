@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from delinter import DelinterSession
+from delinter.main import _parse_module
+from delinter.session import ModuleCache
+from delinter.discovery import FileFilter
+from delinter.imports import ReimportWarning
+from delinter.imports import UnusedImportsWarning
+
+SOURCE = 'import os\nimport sys\nimport sys\nsys.exit()\n'
+
+
+class TestModuleCache(unittest.TestCase):
+
+    def test_reuse_and_evict(self):
+        module_cache = ModuleCache(max_entries=2)
+        module = module_cache.parse('import os\n')
+        self.assertIs(module_cache.parse('import os\n'), module)
+        module_cache.parse('import sys\n')
+        module_cache.parse('import json\n')
+        self.assertEqual(len(module_cache), 2)
+        self.assertIsNot(module_cache.parse('import os\n'), module)
+        self.assertEqual((module_cache.hits, module_cache.misses), (1, 4))
+
+
+class TestDelinterSession(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write(self, name, source_code):
+        file_path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(source_code)
+        return file_path
+
+    def test_fix_source(self):
+        with DelinterSession(msg_ids='W0611') as session:
+            result = session.fix_source(SOURCE, 'pkg/module.py')
+            self.assertEqual(result.fixed_source, 'import sys\nimport sys\nsys.exit()\n')
+            self.assertEqual(result.warnings, [UnusedImportsWarning(
+                    file_path='pkg/module.py', line_no=1, alias=None, dotted_as_name='os')])
+            self.assertEqual([(edit.start_line, edit.lines) for edit in result.edits], [(1, ())])
+            result = session.fix_source(SOURCE, 'pkg/module.py', msg_ids='W0404')
+            self.assertEqual(result.fixed_source, 'import os\nimport sys\nsys.exit()\n')
+            # the module parsed by the first call is reused
+            self.assertEqual(session.modules.hits, 1)
+            self.assertIsNone(session.fix_source('import sys\nsys.exit()\n').fixed_source)
+        # the module cache of the session is only used during its calls
+        self.assertIsNot(_parse_module(SOURCE), _parse_module(SOURCE))
+
+    def test_fix_paths(self):
+        clean = self.write('pkg/clean.py', 'import sys\nsys.exit()\n')
+        fixed = self.write('pkg/fixed.py', SOURCE)
+        self.write('pkg/generated.py', '# @generated\n' + SOURCE)
+        session = DelinterSession()
+
+        results = session.fix_paths([self.root], file_filter=FileFilter(skip_generated=True))
+
+        self.assertEqual([str(result.file_path) for result in results],
+                [os.path.join(self.root, 'pkg', name) for name in ('clean.py', 'fixed.py')])
+        self.assertIsNone(results[0].fixed_source)
+        self.assertEqual(results[1].fixed_source, b'import sys\nsys.exit()\n')
+        self.assertIn(ReimportWarning(file_path=fixed, line_no=3, import_as_name='sys'),
+                results[1].warnings)
+        with open(fixed) as f:
+            self.assertEqual(f.read(), SOURCE)
+
+        result = session.fix_file(fixed, write=True)
+        self.assertEqual(result.fixed_source, b'import sys\nsys.exit()\n')
+        with open(fixed) as f:
+            self.assertEqual(f.read(), 'import sys\nsys.exit()\n')
+        self.assertIsNone(session.fix_file(clean).fixed_source)
+
+    def test_invalid_settings(self):
+        for kwargs in (dict(msg_ids='W9999'), dict(detector='mypy'), dict(linter='mypy')):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                DelinterSession(**kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
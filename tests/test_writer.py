@@ -0,0 +1,51 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+
+from delinter.writer import AtomicWriter
+
+
+class TestAtomicWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_files(self, count):
+        files = []
+        for i in range(count):
+            files.append(os.path.join(self.root, f'module_{i}.py'))
+            with open(files[-1], 'wb') as f:
+                f.write(b'import os\n')
+        return files
+
+    def test_batches(self):
+        files = self.write_files(3)
+        os.chmod(files[0], 0o755)
+        with AtomicWriter(batch_size=2) as writer:
+            for file_path in files:
+                writer.write(file_path, b'import sys\r\n')
+            # the first batch is renamed, the last file waits for the exit
+            self.assertEqual(writer.written, files[:2])
+        self.assertEqual(writer.written, files)
+        for file_path in files:
+            with open(file_path, 'rb') as f:
+                self.assertEqual(f.read(), b'import sys\r\n')
+        self.assertEqual(stat.S_IMODE(os.stat(files[0]).st_mode), 0o755)
+        self.assertEqual(sorted(os.listdir(self.root)), [os.path.basename(f) for f in files])
+
+    def test_error_keeps_files(self):
+        files = self.write_files(1)
+        with self.assertRaises(RuntimeError):
+            with AtomicWriter() as writer:
+                writer.write(files[0], b'import sys\n')
+                raise RuntimeError()
+        with open(files[0], 'rb') as f:
+            self.assertEqual(f.read(), b'import os\n')
+        self.assertEqual(os.listdir(self.root), [os.path.basename(files[0])])
+
+
+if __name__ == '__main__':
+    unittest.main()